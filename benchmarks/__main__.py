@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run the benchmarks and write the results as JSON
+
+Examples::
+
+    python -m benchmarks -o before.json
+    python -m benchmarks -o after.json --compare before.json
+    python -m benchmarks -k model_list --sizes 1000,10000,100000
+"""
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import timeit
+
+from k8s import config
+
+from .cases import CASES
+
+
+def main(argv=None):
+    options = _parse_args(argv)
+    config.json_backend = options.json_backend
+    config.compact_storage = options.compact_storage
+    results = []
+    for case in CASES:
+        for name, size in case.names(options.sizes):
+            if options.filter and options.filter not in name:
+                continue
+            print("Running {}".format(name), file=sys.stderr)
+            func, ops = case.setup(size)
+            results.append(_measure(name, func, ops, options.repeat, options.min_time, case.collect))
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "json_backend": config.json_backend,
+            "compact_storage": config.compact_storage,
+        },
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if options.compare:
+        with open(options.compare) as f:
+            _compare(json.load(f)["results"], results)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", help="only run benchmarks with names containing this string")
+    parser.add_argument("--sizes", type=_sizes, default=[1000, 10000],
+                        help="comma separated list sizes for the benchmarks of lists and caches (default: 1000,10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timings of each benchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum duration of each timing in seconds (default: 0.2)")
+    parser.add_argument("--json-backend", default=config.json_backend, help="value for config.json_backend")
+    parser.add_argument("--compact-storage", action="store_true", help="enable config.compact_storage")
+    parser.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    parser.add_argument("--compare", help="results of an earlier run, to print the change of each benchmark")
+    return parser.parse_args(argv)
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def _measure(name, func, ops, repeat, min_time, collect=False):
+    """Time func, calling it enough times in each timing to last at least min_time
+
+    timeit pauses garbage collection while timing, unless collect is set.
+    """
+    timer = timeit.Timer(func, setup="gc.enable()" if collect else "pass")
+    elapsed = timer.timeit(1)
+    loops = max(1, int(math.ceil(min_time / elapsed))) if elapsed > 0 else 1000
+    timings = [t / loops / ops for t in timer.repeat(repeat, loops)]
+    return {
+        "name": name,
+        "ops": ops,
+        "loops": loops,
+        "repeat": repeat,
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+
+def _compare(before, after):
+    """Print the change of the best time of each benchmark found in both runs"""
+    previous = {result["name"]: result for result in before}
+    print("{:40} {:>14} {:>14} {:>9}".format("benchmark", "before", "after", "ratio"), file=sys.stderr)
+    for result in after:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["best"] / old["best"]
+        print("{:40} {:12.3f}us {:12.3f}us {:8.2f}x".format(
+            result["name"], old["best"] * 1e6, result["best"] * 1e6, ratio), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
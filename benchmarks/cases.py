@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The benchmark cases
+
+Each case is a function taking the list size to use, and returning the function to time together with the number of
+operations it performs per call. Results are reported per operation.
+"""
+
+import itertools
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from k8s import config, jsoncodec
+from k8s.base import ModelList, WatchEvent, _batches, _decode_pickled_batch, _load_batch
+from k8s.fakeserver import FakeApiServer
+from k8s.models.common import ObjectMeta
+from k8s.models.deployment import Deployment
+from k8s.models.networking_v1_ingress import Ingress
+from k8s.models.pod import Pod
+from k8s.models.service import Service
+from k8s.watcher import Watcher
+
+from . import fixtures
+
+STREAM_CHUNK_SIZE = 64 * 1024
+MODELS = (
+    (Deployment, fixtures.deployment),
+    (Pod, fixtures.pod),
+    (Ingress, fixtures.ingress),
+)
+
+
+class Case(object):
+    def __init__(self, name, setup, sized=False, collect=False):
+        self.name = name
+        self.setup = setup
+        self.sized = sized
+        self.collect = collect
+
+    def names(self, sizes):
+        """Yield the name of each variant of this case, with the size to use for it"""
+        if self.sized:
+            for size in sizes:
+                yield "{}[{}]".format(self.name, size), size
+        else:
+            yield self.name, None
+
+
+def _from_dict(model, factory):
+    def setup(_size):
+        data = factory(0)
+        return lambda: model.from_dict(data), 1
+    return setup
+
+
+def _as_dict(model, factory):
+    def setup(_size):
+        instance = model.from_dict(factory(0))
+        return instance.as_dict, 1
+    return setup
+
+
+def _eq(model, factory):
+    def setup(_size):
+        first = model.from_dict(factory(0))
+        second = model.from_dict(factory(0))
+        return lambda: first == second, 1
+    return setup
+
+
+def _parse_watch_event(_size):
+    """Parse a watch line and decode its object, which is done lazily when the object is first read"""
+    line = fixtures.watch_line(fixtures.pod, 0)
+    return lambda: Pod._parse_watch_event(line).object, 1
+
+
+def _parse_watch_event_metadata(_size):
+    """Parse a watch line and read only the metadata, as a Watcher predicate does for skipped objects"""
+    line = fixtures.watch_line(fixtures.pod, 0)
+    return lambda: Pod._parse_watch_event(line).raw_metadata, 1
+
+
+def _watcher_should_yield(size):
+    """A Watcher with `size` objects in its cache, receiving a mix of new and already seen events"""
+    watcher = Watcher(Pod, capacity=size)
+    events = []
+    for i in range(size):
+        for resource_version in ("1", "1", "2", "2"):
+            metadata = ObjectMeta(name="app-{}".format(i), namespace="default", resourceVersion=resource_version)
+            events.append(WatchEvent(_type=WatchEvent.MODIFIED, _object=Pod(metadata=metadata)))
+    should_yield = watcher._should_yield
+
+    def run():
+        for event in events:
+            should_yield(event)
+    return run, len(events)
+
+
+def _model_list_from_dict(size):
+    data = fixtures.list_response(fixtures.pod, size)
+    return lambda: ModelList.from_dict(Pod, data), size
+
+
+_executor = None
+
+
+def _decode_executor():
+    """Start a process pool shared by the executor cases, with the default of about one worker per CPU"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor()
+    return _executor
+
+
+def _model_list_from_dict_executor(size):
+    """Like model_list.from_dict, decoding the items in the decode executor"""
+    data = fixtures.list_response(fixtures.pod, size)
+    executor = _decode_executor()
+
+    def from_dict():
+        previous = config.decode_executor, config.decode_threshold
+        config.decode_executor, config.decode_threshold = executor, 0
+        try:
+            return ModelList.from_dict(Pod, data)
+        finally:
+            config.decode_executor, config.decode_threshold = previous
+    return from_dict, size
+
+
+def _model_list_from_dict_executor_parent(size):
+    """The part of model_list.from_dict_executor left to the calling process, which the workers can not speed up:
+    pickling the batches of items for the workers, and loading the models they return"""
+    items = fixtures.list_response(fixtures.pod, size)["items"]
+    batches = list(_batches(items, _decode_executor()))
+    results = [_decode_pickled_batch(Pod, batch) for batch in batches]
+
+    def parent():
+        for batch in batches:
+            pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)
+        return [model for result in results for model in _load_batch(result)]
+    return parent, size
+
+
+def _model_list_from_stream(size):
+    body = jsoncodec.dumps(fixtures.list_response(fixtures.pod, size))
+    chunks = [body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+    return lambda: ModelList.from_stream(Pod, chunks), size
+
+
+def _model_list_from_bytes(size):
+    """Decoding the whole body first, as list_with_meta does without streaming"""
+    body = jsoncodec.dumps(fixtures.list_response(fixtures.pod, size))
+    return lambda: ModelList.from_dict(Pod, jsoncodec.loads(body)), size
+
+
+_server = None
+
+
+def _fake_api_server():
+    """Start a fake API server shared by the end-to-end cases, and point the client at it"""
+    global _server
+    if _server is None:
+        _server = FakeApiServer(history_size=10 ** 6).start()
+        config.api_server = _server.url
+        config.api_token = ""
+    return _server
+
+
+def _e2e_list(size):
+    url = "/api/v1/namespaces/list-{}/pods".format(size)
+    server = _fake_api_server()
+    for i in range(size):
+        server.create(url, fixtures.pod(i))
+    return lambda: Pod.list_with_meta(namespace="list-{}".format(size)), size
+
+
+def _e2e_save(_size):
+    _fake_api_server()
+    deployment = Deployment.from_dict(fixtures.deployment(0))
+    deployment._new = True
+    deployment.save()
+    replicas = itertools.cycle((1, 2))
+
+    def save():
+        deployment.spec.replicas = next(replicas)
+        deployment.save()
+    return save, 1
+
+
+def _e2e_watch(size):
+    """Read `size` events from a watch, resuming from the same resourceVersion in every call"""
+    url = "/api/v1/namespaces/watch-{}/services".format(size)
+    server = _fake_api_server()
+    server.create(url, {"metadata": {"name": "service"}})
+    resource_version = server.resource_version
+    stop = server.start_churn(url, rate=10 ** 6, count=size)
+    while int(server.resource_version) < int(resource_version) + size:
+        stop.wait(0.01)
+
+    def watch():
+        events = Service.watch_list(resource_version=resource_version)
+        for _ in range(size):
+            next(events)
+        events.close()
+    return watch, size
+
+
+CASES = [Case("{}.from_dict".format(model.__name__), _from_dict(model, factory)) for model, factory in MODELS]
+CASES += [Case("{}.as_dict".format(model.__name__), _as_dict(model, factory)) for model, factory in MODELS]
+CASES += [Case("{}.eq".format(model.__name__), _eq(model, factory)) for model, factory in MODELS]
+CASES += [
+    Case("watch.parse_event", _parse_watch_event),
+    Case("watch.parse_event_metadata", _parse_watch_event_metadata),
+    Case("watcher.should_yield", _watcher_should_yield, sized=True),
+    Case("model_list.from_dict", _model_list_from_dict, sized=True),
+    # Collecting garbage takes almost half the time spent decoding a large list, so the executor cases are
+    # compared to decoding inline with the garbage collector running, like it does outside benchmarks
+    Case("model_list.from_dict_gc", _model_list_from_dict, sized=True, collect=True),
+    Case("model_list.from_dict_executor", _model_list_from_dict_executor, sized=True, collect=True),
+    Case("model_list.from_dict_executor_parent", _model_list_from_dict_executor_parent, sized=True, collect=True),
+    Case("model_list.from_bytes", _model_list_from_bytes, sized=True),
+    Case("model_list.from_stream", _model_list_from_stream, sized=True),
+    Case("e2e.list", _e2e_list, sized=True),
+    Case("e2e.save", _e2e_save),
+    Case("e2e.watch", _e2e_watch, sized=True),
+]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic synthetic payloads, shaped like what the API server returns for typical applications"""
+
+import json
+
+CREATION_TIMESTAMP = "2021-03-04T05:06:07Z"
+
+
+def metadata(i, namespace="default"):
+    return {
+        "name": "app-{}".format(i),
+        "namespace": namespace,
+        "uid": "0b5b3c4e-{:04x}-11e6-a364-fa163ea2a9c4".format(i % 0x10000),
+        "resourceVersion": str(100000 + i),
+        "generation": 3,
+        "creationTimestamp": CREATION_TIMESTAMP,
+        "labels": {"app": "app-{}".format(i), "fiaas/deployed_by": "fiaas", "tier": "web"},
+        "annotations": {"deployment.kubernetes.io/revision": "3", "fiaas/deployment_id": "deploy-{}".format(i)},
+        "ownerReferences": [{
+            "apiVersion": "apps/v1",
+            "kind": "ReplicaSet",
+            "name": "app-{}-5d4f8b7c9".format(i),
+            "uid": "5d4f8b7c-{:04x}".format(i % 0x10000),
+            "controller": True,
+        }],
+    }
+
+
+def container(i):
+    return {
+        "name": "app-{}".format(i),
+        "image": "registry.example.com/app-{}:1.0.{}".format(i, i % 100),
+        "imagePullPolicy": "IfNotPresent",
+        "ports": [{"containerPort": 8080, "name": "http", "protocol": "TCP"}],
+        "env": [
+            {"name": "ARTIFACT_NAME", "value": "app-{}".format(i)},
+            {"name": "LOG_FORMAT", "value": "json"},
+            {"name": "POD_NAME", "valueFrom": {"fieldRef": {"fieldPath": "metadata.name"}}},
+            {"name": "SECRET", "valueFrom": {"secretKeyRef": {"name": "app-{}".format(i), "key": "secret"}}},
+        ],
+        "resources": {"limits": {"cpu": "1", "memory": "512Mi"}, "requests": {"cpu": "100m", "memory": "256Mi"}},
+        "readinessProbe": {"httpGet": {"path": "/ready", "port": "http"}, "initialDelaySeconds": 10},
+        "livenessProbe": {"httpGet": {"path": "/alive", "port": "http"}, "periodSeconds": 10},
+        "volumeMounts": [{"name": "config", "mountPath": "/var/run/config", "readOnly": True}],
+    }
+
+
+def pod_spec(i):
+    return {
+        "containers": [container(i)],
+        "volumes": [{"name": "config", "configMap": {"name": "app-{}".format(i)}}],
+        "serviceAccountName": "default",
+        "restartPolicy": "Always",
+        "dnsPolicy": "ClusterFirst",
+    }
+
+
+def deployment(i):
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": metadata(i),
+        "spec": {
+            "replicas": 2,
+            "selector": {"matchLabels": {"app": "app-{}".format(i)}},
+            "template": {"metadata": metadata(i), "spec": pod_spec(i)},
+            "strategy": {"type": "RollingUpdate", "rollingUpdate": {"maxUnavailable": 0, "maxSurge": "25%"}},
+            "revisionHistoryLimit": 5,
+        },
+        "status": {"replicas": 2, "updatedReplicas": 2, "availableReplicas": 2, "observedGeneration": 3},
+    }
+
+
+def pod(i):
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": metadata(i),
+        "spec": pod_spec(i),
+        "status": {
+            "phase": "Running",
+            "podIP": "10.0.{}.{}".format(i // 256 % 256, i % 256),
+            "hostIP": "192.168.0.{}".format(i % 256),
+            "startTime": CREATION_TIMESTAMP,
+            "conditions": [{"type": "Ready", "status": "True", "lastTransitionTime": CREATION_TIMESTAMP}],
+            "containerStatuses": [{
+                "name": "app-{}".format(i),
+                "ready": True,
+                "restartCount": 0,
+                "image": "registry.example.com/app-{}:1.0.{}".format(i, i % 100),
+                "imageID": "docker-pullable://registry.example.com/app-{}@sha256:{:064x}".format(i, i),
+                "state": {"running": {"startedAt": CREATION_TIMESTAMP}},
+            }],
+        },
+    }
+
+
+def ingress(i):
+    return {
+        "apiVersion": "networking.k8s.io/v1",
+        "kind": "Ingress",
+        "metadata": metadata(i),
+        "spec": {
+            "ingressClassName": "nginx",
+            "rules": [{
+                "host": "app-{}.example.com".format(i),
+                "http": {"paths": [
+                    {"path": "/", "pathType": "Prefix",
+                     "backend": {"service": {"name": "app-{}".format(i), "port": {"number": 80}}}},
+                    {"path": "/_/metrics", "pathType": "Prefix",
+                     "backend": {"service": {"name": "app-{}".format(i), "port": {"name": "http"}}}},
+                ]},
+            }],
+            "tls": [{"hosts": ["app-{}.example.com".format(i)], "secretName": "app-{}-tls".format(i)}],
+        },
+        "status": {"loadBalancer": {"ingress": [{"ip": "10.10.0.1"}]}},
+    }
+
+
+def list_response(factory, count):
+    return {
+        "kind": "List",
+        "apiVersion": "v1",
+        "metadata": {"resourceVersion": str(100000 + count)},
+        "items": [factory(i) for i in range(count)],
+    }
+
+
+def watch_line(factory, i, event_type="MODIFIED"):
+    """A line from a watch stream, as bytes"""
+    return json.dumps({"type": event_type, "object": factory(i)}).encode("utf-8")
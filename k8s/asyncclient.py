@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asyncio counterpart of :py:class:`~k8s.client.Client`, used by the `*_async` methods of the models
+
+Requires aiohttp, which is installed with the `async` extra (``pip install k8s[async]``).
+"""
+
+import asyncio
+import logging
+import ssl
+
+from . import config, jsoncodec
+from .client import Client
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+LOG = logging.getLogger(__name__)
+LOG.addHandler(logging.NullHandler())
+
+# Same retry policy as the session used by Client, which also retries connection errors
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+MAX_RETRIES = 10
+MAX_BACKOFF = 120
+
+
+class AsyncClient(object):
+    """Make requests to the API server from asyncio code
+
+    Responses are read completely, and returned as objects with the same attributes as a :py:class:`requests.Response`
+    that the library uses. Errors raise the same exceptions as :py:class:`~k8s.client.Client`.
+
+    An aiohttp session is created on first use in each event loop, closing the session of the previous loop. Call
+    :py:meth:`close` before the loop is closed.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._loop = None
+        self._ssl_context = None
+
+    async def get(self, url, timeout=config.timeout, **kwargs):
+        return await self._call("GET", url, timeout=timeout, **kwargs)
+
+    async def delete(self, url, timeout=config.timeout, **kwargs):
+        return await self._call("DELETE", url, timeout=timeout, **kwargs)
+
+    async def post(self, url, body, timeout=config.timeout):
+        return await self._call("POST", url, body, timeout=timeout)
+
+    async def put(self, url, body, timeout=config.timeout):
+        return await self._call("PUT", url, body, timeout=timeout)
+
+    async def patch(self, url, body, timeout=config.timeout, content_type="application/merge-patch+json", **kwargs):
+        return await self._call("PATCH", url, body, timeout=timeout, headers={"Content-Type": content_type}, **kwargs)
+
+    async def stream_lines(self, url, timeout=config.stream_timeout, params=None):
+        """Yield the lines of a streaming response, such as a watch
+
+        `timeout` is the longest time to wait for more data, raising :py:class:`asyncio.TimeoutError` when reached.
+        """
+        session = await self._get_session()
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout)
+        headers = _auth_headers()
+        async with session.get(config.api_server + url, params=_params(params), headers=headers,
+                               timeout=client_timeout, ssl=self._ssl_context) as resp:
+            if resp.status >= 400:
+                Client._raise_on_status(_Response("GET", resp, await resp.read(), headers, None))
+            pending = bytearray()
+            async for chunk in resp.content.iter_any():
+                pending += chunk
+                start = 0
+                end = pending.find(b"\n", start)
+                while end >= 0:
+                    yield bytes(pending[start:end])
+                    start = end + 1
+                    end = pending.find(b"\n", start)
+                del pending[:start]
+            if pending:
+                yield bytes(pending)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._loop = None
+
+    async def _call(self, method, url, body=None, timeout=config.timeout, headers=None, params=None):
+        session = await self._get_session()
+        headers = dict(headers or {}, **_auth_headers())
+        data = None
+        if body is not None:
+            data = jsoncodec.dumps(body)
+            headers.setdefault("Content-Type", "application/json")
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        attempt = 0
+        while True:
+            try:
+                async with session.request(method, config.api_server + url, data=data, headers=headers,
+                                           params=_params(params), timeout=client_timeout,
+                                           ssl=self._ssl_context) as resp:
+                    response = _Response(method, resp, await resp.read(), headers, data)
+            except aiohttp.ClientConnectionError as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                attempt += 1
+                delay = _backoff(attempt)
+                LOG.debug("Retrying %s %s in %.1fs after %r", method, url, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                break
+            attempt += 1
+            delay = _retry_delay(response, attempt)
+            LOG.debug("Retrying %s %s in %.1fs after status %d", method, url, delay, response.status_code)
+            await asyncio.sleep(delay)
+        if config.debug:
+            message = ['{:d} for url: {:s}'.format(response.status_code, response.url)]
+            Client._add_request(message, response.request)
+            Client._add_response(message, response)
+            LOG.debug("\n".join(message))
+        Client._raise_on_status(response)
+        return response
+
+    async def _get_session(self):
+        if aiohttp is None:
+            raise ImportError("The async API requires aiohttp, install it with `pip install k8s[async]`")
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            await self._close_previous_session()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._loop = loop
+            self._ssl_context = _ssl_context()
+        return self._session
+
+    async def _close_previous_session(self):
+        """Close the session created in another event loop, so its connector doesn't leak
+
+        The close must run in the loop of the session: in its own thread if that loop is running, otherwise in a
+        worker thread. The connections of a loop that is already closed can't be closed cleanly anymore, and are only
+        released when garbage collected.
+        """
+        session, loop = self._session, self._loop
+        self._session = None
+        if session.closed:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif not loop.is_closed():
+            await asyncio.to_thread(loop.run_until_complete, session.close())
+        else:
+            await session.close()
+
+
+class _Request(object):
+    def __init__(self, method, url, headers, body):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body.decode("utf-8") if body else body
+
+
+class _Response(object):
+    """The parts of a requests.Response used by the library"""
+
+    def __init__(self, method, resp, content, headers, body):
+        self.status_code = resp.status
+        self.reason = resp.reason or ""
+        self.url = str(resp.url)
+        self.headers = resp.headers
+        self.content = content
+        self.request = _Request(method, self.url, headers, body)
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return jsoncodec.loads(self.content)
+
+
+def _auth_headers():
+    if config.api_token_source:
+        return {"Authorization": "Bearer {}".format(config.api_token_source.token())}
+    if config.api_token:
+        return {"Authorization": "Bearer {}".format(config.api_token)}
+    return {}
+
+
+def _ssl_context():
+    if not config.verify_ssl:
+        return False
+    cafile = config.verify_ssl if isinstance(config.verify_ssl, str) else None
+    context = ssl.create_default_context(cafile=cafile)
+    if config.cert:
+        certfile, keyfile = config.cert if isinstance(config.cert, tuple) else (config.cert, None)
+        context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def _params(params):
+    """aiohttp only accepts strings as parameter values"""
+    if not params:
+        return None
+    return {key: str(value) for key, value in params.items()}
+
+
+def _retry_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return _backoff(attempt)
+
+
+def _backoff(attempt):
+    return min(MAX_BACKOFF, 2 ** (attempt - 1))
@@ -18,21 +18,33 @@
 from __future__ import annotations
 from abc import ABC
 
-import json
+import asyncio
+import gc
+import itertools
 import logging
+import os
+import pickle
+import threading
 from collections import namedtuple
-from typing import Optional, Dict, List
+from typing import Optional, Dict, Iterable, List
 
 import requests
 import requests.packages.urllib3 as urllib3
 
-from . import config
+from . import config, jsoncodec
+from .asyncclient import AsyncClient
 from .client import Client, NotFound
-from .fields import Field
+from .fields import _MISSING, Field
+from .jsonstream import iter_object
 
 LOG = logging.getLogger(__name__)
 LOG.addHandler(logging.NullHandler())
 
+# Size of the chunks read from streamed list responses
+STREAM_CHUNK_SIZE = 64 * 1024
+# Number of batches per worker when decoding items in config.decode_executor, so slower batches even out
+DECODE_BATCHES_PER_WORKER = 4
+
 
 class MetaModel(type):
     """Metaclass for Model
@@ -44,6 +56,9 @@ class MetaModel(type):
     * Creates properties for name and namespace if the instance has a metadata field.
     * Mixes in ApiMixIn if the Model has a Meta attribute, indicating a top level
       Model (not to be confused with _meta).
+    * Resolves fields using SelfModel as their type to the new class.
+    * Sets the api_version and kind of the Model in _meta, unless set in Meta, from url_template and the class name.
+    * Generates a CompactValues subclass with a slot per field, used when config.compact_storage is enabled.
     """
 
     @staticmethod
@@ -56,9 +71,13 @@ class MetaModel(type):
             "list_url": getattr(attr_meta, "list_url", ""),
             "watch_list_url": getattr(attr_meta, "watch_list_url", ""),
             "watch_list_url_template": getattr(attr_meta, "watch_list_url_template", ""),
+            "api_version": getattr(attr_meta, "api_version", ""),
+            "kind": getattr(attr_meta, "kind", cls),
             "fields": [],
             "field_names": [],
         }
+        if not meta["api_version"]:
+            meta["api_version"] = _api_version(meta["url_template"])
         field_names = meta["field_names"]
         fields = meta["fields"]
         for k, v in list(attrs.items()):
@@ -68,9 +87,82 @@ class MetaModel(type):
                 v.attr_name = k
                 field_names.append(k)
                 fields.append(v)
+        meta["compact_values"] = _compact_values_class(cls, fields)
         Meta = namedtuple("Meta", meta.keys())
         attrs["_meta"] = Meta(**meta)
-        return super(MetaModel, mcs).__new__(mcs, cls, bases, attrs)
+        attrs["_codec"] = None
+        new_cls = super(MetaModel, mcs).__new__(mcs, cls, bases, attrs)
+        meta["compact_values"]._model = new_cls
+        for field in fields:
+            if field.type is SelfModel:
+                field.type = new_cls
+                field.default_value_create_instance = False
+        return new_cls
+
+
+def _api_version(url_template):
+    """Find the apiVersion in a URL like /api/v1/... or /apis/<group>/<version>/..."""
+    parts = url_template.split("/")
+    if len(parts) > 2 and parts[1] == "api":
+        return parts[2]
+    if len(parts) > 3 and parts[1] == "apis":
+        return "{}/{}".format(parts[2], parts[3])
+    return ""
+
+
+def _compact_values_class(cls, fields):
+    slots = {field.name: "v_" + field.attr_name for field in fields}
+    attrs = {"__slots__": tuple(slots.values()), "_slots": slots}
+    return type(cls + "Values", (CompactValues,), attrs)
+
+
+class CompactValues(object):
+    """Storage for the field values of a Model instance, with a slot for each field
+
+    Supports the parts of the dict interface used by fields, and takes much less memory than a dict.
+    """
+
+    __slots__ = ()
+    _slots = {}
+    _model = None
+
+    def get(self, name, default=None):
+        return getattr(self, self._slots[name], default)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, self._slots[name])
+        except AttributeError:
+            raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        setattr(self, self._slots[name], value)
+
+    def __delitem__(self, name):
+        try:
+            delattr(self, self._slots[name])
+        except AttributeError:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return hasattr(self, self._slots[name])
+
+    def _items(self):
+        return [(name, getattr(self, slot)) for name, slot in self._slots.items() if hasattr(self, slot)]
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, dict(self._items()))
+
+    def __reduce__(self):
+        return _new_compact_values, (self._model,), dict(self._items())
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            self[name] = value
+
+
+def _new_compact_values(model):
+    return model._meta.compact_values()
 
 
 class ApiMixIn(object):
@@ -80,6 +172,7 @@ class ApiMixIn(object):
     """
 
     _client = Client()
+    _async_client = AsyncClient()
 
     @classmethod
     def _build_url(cls, **kwargs):
@@ -98,63 +191,98 @@ class ApiMixIn(object):
         When a `labels` dictionary is supplied, the `name` parameter is ignored.
         See the docs for _label_selector for more details
         """
+        url = cls._list_url(namespace, "find")
+        resp = cls._client.get(url, params=cls._find_params(name, labels))
+        return _decode_items(cls, jsoncodec.decode_response(resp)["items"])
+
+    @classmethod
+    def _list_url(cls, namespace, operation="list"):
+        """The URL for listing resources in namespace, or in all namespaces if namespace is None"""
         if namespace is None:
             if not cls._meta.list_url:
-                raise NotImplementedError("Cannot find without namespace, no list_url defined on class {}".format(cls))
-            url = cls._meta.list_url
-        else:
-            url = cls._build_url(name="", namespace=namespace)
+                raise NotImplementedError(
+                    "Cannot {} without namespace, no list_url defined on class {}".format(operation, cls)
+                )
+            return cls._meta.list_url
+        return cls._build_url(name="", namespace=namespace)
+
+    @classmethod
+    def _find_params(cls, name, labels):
         if not labels:
             labels = {"app": Equality(name)}
-        selector = cls._label_selector(labels)
-        resp = cls._client.get(url, params={"labelSelector": selector})
-        return [cls.from_dict(item) for item in resp.json()["items"]]
+        return {"labelSelector": cls._label_selector(labels)}
 
     @classmethod
-    def _list_raw(cls, namespace="default"):
+    def _list_raw(cls, namespace="default", **kwargs):
         """List all resources in given namespace"""
-        if namespace is None:
-            if not cls._meta.list_url:
-                raise NotImplementedError("Cannot list without namespace, no list_url defined on class {}".format(cls))
-            url = cls._meta.list_url
-        else:
-            url = cls._build_url(name="", namespace=namespace)
-        resp = cls._client.get(url)
+        resp = cls._client.get(cls._list_url(namespace), **kwargs)
         return resp
 
     @classmethod
-    def list(cls, namespace="default"):
-        """List all resources in given namespace"""
-        resp = cls._list_raw(namespace=namespace)
-        return [cls.from_dict(item) for item in resp.json()["items"]]
+    def list(cls, namespace="default", labels=None, fields=None):
+        """List all resources in given namespace
+
+        `labels` and `fields` select the resources to list on the server, see :py:meth:`_selector_params`.
+        """
+        return cls.list_with_meta(namespace=namespace, labels=labels, fields=fields).items
 
     @classmethod
-    def list_with_meta(cls, namespace="default"):
+    def list_with_meta(cls, namespace="default", labels=None, fields=None):
         """List all resources in given namespace. Return ModelList"""
-        resp = cls._list_raw(namespace=namespace)
-        return ModelList.from_dict(cls, resp.json())
+        kwargs = {}
+        params = cls._selector_params(labels, fields)
+        if params:
+            kwargs["params"] = params
+        if config.stream_list_responses:
+            resp = cls._list_raw(namespace=namespace, stream=True, **kwargs)
+            with resp:
+                return ModelList.from_stream(cls, resp.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        resp = cls._list_raw(namespace=namespace, **kwargs)
+        return ModelList.from_dict(cls, jsoncodec.decode_response(resp))
 
     @classmethod
-    def watch_list(cls, namespace=None, resource_version=None, allow_bookmarks=False):
+    def iter_list(cls, namespace="default", labels=None, page_size=500, fields=None):
+        """Iterate over all resources in given namespace, fetching at most `page_size` resources per request
+
+        Each page is requested with the continue token of the previous page, so the API server returns every page
+        from the same snapshot of the collection (the resourceVersion of the first page). Only one page of
+        resources is kept in memory at a time. `labels` and `fields` are used to filter resources, as in
+        :py:meth:`list`.
+        """
+        for page in cls._list_pages(namespace=namespace, labels=labels, page_size=page_size, fields=fields):
+            yield from page.items
+
+    @classmethod
+    def _list_pages(cls, namespace="default", labels=None, page_size=500, fields=None):
+        """Yield a ModelList for each page of resources, following the continue token until the last page"""
+        params = {"limit": page_size}
+        params.update(cls._selector_params(labels, fields))
+        while True:
+            resp = cls._list_raw(namespace=namespace, params=params)
+            page = ModelList.from_dict(cls, jsoncodec.decode_response(resp))
+            continue_token = page.metadata._continue
+            yield page
+            if not continue_token:
+                return
+            params = dict(params)
+            params["continue"] = continue_token
+
+    @classmethod
+    def watch_list(cls, namespace=None, resource_version=None, allow_bookmarks=False, labels=None, fields=None,
+                   send_initial_events=False):
         """Return a generator that yields WatchEvents of cls.
         If allowBookmarks is True, WatchBookmarks will also be yielded.
+        `labels` and `fields` select the resources to watch on the server, see :py:meth:`_selector_params`.
+        If `send_initial_events` is True, the API server starts by sending an ADDED event for each existing resource,
+        followed by a WatchBookmark with `initial_events_end` set (streaming list). This requires bookmarks, and is
+        rejected by API servers without the WatchList feature.
+        The object of each event is decoded when it is first read, so an object that can not be decoded raises
+        TypeError or ValueError from `event.object`, instead of the event being discarded.
         It's recommended to use the Watcher class instead of calling this directly,
         since it handles reconnects and resource versions.
         """
         url = cls._watch_list_url(namespace)
-
-        # We don't pass timeoutSeconds to the server, since our timeout is between each event,
-        # while the server will apply the timeout as a maximum time serving the full request,
-        # hanging up regardless of time between events. Let the server decide that timeout.
-        params = {}
-        if resource_version:
-            # As per https://kubernetes.io/docs/reference/using-api/api-concepts/#semantics-for-watch
-            # only resourceVersion is used for watch queries.
-            params["resourceVersion"] = resource_version
-            LOG.info("(Re)starting %s watch at resource version %s", cls.__name__, resource_version)
-        if allow_bookmarks:
-            params["allowWatchBookmarks"] = "true"
-
+        params = cls._watch_list_params(resource_version, allow_bookmarks, labels, fields, send_initial_events)
         try:
             # The timeout here appears to be per call to the poll (or similar) system call,
             # so each time data is received, the timeout will reset.
@@ -176,6 +304,25 @@ class ApiMixIn(object):
                 return
             raise
 
+    @classmethod
+    def _watch_list_params(cls, resource_version, allow_bookmarks, labels=None, fields=None, send_initial_events=False):
+        # We don't pass timeoutSeconds to the server, since our timeout is between each event,
+        # while the server will apply the timeout as a maximum time serving the full request,
+        # hanging up regardless of time between events. Let the server decide that timeout.
+        params = cls._selector_params(labels, fields)
+        if resource_version:
+            # As per https://kubernetes.io/docs/reference/using-api/api-concepts/#semantics-for-watch
+            # only resourceVersion is used for watch queries.
+            params["resourceVersion"] = resource_version
+            LOG.info("(Re)starting %s watch at resource version %s", cls.__name__, resource_version)
+        if allow_bookmarks:
+            params["allowWatchBookmarks"] = "true"
+        if send_initial_events:
+            # The initial events are a consistent snapshot at least as new as resourceVersion, or the latest if unset
+            params["sendInitialEvents"] = "true"
+            params["resourceVersionMatch"] = "NotOlderThan"
+        return params
+
     @classmethod
     def _watch_list_url(cls, namespace):
         """Loads the optionally namespaced url from the class meta"""
@@ -199,7 +346,7 @@ class ApiMixIn(object):
         Raises APIServerError if the line is an error event.
         """
         try:
-            event_json = json.loads(line)
+            event_json = jsoncodec.loads(line)
             if APIServerError.match(event_json):
                 err = APIServerError(event_json["object"])
                 LOG.warning(
@@ -214,12 +361,6 @@ class ApiMixIn(object):
                 LOG.debug("Received watch event from API server: %s", event_json)
                 event = WatchEvent(event_json, cls)
             return event
-        except TypeError:
-            LOG.exception(
-                "Unable to create instance of %s from watch event json, discarding event. event_json=%r",
-                cls.__name__,
-                event_json,
-            )
         except ValueError:
             LOG.exception(
                 "Unable to parse JSON on watch event, discarding event. Line: %r",
@@ -232,7 +373,7 @@ class ApiMixIn(object):
         """Get from API server if it exists"""
         url = cls._build_url(name=name, namespace=namespace)
         resp = cls._client.get(url)
-        instance = cls.from_dict(resp.json())
+        instance = cls.from_dict(jsoncodec.decode_response(resp))
         return instance
 
     @classmethod
@@ -255,29 +396,166 @@ class ApiMixIn(object):
 
     @classmethod
     def delete_list(cls, namespace="default", labels=None, delete_options=None, **kwargs):
+        url, body, params = cls._delete_list_request(namespace, labels, delete_options)
+        cls._client.delete(url, body=body, params=params, **kwargs)
+
+    @classmethod
+    def _delete_list_request(cls, namespace, labels, delete_options):
         selector = cls._label_selector(labels)
         url = cls._build_url(name="", namespace=namespace)
         if delete_options:
             delete_options = delete_options.as_dict()
+        return url, delete_options, {"labelSelector": selector}
+
+    def save(self, patch=False):
+        """Save to API server, either update if existing, or create if new
 
-        cls._client.delete(url, body=delete_options, params={"labelSelector": selector}, **kwargs)
+        If `patch` is True, an existing resource is updated with a JSON merge patch containing only the fields
+        changed since it was loaded (see :py:meth:`~k8s.base.Model.changed_fields`). The patch includes the
+        resourceVersion of the instance, so the update fails with a conflict if the resource was modified since.
+        """
+        method, url, body = self._save_request(patch)
+        resp = getattr(self._client, method)(url, body)
+        self._new = False
+        self.update_from_dict(jsoncodec.decode_response(resp))
 
-    def save(self):
-        """Save to API server, either update if existing, or create if new"""
+    def _save_request(self, patch):
+        """Return the name of the client method, the URL and the body used to save this instance"""
         if self._new:
-            url = self._build_url(name="", namespace=self.metadata.namespace)
-            resp = self._client.post(url, self.as_dict())
-            self._new = False
+            return "post", self._build_url(name="", namespace=self.metadata.namespace), self.as_dict()
+        url = self._build_url(name=self.metadata.name, namespace=self.metadata.namespace)
+        if patch:
+            return "patch", url, self._patch_with_precondition()
+        return "put", url, self.as_dict()
+
+    def save_status(self, patch=False):
+        """Save status to API server, always updating
+
+        If `patch` is True, only the changed fields are sent, as for :py:meth:`save`.
+        """
+        url = self._build_url(name=self.metadata.name, namespace=self.metadata.namespace) + "/status"
+        if patch:
+            resp = self._client.patch(url, self._patch_with_precondition())
         else:
-            url = self._build_url(name=self.metadata.name, namespace=self.metadata.namespace)
             resp = self._client.put(url, self.as_dict())
-        self.update_from_dict(resp.json())
+        self.update_from_dict(jsoncodec.decode_response(resp))
 
-    def save_status(self):
-        """Save status to API server, always updating"""
-        url = self._build_url(name=self.metadata.name, namespace=self.metadata.namespace) + "/status"
-        resp = self._client.put(url, self.as_dict())
-        self.update_from_dict(resp.json())
+    def apply(self, field_manager, force=False):
+        """Create or update the resource in a single request, using server-side apply
+
+        The fields set on this instance are sent to the API server, which merges them with the current state of the
+        resource, and records `field_manager` as the owner of the fields. If another manager owns any of the fields
+        the request fails with a conflict, unless `force` is True.
+        """
+        url = self._build_url(name=self.metadata.name, namespace=self.metadata.namespace)
+        body = self.as_dict() or {}
+        body.setdefault("apiVersion", self._meta.api_version)
+        body.setdefault("kind", self._meta.kind)
+        params = {"fieldManager": field_manager}
+        if force:
+            params["force"] = "true"
+        # JSON is valid YAML, so the body is sent as is
+        resp = self._client.patch(url, body, content_type="application/apply-patch+yaml", params=params)
+        self._new = False
+        self.update_from_dict(jsoncodec.decode_response(resp))
+
+    # Asyncio variants of the methods above, which must be awaited from a running event loop.
+    # They require the `async` extra, see :py:mod:`k8s.asyncclient`.
+
+    @classmethod
+    async def close_async_client(cls):
+        """Close the aiohttp session used by the `*_async` methods, which is shared by all models
+
+        Await it before the event loop is closed.
+        """
+        await cls._async_client.close()
+
+    @classmethod
+    async def get_async(cls, name, namespace="default"):
+        """Get from API server if it exists"""
+        url = cls._build_url(name=name, namespace=namespace)
+        resp = await cls._async_client.get(url)
+        return cls.from_dict(jsoncodec.decode_response(resp))
+
+    @classmethod
+    async def find_async(cls, name="", namespace="default", labels=None):
+        """Find resources using label selection, see :py:meth:`find`"""
+        url = cls._list_url(namespace, "find")
+        resp = await cls._async_client.get(url, params=cls._find_params(name, labels))
+        return await _decode_items_async(cls, jsoncodec.decode_response(resp)["items"])
+
+    @classmethod
+    async def list_async(cls, namespace="default", labels=None, fields=None):
+        """List all resources in given namespace"""
+        return (await cls.list_with_meta_async(namespace=namespace, labels=labels, fields=fields)).items
+
+    @classmethod
+    async def list_with_meta_async(cls, namespace="default", labels=None, fields=None):
+        """List all resources in given namespace. Return ModelList"""
+        params = cls._selector_params(labels, fields)
+        resp = await cls._async_client.get(cls._list_url(namespace), params=params)
+        data = jsoncodec.decode_response(resp)
+        items = await _decode_items_async(cls, data.get("items", []))
+        return ModelList(ListMeta.from_dict(data.get("metadata", {})), items)
+
+    @classmethod
+    async def watch_list_async(cls, namespace=None, resource_version=None, allow_bookmarks=False, labels=None,
+                               fields=None, send_initial_events=False):
+        """Return an async generator that yields WatchEvents of cls, see :py:meth:`watch_list`"""
+        url = cls._watch_list_url(namespace)
+        params = cls._watch_list_params(resource_version, allow_bookmarks, labels, fields, send_initial_events)
+        try:
+            async for line in cls._async_client.stream_lines(url, timeout=config.stream_timeout, params=params):
+                event = cls._parse_watch_event(line) if line else None
+                if event:
+                    yield event
+        except asyncio.TimeoutError:
+            # No events received for the timeout period, which might not be an error, just a quiet period.
+            LOG.info(
+                "Read timeout while waiting for new %s events.",
+                cls.__name__,
+            )
+
+    @classmethod
+    async def delete_async(cls, name, namespace="default", **kwargs):
+        """Delete the named resource"""
+        url = cls._build_url(name=name, namespace=namespace)
+        await cls._async_client.delete(url, **kwargs)
+
+    @classmethod
+    async def delete_list_async(cls, namespace="default", labels=None, delete_options=None, **kwargs):
+        url, body, params = cls._delete_list_request(namespace, labels, delete_options)
+        await cls._async_client.delete(url, body=body, params=params, **kwargs)
+
+    async def save_async(self, patch=False):
+        """Save to API server, either update if existing, or create if new, see :py:meth:`save`"""
+        method, url, body = self._save_request(patch)
+        resp = await getattr(self._async_client, method)(url, body)
+        self._new = False
+        self.update_from_dict(jsoncodec.decode_response(resp))
+
+    def _patch_with_precondition(self):
+        body = self._merge_patch()
+        resource_version = self.metadata.resourceVersion
+        if resource_version:
+            body.setdefault("metadata", {})["resourceVersion"] = resource_version
+        return body
+
+    @classmethod
+    def _selector_params(cls, labels, fields):
+        """Build the labelSelector and fieldSelector parameters, for the selectors that are set
+
+        `labels` is a dict or list of (key, value) tuples as described in :py:meth:`_label_selector`, or a
+        :py:class:`~k8s.selector.Selector`. `fields` has the same form, with field paths such as `spec.nodeName` as
+        keys. The API server only supports :py:class:`~k8s.base.Equality` and :py:class:`~k8s.base.Inequality` for
+        fields, and only some fields of each resource.
+        """
+        params = {}
+        if labels:
+            params["labelSelector"] = cls._label_selector(labels)
+        if fields:
+            params["fieldSelector"] = cls._label_selector(fields)
+        return params
 
     @staticmethod
     def _label_selector(labels):
@@ -304,12 +582,15 @@ class ApiMixIn(object):
         Operations that takes no value:
 
             - :py:class:`~k8s.base.Exists`
+            - :py:class:`~k8s.base.DoesNotExist`
         """
 
+        # A Selector is a list of (key, LabelSelector) tuples
+        labels = getattr(labels, "requirements", labels)
         if hasattr(labels, "items"):
             labels = sorted(labels.items(), key=lambda kv: kv[0])
 
-        return ",".join("{}{}".format(k, v if isinstance(v, LabelSelector) else Equality(v)) for k, v in labels)
+        return ",".join((v if isinstance(v, LabelSelector) else Equality(v)).format(k) for k, v in labels)
 
 
 class Model(metaclass=MetaModel):
@@ -318,37 +599,38 @@ class Model(metaclass=MetaModel):
     Contains fields for each attribute in the API specification, and methods for export/import.
     """
 
+    # The fields changed since the instance was created, loaded or saved, mapped to their value before the change
+    _changed = None
+
     def __init__(self, new=True, **kwargs):
         self._new = new
-        self._values = {}
+        self._values = self._meta.compact_values() if config.compact_storage else {}
         kwarg_names = set(kwargs.keys())
         for field in self._meta.fields:
             kwarg_names.discard(field.name)
             field.set(self, kwargs)
-            if field.type == SelfModel:
-                field.type = self.__class__
-                field.default_value_create_instance = False
         if kwarg_names:
             raise TypeError(
                 "{}() got unexpected keyword-arguments: {}".format(self.__class__.__name__, ", ".join(kwarg_names))
             )
+        self._changed = None
         if self._new:
             self._validate_fields()
 
+    @classmethod
+    def _get_codec(cls):
+        codec = cls._codec
+        if codec is None:
+            codec = cls._codec = _Codec(cls)
+        return codec
+
     def _validate_fields(self):
-        for field in self._meta.fields:
+        for field in self._get_codec().validated_fields:
             if not field.is_valid(self):
                 raise TypeError("Value of field {} is not valid on {}".format(field.name, self))
 
     def as_dict(self):
-        if all(getattr(self, field.attr_name) == field.default_value for field in self._meta.fields):
-            return None
-        d = {}
-        for field in self._meta.fields:
-            value = field.dump(self)
-            if value is not None:
-                d[_api_name(field.name)] = value
-        return d
+        return self._get_codec().dump(self)
 
     def merge(self, other):
         """
@@ -361,17 +643,58 @@ class Model(metaclass=MetaModel):
 
     update = merge  # For backwards compatibility
 
-    def update_from_dict(self, d):
+    def changed_fields(self):
+        """Return the names of the fields assigned since this instance was created, loaded or saved
+
+        A field holding a model, or a list of models, is also changed when any field of those models was changed.
+        Changes made in place to lists and dicts are not tracked.
+        """
+        changed = set(self._changed or ())
         for field in self._meta.fields:
-            field.load(self, d.get(_api_name(field.name)))
+            if field.attr_name not in changed and _has_changes(self._values.get(field.name)):
+                changed.add(field.attr_name)
+        return changed
+
+    def update_from_dict(self, d):
+        self._get_codec().load(self, d)
         self._validate_fields()
 
     @classmethod
     def from_dict(cls, d):
-        instance = cls(new=False)
-        instance.update_from_dict(d)
+        codec = cls._get_codec()
+        if codec.direct_from_dict:
+            instance = cls.__new__(cls)
+            instance._new = False
+            codec.load_new(instance, d)
+        else:
+            instance = cls(new=False)
+            instance.update_from_dict(d)
         return instance
 
+    def _merge_patch(self):
+        """Return a JSON merge patch (RFC 7386) with the changes made since this instance was created, loaded or saved
+
+        Nested models are patched field by field, while lists are always replaced in full, as the format requires.
+        Keys removed from dicts are set to None, so they are removed on the server as well.
+        """
+        changed = self._changed or {}
+        patch = {}
+        for field in self._meta.fields:
+            value = self._values.get(field.name)
+            if field.attr_name in changed:
+                original = changed[field.attr_name]
+                # A model assigned over another model is merged into it, so patch the fields changed by the merge
+                if original is not value or not isinstance(value, Model):
+                    patch[_api_name(field.name)] = _dict_patch(original, field.dump(self))
+                    continue
+            elif not _has_changes(value):
+                continue
+            if isinstance(value, Model):
+                patch[_api_name(field.name)] = value._merge_patch()
+            else:
+                patch[_api_name(field.name)] = field.dump(self)
+        return patch
+
     def __repr__(self):
         return "{}({})".format(
             self.__class__.__name__,
@@ -389,6 +712,97 @@ def _api_name(name):
     return name[1:] if name.startswith("_") else name
 
 
+def _dict_patch(original, dumped):
+    """Return the merge patch for dumped, setting keys only found in original to None"""
+    if not isinstance(original, dict) or not isinstance(dumped, dict):
+        return dumped
+    patch = {key: None for key in original if key not in dumped}
+    for key, value in dumped.items():
+        if key not in original or original[key] != value:
+            patch[key] = _dict_patch(original.get(key), value)
+    return patch
+
+
+def _has_changes(value):
+    if isinstance(value, list):
+        return any(_has_changes(v) for v in value)
+    try:
+        return bool(value.changed_fields())
+    except AttributeError:
+        return False
+
+
+class _Codec(object):
+    """Decoder and encoder for a Model class, compiled from its fields the first time it is needed
+
+    Each field is asked for specialized functions converting single values (see `Field._decoder` and
+    `Field._encoder`), so `from_dict` and `as_dict` become a single pass over the fields. Fields with
+    customized behavior get None, and are handled through their `load` and `dump` methods as before.
+    """
+
+    def __init__(self, model):
+        self.decoders = []
+        self.loaded_fields = []
+        self.encoders = []
+        for field in model._meta.fields:
+            api_name = _api_name(field.name)
+            decoder = field._decoder()
+            if decoder is None:
+                self.loaded_fields.append((field, api_name))
+            else:
+                self.decoders.append((field.name, api_name, decoder))
+            self.encoders.append((field, api_name, field._encoder()))
+        self.validated_fields = [f for f in model._meta.fields if type(f).is_valid is not Field.is_valid]
+        # Skipping __init__ in from_dict is only equivalent if the model uses the default implementations
+        self.direct_from_dict = (
+            model.__init__ is Model.__init__
+            and model.update_from_dict is Model.update_from_dict
+            and model._validate_fields is Model._validate_fields
+        )
+
+    def load(self, instance, d):
+        values = instance._values
+        for name, api_name, decode in self.decoders:
+            values[name] = decode(d.get(api_name))
+        for field, api_name in self.loaded_fields:
+            field.load(instance, d.get(api_name))
+        instance._changed = None
+
+    def load_new(self, instance, d):
+        """Load d into an instance created without calling __init__, and validate it"""
+        if config.compact_storage:
+            values = instance._values = instance._meta.compact_values()
+            for name, api_name, decode in self.decoders:
+                values[name] = decode(d.get(api_name))
+        else:
+            instance._values = {name: decode(d.get(api_name)) for name, api_name, decode in self.decoders}
+        for field, api_name in self.loaded_fields:
+            # set the default first, as __init__ would have done
+            field.set(instance, {})
+            field.load(instance, d.get(api_name))
+        if instance._changed is not None:
+            instance._changed = None
+        instance._validate_fields()
+
+    def dump(self, instance):
+        values = instance._values
+        all_default = True
+        dumped_values = []
+        for field, api_name, encode in self.encoders:
+            value = values.get(field.name, _MISSING) if encode is not None else _MISSING
+            if value is _MISSING:
+                is_default = getattr(instance, field.attr_name) == field.default_value
+                dumped = field.dump(instance)
+            else:
+                dumped, is_default = encode(value)
+            if not is_default:
+                all_default = False
+            dumped_values.append((api_name, dumped))
+        if all_default:
+            return None
+        return {api_name: dumped for api_name, dumped in dumped_values if dumped is not None}
+
+
 class WatchBaseEvent(ABC):
     """Abstract base class for Watch events.
     Contains the resource version of the event as property resource_version."""
@@ -409,6 +823,13 @@ class WatchBaseEvent(ABC):
 
 
 class WatchEvent(WatchBaseEvent):
+    """A change to an object, with the `type` of change and the changed `object`
+
+    For events received from the API server, `object` is decoded when it is first read, so events discarded based on
+    `raw_metadata` are never decoded. An object that can not be decoded raises TypeError or ValueError when `object`
+    is read.
+    """
+
     ADDED = "ADDED"
     MODIFIED = "MODIFIED"
     DELETED = "DELETED"
@@ -417,18 +838,40 @@ class WatchEvent(WatchBaseEvent):
         if event_json is not None and cls is not None:
             super(WatchEvent, self).__init__(event_json=event_json)
             self.type = event_json["type"]
-            self.object = cls.from_dict(event_json["object"])
+            self._raw = event_json["object"]
+            self._cls = cls
+            self._object = None
         elif _type is not None and _object is not None:
             # resource_version is effectively optional here to match the behavior for event_json in WatchBaseEvent
             # in practice, watch events with None resourceVersion will break the caching in Watcher.watch()
             resource_version = getattr(getattr(_object, "metadata", None), "resourceVersion", None)
             super(WatchEvent, self).__init__(resource_version=resource_version)
             self.type = _type
-            self.object = _object
+            self._raw = None
+            self._object = _object
         else:
             raise ValueError("requires either event_json and cls or _type and _object, " +
                              f"got {event_json=}, {cls=}, {_type=}, {_object=}")
 
+    @property
+    def object(self):
+        if self._raw is not None:
+            self._object = self._cls.from_dict(self._raw)
+            self._raw = None
+        return self._object
+
+    @object.setter
+    def object(self, value):
+        self._raw = None
+        self._object = value
+
+    @property
+    def raw_metadata(self) -> dict:
+        """The metadata of the object as a dict, as received from the API server if the object is not decoded yet"""
+        if self._raw is not None:
+            return self._raw.get("metadata") or {}
+        return self._object.metadata.as_dict() or {}
+
     def __repr__(self):
         return "{cls}(type={type}, object={object})".format(
             cls=self.__class__.__name__, type=self.type, object=self.object
@@ -446,12 +889,38 @@ class SyntheticAddedWatchEvent(WatchEvent):
         super(SyntheticAddedWatchEvent, self).__init__(_type=WatchEvent.ADDED, _object=obj)
 
 
+class SyntheticModifiedWatchEvent(WatchEvent):
+    """An object changed while the watch was disconnected"""
+
+    def __init__(self, obj: Model):
+        super(SyntheticModifiedWatchEvent, self).__init__(_type=WatchEvent.MODIFIED, _object=obj)
+
+
+class SyntheticDeletedWatchEvent(WatchEvent):
+    """An object was deleted while the watch was disconnected
+
+    The final state of the object is unknown, so the object only has name, namespace and the last seen
+    resourceVersion in its metadata.
+    """
+
+    def __init__(self, obj: Model):
+        super(SyntheticDeletedWatchEvent, self).__init__(_type=WatchEvent.DELETED, _object=obj)
+
+
 class WatchBookmark(WatchBaseEvent):
     """Bookmark events, if enabled, are sent periodically by the API server.
-    They only contain the resourceVersion of the event."""
+    They only contain the resourceVersion of the event.
+
+    When the watch was started with `send_initial_events`, a bookmark with `initial_events_end` set follows the
+    events for the existing resources."""
+
+    #: Annotation marking the bookmark sent after the initial events
+    INITIAL_EVENTS_END = "k8s.io/initial-events-end"
 
     def __init__(self, event_json):
         super(WatchBookmark, self).__init__(event_json)
+        annotations = event_json["object"].get("metadata", {}).get("annotations") or {}
+        self.initial_events_end = annotations.get(self.INITIAL_EVENTS_END) == "true"
 
     @classmethod
     def match(cls, event_json):
@@ -473,14 +942,28 @@ class LabelSelector(object):
     def __str__(self):
         return "{}{}".format(self.operator, self.value)
 
+    def format(self, key):
+        """The requirement on key, as used in the labelSelector parameter"""
+        return "{}{}".format(key, self)
+
+    def matches(self, labels, key):
+        """Check if the label key in the dict labels satisfies this requirement"""
+        raise NotImplementedError()
+
 
 class Equality(LabelSelector):
     operator = "="
 
+    def matches(self, labels, key):
+        return labels.get(key) == self.value
+
 
 class Inequality(LabelSelector):
     operator = "!="
 
+    def matches(self, labels, key):
+        return labels.get(key) != self.value
+
 
 class LabelSetSelector(LabelSelector):
     def __str__(self):
@@ -490,10 +973,16 @@ class LabelSetSelector(LabelSelector):
 class In(LabelSetSelector):
     operator = "in"
 
+    def matches(self, labels, key):
+        return key in labels and labels[key] in self.value
+
 
 class NotIn(LabelSetSelector):
     operator = "notin"
 
+    def matches(self, labels, key):
+        return key not in labels or labels[key] not in self.value
+
 
 class Exists(LabelSelector):
     def __init__(self):
@@ -502,6 +991,23 @@ class Exists(LabelSelector):
     def __str__(self):
         return ""
 
+    def matches(self, labels, key):
+        return key in labels
+
+
+class DoesNotExist(LabelSelector):
+    def __init__(self):
+        super(DoesNotExist, self).__init__("")
+
+    def __str__(self):
+        return ""
+
+    def format(self, key):
+        return "!{}".format(key)
+
+    def matches(self, labels, key):
+        return key not in labels
+
 
 class SelfModel:
     """
@@ -557,5 +1063,117 @@ class ModelList:
     @classmethod
     def from_dict(cls, model_cls: type[Model], list_response_data: Dict):
         metadata = ListMeta.from_dict(list_response_data.get('metadata', {}))
-        items = [model_cls.from_dict(item) for item in list_response_data.get('items', [])]
+        items = _decode_items(model_cls, list_response_data.get('items', []))
         return cls(metadata, items)
+
+    @classmethod
+    def from_stream(cls, model_cls: type[Model], chunks: Iterable[bytes]):
+        """Decode a list response from chunks of bytes, building each item as soon as it has been received
+
+        Unlike `from_dict`, the complete response is never held in memory, only the items built so far.
+        """
+        metadata = {}
+        items = []
+        for key, value in iter_object(chunks, "items"):
+            if key == "items":
+                items.append(model_cls.from_dict(value))
+            elif key == "metadata":
+                metadata = value
+        return cls(ListMeta.from_dict(metadata), items)
+
+
+def _decode_items(model_cls, items):
+    """Build instances of model_cls from a list of dicts, in order
+
+    If `config.decode_executor` is set, and there are at least `config.decode_threshold` items, the items are split in
+    batches which are decoded in the executor. With a ProcessPoolExecutor, this uses several CPUs for large lists.
+    The models are pickled to return them from the worker processes, so the worker processes must be able to import
+    model_cls, and use their own `config`.
+    """
+    executor = config.decode_executor
+    if executor is None or len(items) < config.decode_threshold:
+        return _decode_batch(model_cls, items)
+    batches = executor.map(_decode_pickled_batch, itertools.repeat(model_cls), _batches(items, executor))
+    return [model for batch in batches for model in _load_batch(batch)]
+
+
+async def _decode_items_async(model_cls, items):
+    """Build instances of model_cls from a list of dicts, in order, like :py:func:`_decode_items`
+
+    The event loop keeps running while the batches are decoded in the executor, and between loading two batches.
+    """
+    executor = config.decode_executor
+    if executor is None or len(items) < config.decode_threshold:
+        return _decode_batch(model_cls, items)
+    loop = asyncio.get_running_loop()
+    futures = [loop.run_in_executor(executor, _decode_pickled_batch, model_cls, batch)
+               for batch in _batches(items, executor)]
+    models = []
+    try:
+        for future in futures:
+            models.extend(_load_batch(await future))
+    finally:
+        for future in futures:
+            future.cancel()
+    return models
+
+
+def _batches(items, executor):
+    """Split items in DECODE_BATCHES_PER_WORKER batches for each worker of executor"""
+    # The standard executors do not expose the number of workers, and default to about one per CPU
+    workers = getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+    batch_size = -(-len(items) // (workers * DECODE_BATCHES_PER_WORKER))
+    return (items[i:i + batch_size] for i in range(0, len(items), batch_size))
+
+
+def _decode_batch(model_cls, items):
+    return [model_cls.from_dict(item) for item in items]
+
+
+def _decode_pickled_batch(model_cls, items):
+    """Decode a batch in a worker, and pickle it there, so the caller decides how the models are unpickled
+
+    The models are thrown away once pickled, so there is no point in collecting garbage before that.
+    """
+    with _GC_PAUSE:
+        return pickle.dumps(_decode_batch(model_cls, items), pickle.HIGHEST_PROTOCOL)
+
+
+def _load_batch(data):
+    """Unpickle a batch of models returned by :py:func:`_decode_pickled_batch`
+
+    Unpickling creates objects faster than anything else, and every few hundred new objects the garbage collector
+    walks the young objects, and ever more often the older ones, none of which are garbage. That makes unpickling the
+    models cost about as much as decoding them, unless collection is paused. The pause only covers a single batch,
+    never waiting on the executor.
+    """
+    with _GC_PAUSE:
+        return pickle.loads(data)
+
+
+class _GcPause(object):
+    """Context manager pausing garbage collection, which may be entered by several threads at once
+
+    Collection is enabled again when the last thread leaves, unless it was already disabled when the first entered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._was_enabled = False
+
+    def __enter__(self):
+        with self._lock:
+            if self._depth == 0:
+                self._was_enabled = gc.isenabled()
+                gc.disable()
+            self._depth += 1
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0 and self._was_enabled:
+                gc.enable()
+
+
+_GC_PAUSE = _GcPause()
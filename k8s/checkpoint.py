@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checkpoints of the state of a :py:class:`~k8s.watcher.Watcher`, so a restarted process can resume its watch
+
+A checkpoint holds the resourceVersion the watch had reached, and the resourceVersion of every object that existed
+at that point. With it, a new Watcher resumes the watch where the previous one was, instead of listing all objects.
+If the resourceVersion has expired in the meantime, the Watcher lists the objects, and yields only the differences
+from the checkpoint.
+
+Each checkpoint is saved under a scope, identifying the resource and selectors that were watched. A checkpoint from
+a different scope is ignored.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+class FileCheckpoint(object):
+    """Keep the checkpoint of one watch in a JSON file
+
+    The file is replaced atomically on each save, so a crash never leaves a partial checkpoint.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, scope):
+        """Return (resource_version, known) saved for scope, or None"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.get("scope") != scope:
+            return None
+        return data["resourceVersion"], _known_from_list(data["known"])
+
+    def save(self, scope, resource_version, known):
+        data = {"scope": scope, "resourceVersion": resource_version, "known": _known_to_list(known)}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class SqliteCheckpoint(object):
+    """Keep checkpoints in an sqlite database, which can be shared by all watches in a process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint "
+                "(scope TEXT PRIMARY KEY, resource_version TEXT NOT NULL, known TEXT NOT NULL)"
+            )
+
+    def load(self, scope):
+        """Return (resource_version, known) saved for scope, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT resource_version, known FROM checkpoint WHERE scope = ?", (scope,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], _known_from_list(json.loads(row[1]))
+
+    def save(self, scope, resource_version, known):
+        known_json = json.dumps(_known_to_list(known))
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoint (scope, resource_version, known) VALUES (?, ?, ?)",
+                (scope, resource_version, known_json)
+            )
+
+    def close(self):
+        self._connection.close()
+
+
+def _known_to_list(known):
+    return [[name, namespace, resource_version] for (name, namespace), resource_version in known.items()]
+
+
+def _known_from_list(rows):
+    return {(name, namespace): resource_version for name, namespace, resource_version in rows}
@@ -22,7 +22,7 @@ from requests import RequestException
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
-from . import config
+from . import config, jsoncodec
 
 LOG = logging.getLogger(__name__)
 LOG.addHandler(logging.NullHandler())
@@ -120,8 +120,16 @@ class Client(object):
     def put(self, url, body, timeout=config.timeout):
         return self._call("PUT", url, body, timeout=timeout)
 
+    def patch(self, url, body, timeout=config.timeout, content_type="application/merge-patch+json", **kwargs):
+        return self._call("PATCH", url, body, timeout=timeout, headers={"Content-Type": content_type}, **kwargs)
+
     def _call(self, method, url, body=None, timeout=config.timeout, **kwargs):
         self.init_session()
+        if body is not None and not jsoncodec.uses_stdlib():
+            kwargs["data"] = jsoncodec.dumps(body)
+            kwargs["headers"] = dict(kwargs.get("headers") or {})
+            kwargs["headers"].setdefault("Content-Type", "application/json")
+            body = None
         resp = self._session.request(method, config.api_server + url, json=body, timeout=timeout, **kwargs)
         if config.debug and not kwargs.get('stream', False):
             message = ['{:d} for url: {:s}'.format(resp.status_code, resp.url)]
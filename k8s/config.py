@@ -51,6 +51,21 @@ timeout = 20
 stream_timeout = 270
 #: Default size of Watcher cache. If you expect a lot of events, you might want to increase this.
 watcher_cache_size = 1000
+#: Store field values of models in generated slotted objects instead of dicts, trading some speed for memory
+compact_storage = False
+#: Decode list responses incrementally while they are received, instead of reading the whole response first.
+#: This bounds the memory used by large lists to the models built, at some cost in speed.
+stream_list_responses = False
+#: Library used to encode and decode JSON: "json" (the standard library), "orjson" or "ujson".
+#: The faster libraries must be installed separately. If the library is missing, the standard library is used.
+json_backend = "json"
+#: Executor used to decode the items of large list responses in parallel, usually a
+#: :py:class:`concurrent.futures.ProcessPoolExecutor`. None decodes them in the calling thread.
+#: The calling thread still pickles the items and unpickles the models, which takes about half as long as decoding,
+#: so this only helps with at least two CPUs to spare for the workers.
+decode_executor = None
+#: Lists with fewer items than this are decoded in the calling thread, even with a `decode_executor`
+decode_threshold = 1000
 
 
 # disables bandit warning for this line which triggers because the string contains 'token', which is fine
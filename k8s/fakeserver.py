@@ -0,0 +1,637 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A fake Kubernetes API server, running in a background thread, for load testing and benchmarks
+
+The server keeps resources in memory, and serves the URL shapes used by the models (see the `Meta` of each model):
+
+- list, with `labelSelector`, `fieldSelector`, `limit` and `continue`
+- get, create (POST), replace (PUT), merge patch and server-side apply (PATCH), delete and delete collection
+- the `status` subresource
+- watch, either with a `/watch/` URL or `?watch=true`, with bookmarks and `410 Gone` for expired resourceVersions
+- streaming lists (`sendInitialEvents`), ending the initial events with a bookmark annotated
+  `k8s.io/initial-events-end`
+
+Usage::
+
+    with FakeApiServer() as server:
+        config.api_server = server.url
+        ...
+
+Only the behavior the library depends on is implemented. Resources are not validated, and the fields set by
+the server are limited to uid, resourceVersion, generation and creationTimestamp in `metadata`.
+"""
+
+import base64
+import copy
+import itertools
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+#: Default number of events kept for resuming watches. Watches from older resourceVersions get 410 Gone.
+DEFAULT_HISTORY_SIZE = 10000
+
+
+class FakeApiServer(object):
+    """In-memory fake of the Kubernetes API server, listening on a local port
+
+    :param int port: port to listen on, the default picks a free port
+    :param int history_size: number of events kept for resuming watches
+    :param float bookmark_interval: seconds between bookmarks on watches that allow them
+    :param float watch_timeout: seconds before the server ends a watch, unless the client sets `timeoutSeconds`
+    :param bool send_initial_events: support streaming lists, otherwise reject `sendInitialEvents` like servers
+        without the WatchList feature
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, history_size=DEFAULT_HISTORY_SIZE, bookmark_interval=1.0,
+                 watch_timeout=60.0, send_initial_events=True):
+        self.history_size = history_size
+        self.send_initial_events = send_initial_events
+        self.bookmark_interval = bookmark_interval
+        self.watch_timeout = watch_timeout
+        self._condition = threading.Condition()
+        self._resource_version = itertools.count(1)
+        self._last_resource_version = 0
+        self._collections = {}
+        self._events = []
+        # Watches from resourceVersions before this have missed events that are no longer kept
+        self._expired_before = 0
+        self._stopping = False
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.api = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="FakeApiServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def resource_version(self):
+        """The resourceVersion of the latest change"""
+        return str(self._last_resource_version)
+
+    def create(self, url, obj):
+        """Create obj in the collection at url, without going through HTTP. Returns the stored object"""
+        with self._condition:
+            return self._create(_Path.parse(url), obj)
+
+    def objects(self, url):
+        """Return copies of the objects in the collection at url"""
+        path = _Path.parse(url)
+        with self._condition:
+            return [copy.deepcopy(obj) for obj in self._select(path, {})]
+
+    def expire_history(self):
+        """Forget all events so far, so watches resuming from any current resourceVersion get 410 Gone"""
+        with self._condition:
+            self._events = []
+            self._expired_before = self._last_resource_version + 1
+
+    def start_churn(self, url, rate, count=None):
+        """Modify the objects in the collection at url in a background thread, at about `rate` changes per second
+
+        Each change sets an annotation on one object, cycling through the objects in the collection.
+        Stops after `count` changes, or when the returned :py:class:`threading.Event` is set.
+        """
+        stop = threading.Event()
+        path = _Path.parse(url)
+
+        def churn():
+            interval = 1.0 / rate
+            deadline = time.monotonic()
+            for i in itertools.count():
+                if (count is not None and i >= count) or stop.is_set() or self._stopping:
+                    return
+                with self._condition:
+                    objects = self._select(path, {})
+                    if objects:
+                        obj = copy.deepcopy(objects[i % len(objects)])
+                        obj["metadata"].setdefault("annotations", {})["fake-api-server/churn"] = str(i)
+                        self._store(path.for_object(obj), obj, "MODIFIED")
+                deadline += interval
+                stop.wait(max(0.0, deadline - time.monotonic()))
+
+        threading.Thread(target=churn, name="FakeApiServer-churn", daemon=True).start()
+        return stop
+
+    # The methods below must be called with the condition held
+
+    def _next_resource_version(self):
+        self._last_resource_version = next(self._resource_version)
+        return str(self._last_resource_version)
+
+    def _collection(self, path):
+        return self._collections.setdefault(path.collection_key, {})
+
+    def _create(self, path, obj):
+        metadata = obj.setdefault("metadata", {})
+        if not metadata.get("name") and metadata.get("generateName"):
+            metadata["name"] = metadata["generateName"] + uuid.uuid4().hex[:5]
+        if not metadata.get("name"):
+            raise _ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid", "metadata.name: Required value")
+        if path.namespace is None:
+            # Created through a URL without namespace, so the resource is cluster scoped
+            metadata.pop("namespace", None)
+        else:
+            metadata["namespace"] = path.namespace
+        object_path = path.for_object(obj)
+        if object_path.object_key in self._collection(path):
+            raise _ApiError(HTTPStatus.CONFLICT, "AlreadyExists", "{} already exists".format(metadata["name"]))
+        metadata["uid"] = str(uuid.uuid4())
+        metadata["generation"] = 1
+        metadata["creationTimestamp"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return self._store(object_path, obj, "ADDED")
+
+    def _get(self, path):
+        try:
+            return self._collection(path)[path.object_key]
+        except KeyError:
+            raise _ApiError(HTTPStatus.NOT_FOUND, "NotFound", "{} {!r} not found".format(path.plural, path.name))
+
+    def _replace(self, path, obj, subresource=None):
+        current = self._get(path)
+        resource_version = obj.get("metadata", {}).get("resourceVersion")
+        if resource_version and resource_version != current["metadata"]["resourceVersion"]:
+            raise _ApiError(HTTPStatus.CONFLICT, "Conflict",
+                            "the object has been modified; please apply your changes to the latest version")
+        if subresource == "status":
+            new = copy.deepcopy(current)
+            new["status"] = obj.get("status")
+        else:
+            new = obj
+            if "status" in current:
+                new["status"] = current["status"]
+            for key in ("uid", "creationTimestamp", "generation", "name", "namespace"):
+                if key in current["metadata"]:
+                    new.setdefault("metadata", {})[key] = current["metadata"][key]
+            if new.get("spec") != current.get("spec"):
+                new["metadata"]["generation"] = current["metadata"]["generation"] + 1
+        return self._store(path, new, "MODIFIED")
+
+    def _delete(self, path):
+        self._get(path)
+        obj = self._collection(path).pop(path.object_key)
+        obj["metadata"]["resourceVersion"] = self._next_resource_version()
+        self._record("DELETED", path, obj)
+        return obj
+
+    def _store(self, path, obj, event_type):
+        obj["metadata"]["resourceVersion"] = self._next_resource_version()
+        self._collection(path)[path.object_key] = obj
+        self._record(event_type, path, obj)
+        return obj
+
+    def _record(self, event_type, path, obj):
+        self._events.append((int(obj["metadata"]["resourceVersion"]), event_type, path, copy.deepcopy(obj)))
+        if len(self._events) > self.history_size:
+            dropped = self._events[:len(self._events) - self.history_size]
+            del self._events[:len(dropped)]
+            self._expired_before = dropped[-1][0] + 1
+        self._condition.notify_all()
+
+    def _select(self, path, params):
+        """Objects matching path (possibly in all namespaces) and the selectors in params, sorted by key"""
+        selector = _Selector(params)
+        objects = self._collections.get(path.collection_key, {})
+        found = []
+        for key in sorted(objects, key=lambda k: (k[0] or "", k[1])):
+            if path.namespace is not None and key[0] != path.namespace:
+                continue
+            if selector.matches(objects[key]):
+                found.append(objects[key])
+        return found
+
+    def _events_since(self, path, resource_version):
+        return [event for event in self._events if event[0] > resource_version and path.matches(event[2])]
+
+    def _is_expired(self, resource_version):
+        return resource_version < self._expired_before - 1
+
+
+class _Path(object):
+    """The parts of a resource URL: /api/v1 or /apis/<group>/<version>, then [watch/][namespaces/<ns>/]<plural>..."""
+
+    def __init__(self, prefix, namespace, plural, name=None, subresource=None, watch=False):
+        self.prefix = prefix
+        self.namespace = namespace
+        self.plural = plural
+        self.name = name
+        self.subresource = subresource
+        self.watch = watch
+
+    @classmethod
+    def parse(cls, url):
+        parts = [part for part in urlsplit(url).path.split("/") if part]
+        if parts[:1] == ["api"] and len(parts) > 2:
+            prefix, rest = "/".join(parts[:2]), parts[2:]
+        elif parts[:1] == ["apis"] and len(parts) > 3:
+            prefix, rest = "/".join(parts[:3]), parts[3:]
+        else:
+            raise _ApiError(HTTPStatus.NOT_FOUND, "NotFound", "the server could not find the requested resource")
+        watch = rest[0] == "watch"
+        if watch:
+            rest = rest[1:]
+        namespace = None
+        if len(rest) >= 3 and rest[0] == "namespaces":
+            namespace, rest = rest[1], rest[2:]
+        return cls(prefix, namespace, *rest[:3], watch=watch)
+
+    def for_object(self, obj):
+        metadata = obj["metadata"]
+        return _Path(self.prefix, metadata.get("namespace", self.namespace), self.plural, metadata["name"])
+
+    @property
+    def collection_key(self):
+        return self.prefix, self.plural
+
+    @property
+    def object_key(self):
+        return self.namespace, self.name
+
+    def matches(self, other):
+        """True if other is an object in the collection this path refers to"""
+        return (self.collection_key == other.collection_key
+                and (self.namespace is None or self.namespace == other.namespace))
+
+
+class _ApiError(Exception):
+    def __init__(self, code, reason, message):
+        super(_ApiError, self).__init__(message)
+        self.code = code
+        self.reason = reason
+        self.message = message
+
+    def status(self):
+        return {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "metadata": {},
+            "status": "Failure",
+            "message": self.message,
+            "reason": self.reason,
+            "code": int(self.code),
+        }
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing the connection, such as when they stop a watch, are not errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super(_Server, self).handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which would otherwise wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        pass
+
+    @property
+    def api(self):
+        return self.server.api
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def do_PUT(self):
+        self._handle(self._put)
+
+    def do_PATCH(self):
+        self._handle(self._patch)
+
+    def do_DELETE(self):
+        self._handle(self._delete)
+
+    def _handle(self, handler):
+        split = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(split.query).items()}
+        try:
+            path = _Path.parse(split.path)
+            body = self._read_body()
+            if self.command == "GET" and (path.watch or params.get("watch") in ("true", "1")):
+                self._watch(path, params)
+                return
+            with self.api._condition:
+                result = handler(path, params, body)
+            if result is not None:
+                self._send(HTTPStatus.OK if self.command != "POST" else HTTPStatus.CREATED, result)
+        except _ApiError as e:
+            self._send(e.code, e.status())
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise _ApiError(HTTPStatus.BAD_REQUEST, "BadRequest", "invalid JSON in request body")
+
+    def _send(self, code, obj):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _get(self, path, params, _body):
+        if path.name:
+            return self.api._get(path)
+        return self._list(path, params)
+
+    def _list(self, path, params):
+        objects = self.api._select(path, params)
+        resource_version = self.api.resource_version
+        if "continue" in params:
+            token = json.loads(base64.urlsafe_b64decode(params["continue"]))
+            resource_version = token["resourceVersion"]
+            start = tuple(token["start"])
+            objects = [obj for obj in objects if _object_key(obj) >= start]
+        metadata = {"resourceVersion": resource_version}
+        limit = int(params.get("limit") or 0)
+        if limit and len(objects) > limit:
+            token = {"resourceVersion": resource_version, "start": _object_key(objects[limit])}
+            metadata["continue"] = base64.urlsafe_b64encode(json.dumps(token).encode("utf-8")).decode("ascii")
+            metadata["remainingItemCount"] = len(objects) - limit
+            objects = objects[:limit]
+        return {"kind": "List", "apiVersion": "v1", "metadata": metadata, "items": objects}
+
+    def _post(self, path, _params, body):
+        if path.name:
+            raise _ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "MethodNotAllowed", "POST to a named resource")
+        return self.api._create(path, body or {})
+
+    def _put(self, path, _params, body):
+        return self.api._replace(path, body or {}, path.subresource)
+
+    def _patch(self, path, params, body):
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/apply-patch+yaml"):
+            try:
+                current = self.api._get(path)
+            except _ApiError:
+                if path.subresource:
+                    raise
+                return self.api._create(_Path(path.prefix, path.namespace, path.plural), body or {})
+        elif content_type.startswith("application/merge-patch+json"):
+            current = self.api._get(path)
+        else:
+            raise _ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "UnsupportedMediaType",
+                            "the fake API server does not support {}".format(content_type))
+        patched = _merge_patch(copy.deepcopy(current), body or {})
+        return self.api._replace(path, patched, path.subresource)
+
+    def _delete(self, path, params, _body):
+        if path.name:
+            return self.api._delete(path)
+        for obj in self.api._select(path, params):
+            self.api._delete(path.for_object(obj))
+        return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Success"}
+
+    def _watch(self, path, params):
+        """Stream events as chunks, only holding the condition while looking for events"""
+        api = self.api
+        self._check_send_initial_events(params)
+        with api._condition:
+            resource_version, events = self._initial_events(path, params)
+            expired = api._is_expired(resource_version)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._stream_events(path, params, resource_version, events, expired)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        finally:
+            self._write_chunk(b"")
+
+    def _check_send_initial_events(self, params):
+        """Validate a sendInitialEvents request the way the API server does"""
+        if params.get("sendInitialEvents") != "true":
+            return
+        if not self.api.send_initial_events:
+            raise _ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid",
+                            "sendInitialEvents is forbidden for watch unless the WatchList feature gate is enabled")
+        if params.get("allowWatchBookmarks") != "true" or params.get("resourceVersionMatch") != "NotOlderThan":
+            raise _ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid",
+                            "sendInitialEvents requires allowWatchBookmarks and resourceVersionMatch=NotOlderThan")
+
+    def _initial_events(self, path, params):
+        """The resourceVersion to watch from, and the events to send before the events after it
+
+        Must be called holding the condition.
+        """
+        api = self.api
+        if params.get("sendInitialEvents") == "true":
+            events = [("ADDED", obj) for obj in api._select(path, params)]
+            metadata = {"resourceVersion": str(api._last_resource_version),
+                        "annotations": {"k8s.io/initial-events-end": "true"}}
+            events.append(("BOOKMARK", {"kind": path.plural, "metadata": metadata}))
+            return api._last_resource_version, events
+        if params.get("resourceVersion"):
+            return int(params["resourceVersion"]), []
+        return api._last_resource_version, [("ADDED", obj) for obj in api._select(path, params)]
+
+    def _stream_events(self, path, params, resource_version, events, expired):
+        """Send events, then the events after resource_version as they happen, until the watch times out"""
+        selector = _Selector(params)
+        deadline = time.monotonic() + float(params.get("timeoutSeconds") or self.api.watch_timeout)
+        if params.get("allowWatchBookmarks") == "true":
+            next_bookmark = time.monotonic() + self.api.bookmark_interval
+        else:
+            next_bookmark = math.inf
+        while True:
+            if expired:
+                message = "too old resource version: {}".format(resource_version)
+                self._send_event("ERROR", _ApiError(HTTPStatus.GONE, "Expired", message).status())
+                return
+            for event_type, obj in events:
+                self._send_event(event_type, obj)
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now >= next_bookmark:
+                next_bookmark = self._send_bookmark(path, resource_version, now)
+            new_events, expired = self._wait_for_events(path, resource_version, min(deadline, next_bookmark) - now)
+            if new_events is None:
+                return
+            if new_events:
+                resource_version = new_events[-1][0]
+            events = [(event_type, obj) for _, event_type, _, obj in new_events if selector.matches(obj)]
+
+    def _send_bookmark(self, path, resource_version, now):
+        """Send a bookmark at resource_version, returning when to send the next one"""
+        self._send_event("BOOKMARK", {"kind": path.plural, "metadata": {"resourceVersion": str(resource_version)}})
+        return now + self.api.bookmark_interval
+
+    def _wait_for_events(self, path, resource_version, timeout):
+        """Wait up to timeout for events after resource_version
+
+        Returns the events and whether resource_version has expired, or None for the events if the server is stopping.
+        """
+        api = self.api
+        with api._condition:
+            new_events = api._events_since(path, resource_version)
+            if not new_events and not api._stopping:
+                api._condition.wait(timeout)
+                new_events = api._events_since(path, resource_version)
+            if api._stopping:
+                return None, False
+            return new_events, api._is_expired(resource_version)
+
+    def _send_event(self, event_type, obj):
+        self._write_chunk(json.dumps({"type": event_type, "object": obj}).encode("utf-8") + b"\n")
+
+    def _write_chunk(self, data):
+        try:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            if data:
+                raise
+
+
+def _object_key(obj):
+    """The key objects are sorted by in lists"""
+    metadata = obj["metadata"]
+    return metadata.get("namespace") or "", metadata["name"]
+
+
+def _merge_patch(target, patch):
+    """Apply a JSON merge patch (RFC 7386)"""
+    if not isinstance(patch, dict):
+        return patch
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = _merge_patch(target.get(key), value)
+    return target
+
+
+class _Selector(object):
+    """The labelSelector and fieldSelector of a request. Field selectors can use any field, with = and !="""
+
+    def __init__(self, params):
+        self.labels = _parse_label_selector(params.get("labelSelector", ""))
+        self.fields = _parse_label_selector(params.get("fieldSelector", ""))
+
+    def matches(self, obj):
+        if not _matches(self.labels, obj["metadata"].get("labels") or {}):
+            return False
+        return not self.fields or _matches(self.fields, {key: _field_value(obj, key) for key, _, _ in self.fields})
+
+
+def _field_value(obj, path):
+    """The value of the field at a dotted path, as a string, with missing fields as empty strings"""
+    value = obj
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _parse_label_selector(selector):
+    """Parse a labelSelector into a list of (key, operator, values)"""
+    requirements = []
+    for term in _split_terms(selector):
+        if " notin " in term or " in " in term:
+            key, operator, values = term.partition(" notin " if " notin " in term else " in ")
+            values = {v.strip() for v in values.strip().strip("()").split(",")}
+            requirements.append((key.strip(), operator.strip(), values))
+        elif "!=" in term:
+            key, _, value = term.partition("!=")
+            requirements.append((key.strip(), "!=", {value.strip()}))
+        elif "=" in term:
+            key, _, value = term.replace("==", "=").partition("=")
+            requirements.append((key.strip(), "=", {value.strip()}))
+        elif term.startswith("!"):
+            requirements.append((term[1:].strip(), "!", set()))
+        else:
+            requirements.append((term, "exists", set()))
+    return requirements
+
+
+def _split_terms(selector):
+    """Split on commas outside parentheses"""
+    terms, depth, current = [], 0, []
+    for char in selector:
+        if char == "," and depth == 0:
+            terms.append("".join(current).strip())
+            current = []
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current.append(char)
+    terms.append("".join(current).strip())
+    return [term for term in terms if term]
+
+
+def _matches(requirements, labels):
+    for key, operator, values in requirements:
+        if operator in ("=", "in") and labels.get(key) not in values:
+            return False
+        if operator in ("!=", "notin") and labels.get(key) in values:
+            return False
+        if operator == "exists" and key not in labels:
+            return False
+        if operator == "!" and key in labels:
+            return False
+    return True
@@ -17,9 +17,52 @@
 
 import copy
 from datetime import datetime
+from functools import cached_property
 
 import pyrfc3339
 
+# copy.copy returns these unchanged, so defaults of these types can be shared
+_IMMUTABLE_TYPES = (type(None), bool, int, float, str, bytes, tuple, frozenset)
+# _as_dict returns values of these types unchanged
+_PLAIN_TYPES = (type(None), bool, int, float, str, list)
+
+
+def _uses(field, owner, *names):
+    """Check that the class of field uses the implementations found on owner for all names"""
+    field_cls = type(field)
+    return all(getattr(field_cls, name) is getattr(owner, name) for name in names)
+
+
+class _LazyDefault(object):
+    """Stored in place of a default model instance, which is created when the field is first read
+
+    This avoids building a tree of empty models for every unset field. Pickling and copying keep the singleton.
+    Reading the field replaces LAZY_DEFAULT with the created instance, so the first read of an unset field writes to
+    the model. Models are not thread safe, and this write takes no lock: threads sharing a model should not rely on
+    reads leaving it unchanged.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "LAZY_DEFAULT"
+
+    def __reduce__(self):
+        return "LAZY_DEFAULT"
+
+
+LAZY_DEFAULT = _LazyDefault()
+_MISSING = object()
+
+
+def _mark_changed(instance, attr_name, original):
+    """Record that a field was changed, keeping the value it had before the first change"""
+    changed = instance._changed
+    if changed is None:
+        instance._changed = {attr_name: original}
+    elif attr_name not in changed:
+        changed[attr_name] = original
+
 
 class Field(object):
     """Generic field on a k8s model"""
@@ -36,27 +79,51 @@ class Field(object):
         return self._as_dict(value)
 
     def load(self, instance, value):
-        new_value = self._from_dict(value)
+        if value is None and self._lazy_default:
+            new_value = LAZY_DEFAULT
+        else:
+            new_value = self._from_dict(value)
         instance._values[self.name] = new_value
 
     def set(self, instance, kwargs):
-        value = kwargs.get(self.name, self.default_value)
+        try:
+            value = kwargs[self.name]
+        except KeyError:
+            value = LAZY_DEFAULT if self._lazy_default else self.default_value
         self.__set__(instance, value)
 
     def is_valid(self, instance):
         return True
 
     def is_set(self, instance):
-        return instance._values.get(self.name) != self.default_value
+        value = instance._values.get(self.name)
+        if value is LAZY_DEFAULT:
+            return False
+        return value != self.default_value
 
     def __get__(self, instance, obj_type=None):
-        value = instance._values.get(self.name, self.default_value)
+        value = instance._values.get(self.name, _MISSING)
+        if value is _MISSING:
+            return self.default_value
+        if value is LAZY_DEFAULT:
+            # Store the default instance, so changes made to it are kept. See _LazyDefault.
+            value = instance._values[self.name] = self.type(new=False)
         return value
 
     def __set__(self, instance, new_value):
         current_value = instance._values.get(self.name)
+        if current_value is LAZY_DEFAULT:
+            if new_value is LAZY_DEFAULT:
+                return
+            current_value = self.__get__(instance)
+        elif new_value is LAZY_DEFAULT:
+            if current_value is None:
+                instance._values[self.name] = new_value
+                return
+            new_value = self.type(new=False)
         if new_value == current_value:
             return
+        _mark_changed(instance, self.attr_name, current_value)
         if new_value is not None:
             try:
                 current_value.merge(new_value)
@@ -66,14 +133,18 @@ class Field(object):
         instance._values[self.name] = new_value
 
     def __delete__(self, instance):
+        current_value = instance._values[self.name]
         del instance._values[self.name]
+        _mark_changed(instance, self.attr_name, current_value)
 
     @property
     def default_value(self):
-        from .base import Model
-        if issubclass(self.type, Model) and self.default_value_create_instance and self._default_value is None:
+        if self._creates_default_instance:
             return self.type(new=False)
-        return copy.copy(self._default_value)
+        default = self._default_value
+        if type(default) in _IMMUTABLE_TYPES:
+            return default
+        return copy.copy(default)
 
     def _as_dict(self, value):
         try:
@@ -96,11 +167,127 @@ class Field(object):
         try:
             return self.type.from_dict(value)
         except AttributeError:
-            if isinstance(value, self.type) or (self.alt_type and isinstance(value, self.alt_type)):
+            return self._convert(value)
+
+    def _convert(self, value):
+        if isinstance(value, self.type) or (self.alt_type and isinstance(value, self.alt_type)):
+            return value
+        if self.type is datetime:
+            return pyrfc3339.parse(value)
+        return self.type(value)
+
+    @cached_property
+    def _creates_default_instance(self):
+        from .base import Model
+        return (
+            isinstance(self.type, type) and issubclass(self.type, Model)
+            and self.default_value_create_instance and self._default_value is None
+        )
+
+    @cached_property
+    def _lazy_default(self):
+        """Whether the default instance can be stored as LAZY_DEFAULT, which requires the standard get and set"""
+        field_cls = type(self)
+        return (
+            field_cls.__get__ is Field.__get__
+            and field_cls.__set__ in _LAZY_DEFAULT_SETTERS
+            and self._creates_default_instance
+        )
+
+    def _default_factory(self):
+        """Return a function producing the same values as `default_value`"""
+        if self._creates_default_instance:
+            field_type = self.type
+            return lambda: field_type(new=False)
+        default = self._default_value
+        if type(default) in _IMMUTABLE_TYPES:
+            return lambda: default
+        return lambda: copy.copy(default)
+
+    def _decoder(self):
+        """Return a function converting a value from the API to the value `load` would store
+
+        Returns None if `load` is customized, in which case the model has to call `load` itself.
+        """
+        if not _uses(self, Field, "load", "_from_dict", "default_value"):
+            return None
+        if self._lazy_default:
+            return self._value_decoder(lambda: LAZY_DEFAULT)
+        return self._value_decoder(self._default_factory())
+
+    def _value_decoder(self, default):
+        """Return a function equivalent to `_from_dict`, with the type checks resolved ahead of time"""
+        convert = self._convert
+        from_dict = getattr(self.type, "from_dict", None)
+        if from_dict is None:
+            def decode(value):
+                if value is None:
+                    return default()
+                return convert(value)
+        else:
+            def decode(value):
+                if value is None:
+                    return default()
+                try:
+                    return from_dict(value)
+                except AttributeError:
+                    return convert(value)
+        return decode
+
+    def _encoder(self):
+        """Return a function taking a stored value and returning the dumped value and whether it is the default
+
+        Returns None if `dump` or `default_value` is customized, in which case the model has to use those.
+        """
+        if not _uses(self, Field, "dump", "_as_dict", "__get__", "default_value"):
+            return None
+        dump = self._value_dumper()
+        if self._creates_default_instance:
+            return self._model_encoder(dump)
+        default = self._default_value
+
+        def encode(value):
+            return dump(value), value == default
+        return encode
+
+    def _model_encoder(self, dump):
+        """Return the function for `_encoder` for fields defaulting to a model instance, which may be LAZY_DEFAULT"""
+        # Comparing a model to the default instance compares their dicts, so compare to the empty dict directly
+        field_type = self.type
+        empty = field_type(new=False).as_dict()
+
+        def encode(value):
+            if value is LAZY_DEFAULT:
+                if empty is None:
+                    return None, True
+                value = field_type(new=False)
+            try:
+                as_dict = value.as_dict
+            except AttributeError:
+                return dump(value), False
+            try:
+                dumped = as_dict()
+            except AttributeError:
+                return value, False
+            return dumped, dumped == empty
+        return encode
+
+    def _value_dumper(self):
+        """Return a function equivalent to `_as_dict`, skipping the lookup of `as_dict` for plain values"""
+        as_dict = self._as_dict
+        dump_datetime = datetime in (self.type, self.alt_type)
+
+        def dump(value):
+            value_type = type(value)
+            if value_type in _PLAIN_TYPES:
                 return value
-            if self.type is datetime:
-                return pyrfc3339.parse(value)
-            return self.type(value)
+            if value_type is dict:
+                d = {k: v for k, v in value.items() if v is not None}
+                return d if d else None
+            if dump_datetime and value_type is datetime:
+                return pyrfc3339.generate(value, accept_naive=True)
+            return as_dict(value)
+        return dump
 
     def __repr__(self):
         return "{}(name={}, type={}, default_value={}, alt_type={})".format(
@@ -154,6 +341,32 @@ class ListField(Field):
             value = self.default_value
         instance._values[self.name] = [self._from_dict(v) for v in value]
 
+    def _decoder(self):
+        if not _uses(self, ListField, "load") or not _uses(self, Field, "_from_dict", "default_value"):
+            return None
+        decode_item = self._value_decoder(self._default_factory())
+        default = self._default_value
+
+        def decode(value):
+            if value is None:
+                value = default
+            return [decode_item(v) for v in value]
+        return decode
+
+    def _encoder(self):
+        if not _uses(self, ListField, "dump") or not _uses(self, Field, "_as_dict", "__get__", "default_value"):
+            return None
+        dump_item = self._value_dumper()
+        default = self._default_value
+        empty_as_none = self._empty_as_none
+
+        def encode(value):
+            dumped = [dump_item(v) for v in value]
+            if empty_as_none and not dumped:
+                dumped = None
+            return dumped, value == default
+        return encode
+
 
 class RequiredField(Field):
     """Required field must have a value from the start"""
@@ -192,7 +405,10 @@ class JSONField(Field):
 
     def __set__(self, instance, new_value):
         if (new_value is None) or self._check_allowed_types(new_value, chain=[type(instance).__name__, self.name]):
+            current_value = instance._values.get(self.name)
             instance._values[self.name] = new_value
+            if new_value != current_value:
+                _mark_changed(instance, self.attr_name, current_value)
 
     def _check_allowed_types(self, value, chain=None):
         if chain is None:
@@ -219,3 +435,7 @@ class JSONField(Field):
     @property
     def default_value(self):
         return copy.copy(self._default_value)
+
+
+# The implementations of __set__ that handle LAZY_DEFAULT
+_LAZY_DEFAULT_SETTERS = (Field.__set__, ReadOnlyField.__set__, OnceField.__set__)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared informers, which share one watch of a model between any number of consumers in a process
+
+Each informer runs a :py:class:`~k8s.watcher.Watcher` in a background thread. Every event is decoded once, and put
+on the queue of each :py:class:`Subscription`. Subscribers joining later start with a synthetic ADDED event for each
+object the informer knows about, so they see the same state as the first subscriber.
+
+Usage::
+
+    with informer.subscribe(Deployment, namespace="default") as subscription:
+        for event in subscription:
+            ...
+
+All subscribers receive the same event objects, which must not be modified. The objects are also kept in the
+:py:class:`~k8s.store.Store` of the informer, which can be used to look up the current state without requests::
+
+    deployments = informer.get_informer(Deployment)
+    deployments.start()
+    deployments.store.get("my-deployment", "default")
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from . import config
+from .base import SyntheticAddedWatchEvent
+from .store import Store
+from .watcher import Watcher
+
+LOG = logging.getLogger(__name__)
+LOG.addHandler(logging.NullHandler())
+
+#: Default number of events waiting for a subscriber before it is dropped
+DEFAULT_QUEUE_SIZE = 1000
+#: Seconds to wait before restarting a watch that failed
+RETRY_DELAY = 5.0
+
+
+class SubscriptionOverflow(Exception):
+    """The subscriber fell too far behind, and missed events. Subscribe again to get the current state."""
+
+
+class Subscription(object):
+    """A bounded queue of events from a :py:class:`SharedInformer`
+
+    Iterate over the subscription to get events, until it is closed. If more than `queue_size` events are waiting,
+    the subscription is dropped by the informer, and reading from it raises :py:class:`SubscriptionOverflow`.
+    """
+
+    def __init__(self, informer, queue_size):
+        self._informer = informer
+        self._queue_size = queue_size
+        self._events = collections.deque()
+        self._ready = threading.Condition(threading.Lock())
+        self._closed = False
+        self._overflowed = False
+
+    def get(self, timeout=None):
+        """Return the next event, or None if the subscription is closed or no event arrived within `timeout`"""
+        with self._ready:
+            if not self._events and not self._closed:
+                self._ready.wait(timeout)
+            if self._overflowed:
+                raise SubscriptionOverflow("Subscriber to {} missed events".format(self._informer))
+            if self._events:
+                return self._events.popleft()
+            return None
+
+    def close(self):
+        """Stop receiving events"""
+        self._informer._unsubscribe(self)
+        self._close()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _put(self, event, bounded=True):
+        """Add event to the queue, returning False if the queue is full"""
+        with self._ready:
+            if bounded and len(self._events) >= self._queue_size:
+                self._overflowed = True
+                self._closed = True
+                self._ready.notify_all()
+                return False
+            self._events.append(event)
+            self._ready.notify()
+            return True
+
+    def _close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+
+class SharedInformer(object):
+    """Watch model in namespace in a background thread, and pass each event on to all subscribers
+
+    The informer keeps the latest version of every object it has seen in `store`, to replay them to new subscribers.
+    It is started by :py:meth:`start` or the first call to :py:meth:`subscribe`, and stopped by :py:meth:`stop`.
+
+    :param Model model: The model class to watch
+    :param str namespace: The namespace to watch, or None for all namespaces
+    :param labels: Only watch objects matching this label selector, see :py:meth:`~k8s.base.ApiMixIn.list`
+    :param fields: Only watch objects matching this field selector
+    :param int capacity: How many seen objects the watcher keeps track of
+    :param dict indexers: secondary indexes for the store, see :py:class:`~k8s.store.Store`
+    """
+
+    def __init__(self, model, namespace=None, labels=None, fields=None, capacity=None, indexers=None):
+        self._model = model
+        self._namespace = namespace
+        self._labels = labels
+        self._fields = fields
+        self._watcher = Watcher(model, capacity if capacity is not None else config.watcher_cache_size)
+        self._lock = threading.Lock()
+        self._subscriptions = []
+        self.store = Store(indexers)
+        self._thread = None
+        self._stopped = False
+
+    def subscribe(self, queue_size=DEFAULT_QUEUE_SIZE):
+        """Return a new :py:class:`Subscription`, which starts with an ADDED event for each known object"""
+        subscription = Subscription(self, queue_size)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("{} is stopped".format(self))
+            for obj in self.store.list():
+                subscription._put(SyntheticAddedWatchEvent(obj), bounded=False)
+            self._subscriptions.append(subscription)
+            self._start()
+        return subscription
+
+    def start(self):
+        """Start watching, to keep the store up to date without subscribers"""
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("{} is stopped".format(self))
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=str(self), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Close all subscriptions, and stop watching
+
+        The watch is closed when the next event arrives or the connection times out, in the background.
+        """
+        with self._lock:
+            self._stopped = True
+            self._watcher.stop()
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription._close()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            try:
+                self._subscriptions.remove(subscription)
+            except ValueError:
+                pass
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                for event in self._watcher.watch(namespace=self._namespace, labels=self._labels, fields=self._fields):
+                    if self._stopped:
+                        return
+                    self._dispatch(event)
+            except Exception:
+                if self._stopped:
+                    return
+                LOG.exception("Watch of %s failed, restarting in %.0f seconds", self, RETRY_DELAY)
+                time.sleep(RETRY_DELAY)
+
+    def _dispatch(self, event):
+        with self._lock:
+            self.store.apply(event)
+            subscriptions = self._subscriptions
+            dropped = [subscription for subscription in subscriptions if not subscription._put(event)]
+            if dropped:
+                LOG.warning("Dropped %d subscribers to %s that fell behind", len(dropped), self)
+                self._subscriptions = [s for s in subscriptions if s not in dropped]
+
+    def __str__(self):
+        params = self._model._selector_params(self._labels, self._fields)
+        selectors = "".join(", {}={}".format(key, value) for key, value in sorted(params.items()))
+        return "SharedInformer({}, namespace={}{})".format(self._model.__name__, self._namespace, selectors)
+
+
+_informers = {}
+_informers_lock = threading.Lock()
+
+
+def get_informer(model, namespace=None, labels=None, fields=None):
+    """Return the shared informer for model in namespace with the given selectors, creating it if needed
+
+    Selectors that select the same objects, such as a dict and a list of the same labels, share an informer.
+    """
+    key = (model, namespace, tuple(sorted(model._selector_params(labels, fields).items())))
+    with _informers_lock:
+        informer = _informers.get(key)
+        if informer is None or informer.stopped:
+            informer = _informers[key] = SharedInformer(model, namespace, labels, fields)
+        return informer
+
+
+def subscribe(model, namespace=None, labels=None, fields=None, queue_size=DEFAULT_QUEUE_SIZE):
+    """Subscribe to the events of model in namespace matching the selectors, from the shared informer"""
+    return get_informer(model, namespace, labels, fields).subscribe(queue_size)
+
+
+def stop_all():
+    """Stop all shared informers"""
+    with _informers_lock:
+        informers = list(_informers.values())
+        _informers.clear()
+    for informer in informers:
+        informer.stop()
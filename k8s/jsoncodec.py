@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""JSON encoding and decoding, using the library selected in `config.json_backend`
+
+If the selected library is not installed, a warning is logged once, and the standard library is used instead.
+All backends raise a subclass of ValueError for invalid JSON.
+"""
+
+import json
+import logging
+
+from . import config
+
+LOG = logging.getLogger(__name__)
+LOG.addHandler(logging.NullHandler())
+
+STDLIB = "json"
+
+
+def _stdlib():
+    return json.loads, lambda obj: json.dumps(obj).encode("utf-8")
+
+
+def _orjson():
+    import orjson
+    return orjson.loads, orjson.dumps
+
+
+def _ujson():
+    import ujson
+    return ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+_BACKENDS = {
+    STDLIB: _stdlib,
+    "orjson": _orjson,
+    "ujson": _ujson,
+}
+# Backends loaded so far, by requested name: (name of the backend in use, loads, dumps)
+_loaded = {}
+
+
+def _backend():
+    name = config.json_backend
+    try:
+        return _loaded[name]
+    except KeyError:
+        pass
+    try:
+        factory = _BACKENDS[name]
+    except KeyError:
+        raise ValueError("Unknown JSON backend {!r}, must be one of {}".format(name, ", ".join(sorted(_BACKENDS))))
+    try:
+        backend = (name,) + factory()
+    except ImportError:
+        LOG.warning("JSON backend %s is not installed, using %s instead", name, STDLIB)
+        backend = (STDLIB,) + _stdlib()
+    _loaded[name] = backend
+    return backend
+
+
+def uses_stdlib():
+    """True if the standard library json module is in use, in which case requests can do the encoding"""
+    return _backend()[0] == STDLIB
+
+
+def loads(data):
+    """Decode a str or bytes containing JSON"""
+    return _backend()[1](data)
+
+
+def dumps(obj):
+    """Encode obj as JSON, returning UTF-8 encoded bytes"""
+    return _backend()[2](obj)
+
+
+def decode_response(resp):
+    """Decode the JSON body of a requests Response"""
+    if uses_stdlib():
+        return resp.json()
+    return loads(resp.content)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental decoding of JSON objects received in chunks, such as large list responses from the API server"""
+
+import codecs
+import json
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_object(chunks, stream_key):
+    """Decode a JSON object from an iterable of byte chunks, yielding (key, value) pairs as soon as each is complete
+
+    The array found under `stream_key` is never held in memory as a whole. Instead, each element is yielded
+    as (`stream_key`, element) when it is complete, so memory use is bounded by the largest element.
+    Raises :py:class:`json.JSONDecodeError` if the chunks are not a valid JSON object.
+    """
+    buf = _Buffer(chunks)
+    buf.expect("{")
+    if buf.peek() == "}":
+        buf.expect("}")
+        return
+    while True:
+        key = buf.value()
+        buf.expect(":")
+        if key == stream_key and buf.peek() == "[":
+            buf.expect("[")
+            if buf.peek() == "]":
+                buf.expect("]")
+            else:
+                while True:
+                    yield key, buf.value()
+                    if buf.next_separator("]"):
+                        break
+        else:
+            yield key, buf.value()
+        if buf.next_separator("}"):
+            return
+
+
+class _Buffer(object):
+    """Decoded text received so far, with the position of the next value"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._done = False
+        self.text = ""
+        self.pos = 0
+
+    def fill(self, minimum):
+        """Read at least `minimum` more characters, dropping the text already consumed
+
+        Returns False if the stream had already ended.
+        """
+        if self._done:
+            return False
+        parts = [self.text[self.pos:]]
+        added = 0
+        while added < minimum:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                parts.append(self._decoder.decode(b"", final=True))
+                self._done = True
+                break
+            text = self._decoder.decode(chunk)
+            parts.append(text)
+            added += len(text)
+        self.text = "".join(parts)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or an empty string at the end of the stream"""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill(1):
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError("Expecting {!r}".format(char), self.text, self.pos)
+        self.pos += 1
+
+    def next_separator(self, end):
+        """Consume a comma or `end`, returning True for `end`"""
+        char = self.peek()
+        if char == ",":
+            self.pos += 1
+            return False
+        self.expect(end)
+        return True
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Read at least as much again as the incomplete value, so long values are decoded in linear time
+                if not self.fill(max(len(self.text) - self.pos, 1)):
+                    raise
+                continue
+            # A value ending with the text might be a number continuing in the next chunk
+            if end == len(self.text) and self.fill(1):
+                continue
+            self.pos = end
+            return value
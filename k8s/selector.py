@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Label selectors evaluated locally, for filtering objects from a watch or a :py:class:`~k8s.store.Store`"""
+
+from .base import DoesNotExist, Equality, Exists, In, LabelSelector, NotIn
+
+# Operators of LabelSelectorRequirement in models.common.LabelSelector
+_OPERATORS = {
+    "In": lambda values: In(values),
+    "NotIn": lambda values: NotIn(values),
+    "Exists": lambda values: Exists(),
+    "DoesNotExist": lambda values: DoesNotExist(),
+}
+
+
+class _Nothing(LabelSelector):
+    """The requirement of a nil LabelSelector, which no labels satisfy
+
+    The API has no labelSelector parameter that selects nothing, so it can only be evaluated locally.
+    """
+
+    def format(self, key):
+        raise ValueError("A selector matching nothing has no labelSelector parameter")
+
+    def matches(self, labels, key):
+        return False
+
+
+class Selector(object):
+    """A set of label requirements, all of which must match
+
+    Created from the same labels as :py:meth:`~k8s.base.ApiMixIn.find` takes: a dict or a list of (key, value) tuples,
+    where each value is a :py:class:`~k8s.base.LabelSelector` or a string to compare with. An empty selector matches
+    everything, while :py:meth:`nothing` matches nothing.
+    """
+
+    def __init__(self, labels=None):
+        if hasattr(labels, "items"):
+            labels = sorted(labels.items(), key=lambda kv: kv[0])
+        self.requirements = tuple(
+            (key, value if isinstance(value, LabelSelector) else Equality(value)) for key, value in labels or ()
+        )
+        self._checks = tuple((requirement.matches, key) for key, requirement in self.requirements)
+
+    @classmethod
+    def from_label_selector(cls, label_selector):
+        """Create a Selector from a :py:class:`~k8s.models.common.LabelSelector`, as used in the spec of many models
+
+        As in Kubernetes, a None label_selector matches nothing, while an empty label_selector matches everything.
+        """
+        if label_selector is None:
+            return cls.nothing()
+        labels = sorted((label_selector.matchLabels or {}).items())
+        for expression in label_selector.matchExpressions:
+            try:
+                operator = _OPERATORS[expression.operator]
+            except KeyError:
+                raise ValueError("Unknown label selector operator {!r}".format(expression.operator))
+            labels.append((expression.key, operator(tuple(expression.values))))
+        return cls(labels)
+
+    @classmethod
+    def nothing(cls):
+        """Create a Selector matching no labels
+
+        It can't be converted to a labelSelector parameter, and raises ValueError if used with the API.
+        """
+        return cls([("", _Nothing())])
+
+    def matches(self, obj):
+        """Check if the labels of the model obj match all requirements"""
+        return self.matches_labels(obj.metadata.labels or {})
+
+    def matches_labels(self, labels):
+        """Check if the dict labels matches all requirements"""
+        for matches, key in self._checks:
+            if not matches(labels, key):
+                return False
+        return True
+
+    def index_values(self):
+        """For each requirement that can be looked up in an inverted label index, the values to look up
+
+        Objects matching the requirement have at least one of the values in the index built by
+        :py:func:`~k8s.store.labels_indexer`.
+        """
+        lookups = []
+        for key, requirement in self.requirements:
+            if isinstance(requirement, Equality):
+                lookups.append(((key, requirement.value),))
+            elif isinstance(requirement, In):
+                lookups.append(tuple((key, value) for value in requirement.value))
+            elif isinstance(requirement, Exists):
+                lookups.append(((key, None),))
+            elif isinstance(requirement, _Nothing):
+                lookups.append(())
+        return lookups
+
+    def __str__(self):
+        """The selector as used in the labelSelector parameter"""
+        return ",".join(requirement.format(key) for key, requirement in self.requirements)
+
+    def __repr__(self):
+        if any(isinstance(requirement, _Nothing) for _, requirement in self.requirements):
+            return "Selector.nothing()"
+        return "Selector({!r})".format(str(self))
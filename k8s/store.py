@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local, indexed cache of objects, kept up to date from watch events
+
+Lookups are served from memory, without requests to the API server. Secondary indexes map a value computed from
+each object, such as a label value or the uid of an owner, to the objects with that value::
+
+    store = Store(indexers={"app": label_indexer("app")})
+    for event in Watcher(Deployment).watch():
+        store.apply(event)
+    store.by_index("app", "my-app")
+
+A store can also be kept up to date by a :py:class:`~k8s.informer.SharedInformer`, see its `store` attribute.
+"""
+
+import threading
+
+from .base import WatchEvent
+from .selector import Selector
+
+#: Name of the index used by :py:meth:`Store.select`, if added with :py:func:`labels_indexer`
+LABELS_INDEX = "labels"
+
+
+def label_indexer(label):
+    """Index objects by the value of label"""
+    def index(obj):
+        value = (obj.metadata.labels or {}).get(label)
+        return () if value is None else (value,)
+    return index
+
+
+def labels_indexer(obj):
+    """Inverted index of all labels, by (key, value), and by (key, None) for the existence of a key"""
+    labels = obj.metadata.labels or {}
+    return [(key, value) for key, value in labels.items()] + [(key, None) for key in labels]
+
+
+def owner_uid_indexer(obj):
+    """Index objects by the uids of their owners"""
+    return [owner.uid for owner in obj.metadata.ownerReferences]
+
+
+def namespace_indexer(obj):
+    return (obj.metadata.namespace,)
+
+
+class Store(object):
+    """Thread-safe cache of the latest version of each object, indexed by namespace and name
+
+    :param dict indexers: secondary indexes to maintain, by name. Each indexer is a function taking an object, and
+        returning an iterable of the values to find it by in :py:meth:`by_index`.
+
+    `get` is O(1), while `list` and `by_index` are linear in the number of objects returned.
+    """
+
+    def __init__(self, indexers=None):
+        self._lock = threading.RLock()
+        self._objects = {}
+        self._indexers = {}
+        self._indexes = {}
+        self.add_index("namespace", namespace_indexer)
+        for name, indexer in (indexers or {}).items():
+            self.add_index(name, indexer)
+
+    def add_index(self, name, indexer):
+        """Add a secondary index, indexing the objects already in the store"""
+        with self._lock:
+            self._indexers[name] = indexer
+            self._indexes[name] = index = {}
+            for key, obj in self._objects.items():
+                _index_add(index, indexer(obj), key)
+
+    def apply(self, event):
+        """Update the store from a :py:class:`~k8s.base.WatchEvent`"""
+        if event.type == WatchEvent.DELETED:
+            self.delete(event.object)
+        else:
+            self.put(event.object)
+
+    def put(self, obj):
+        """Add or replace an object"""
+        key = _key(obj)
+        with self._lock:
+            old = self._objects.get(key)
+            self._objects[key] = obj
+            for name, indexer in self._indexers.items():
+                index = self._indexes[name]
+                if old is not None:
+                    _index_remove(index, indexer(old), key)
+                _index_add(index, indexer(obj), key)
+
+    def delete(self, obj):
+        """Remove an object, if present"""
+        key = _key(obj)
+        with self._lock:
+            old = self._objects.pop(key, None)
+            if old is not None:
+                for name, indexer in self._indexers.items():
+                    _index_remove(self._indexes[name], indexer(old), key)
+
+    def get(self, name, namespace="default"):
+        """Return the object, or None if it is not in the store. Use None as namespace for cluster scoped objects."""
+        return self._objects.get((namespace, name))
+
+    def list(self, namespace=None):
+        """List the objects in namespace, or all objects if namespace is None"""
+        with self._lock:
+            if namespace is None:
+                return list(self._objects.values())
+            return self._lookup("namespace", namespace)
+
+    def by_index(self, name, value):
+        """List the objects that indexer `name` returned `value` for"""
+        with self._lock:
+            return self._lookup(name, value)
+
+    def select(self, selector, namespace=None):
+        """List the objects matching selector, in namespace or in all namespaces if namespace is None
+
+        selector is a :py:class:`~k8s.selector.Selector`, or labels as taken by its constructor. If the store has the
+        index :py:data:`LABELS_INDEX`, candidates are found in the index, so the cost is linear in the number of
+        objects matching the most selective requirement. Otherwise all objects in namespace are checked.
+        """
+        if not isinstance(selector, Selector):
+            selector = Selector(selector)
+        with self._lock:
+            candidates = self._select_candidates(selector, namespace)
+            objects = self._objects
+            return [
+                objects[key] for key in candidates
+                if (namespace is None or key[0] == namespace) and selector.matches(objects[key])
+            ]
+
+    def _select_candidates(self, selector, namespace):
+        """Return the keys of the smallest set of objects that can match selector"""
+        index = self._indexes.get(LABELS_INDEX)
+        if namespace is None:
+            smallest = self._objects
+        else:
+            smallest = self._indexes["namespace"].get(namespace, {})
+        if index is None:
+            return list(smallest)
+        for values in selector.index_values():
+            if len(values) == 1:
+                keys = index.get(values[0], {})
+            else:
+                keys = {}
+                for value in values:
+                    keys.update(index.get(value, {}))
+            if len(keys) < len(smallest):
+                smallest = keys
+        return list(smallest)
+
+    def index_values(self, name):
+        """List the values in index `name`"""
+        with self._lock:
+            return list(self._indexes[name])
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj):
+        return _key(obj) in self._objects
+
+    def _lookup(self, name, value):
+        objects = self._objects
+        return [objects[key] for key in self._indexes[name].get(value, ())]
+
+
+def _key(obj):
+    metadata = obj.metadata
+    return metadata.namespace, metadata.name
+
+
+def _index_add(index, values, key):
+    for value in values:
+        # dicts keep the objects in the order they were added
+        index.setdefault(value, {})[key] = None
+
+
+def _index_remove(index, values, key):
+    for value in values:
+        keys = index.get(value)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del index[value]
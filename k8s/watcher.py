@@ -18,10 +18,21 @@
 
 import cachetools
 import logging
+import queue
+import threading
+import time
 
-from .base import APIServerError, WatchEvent, SyntheticAddedWatchEvent
+from .base import (APIServerError, WatchEvent, SyntheticAddedWatchEvent, SyntheticDeletedWatchEvent,
+                   SyntheticModifiedWatchEvent)
+from .client import ClientError
 
 DEFAULT_CAPACITY = 1000
+#: Default number of seconds between saving checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 10.0
+#: Block reading when the queue of events read ahead is full
+BLOCK = "block"
+#: Drop the events that do not fit in the queue of events read ahead, and list all objects again
+RELIST = "relist"
 
 LOG = logging.getLogger(__name__)
 
@@ -37,58 +48,620 @@ class Watcher(object):
     connection drops, and skip events that have already been seen.
     It additionally uses bookmarks to avoid the increased load that might be caused by reconnecting.
 
+    When the watch can not be resumed (410 Gone), the Watcher lists all objects again, and compares them with the
+    objects it knows about. Only the differences are yielded, as synthetic ADDED, MODIFIED and DELETED events.
+    To do so it keeps the resourceVersion of every object that exists, regardless of `capacity`.
+
+    With `send_initial_events`, :py:meth:`watch` gets the existing objects as a stream of events on the watch
+    connection (streaming list), instead of listing them first. This avoids building the complete list in memory,
+    both in the API server and the client. If the API server does not support streaming lists, the Watcher falls
+    back to listing.
+
+    With a `checkpoint` (see :py:mod:`k8s.checkpoint`), the Watcher periodically saves how far it has come, and
+    resumes from there when a new Watcher starts, such as after a restart of the process. Objects that did not
+    change while the Watcher was stopped are then not yielded again, so this is only useful when the consumer keeps
+    its own state or only reacts to changes. Events from the last `checkpoint_interval` seconds before the stop
+    might be yielded again, and with a `coalesce_window` the events held at the last checkpoint as well.
+
+    With a `coalesce_window`, events are held for that many seconds after the first event for an object, and only the
+    latest state of the object is yielded. A DELETED event is yielded at once, replacing any event held for the
+    object. Held events are released by the first event, bookmark or reconnect after the window has passed, or when
+    the window has passed if events are read in a separate thread (see `queue_size`). How many events were merged is
+    counted in :py:attr:`stats`.
+
+    A `predicate` skips objects based on their metadata, as a dict. For events from the watch it is called with the
+    metadata as received from the API server, before the object is decoded, so skipping most objects saves most of
+    the decoding. Objects skipped by the predicate are not tracked, so when an object stops matching, the consumer is
+    only told when the Watcher lists the objects again, and then as a DELETED event. A predicate on the name or
+    namespace avoids this.
+
+    With a `queue_size`, :py:meth:`watch` reads and decodes the events in a separate thread, which queues up to that
+    many events for the consumer. This keeps reading from the API server while the consumer is busy, so the server does
+    not drop the watch for being too slow. When the queue is full, the reader either waits for the consumer
+    (:py:const:`BLOCK`), or stops reading and drops the events, and the Watcher lists all objects again once the
+    consumer has caught up (:py:const:`RELIST`). The depth of the queue and how long events waited in it are recorded
+    in :py:attr:`stats`.
+
     :param Model model: The model class to watch
-    :param int capacity: How many seen objects to keep track of
+    :param int capacity: How many seen objects to keep track of, for skipping repeated events
+    :param bool send_initial_events: get the existing objects from the watch, instead of listing them
+    :param checkpoint: a :py:class:`~k8s.checkpoint.FileCheckpoint` or :py:class:`~k8s.checkpoint.SqliteCheckpoint`
+    :param float checkpoint_interval: seconds between saving checkpoints
+    :param float coalesce_window: seconds to hold events for an object, yielding only the latest, or 0 to not hold
+    :param int queue_size: number of events to read ahead in a separate thread, or 0 to read when the consumer asks
+        for the next event. Only used by :py:meth:`watch`.
+    :param str overflow: what to do when the queue of events read ahead is full, :py:const:`BLOCK` or
+        :py:const:`RELIST`
+    :param predicate: function taking the metadata of an object as a dict, returning False to skip the object
     """
 
-    def __init__(self, model, capacity=DEFAULT_CAPACITY):
+    def __init__(self, model, capacity=DEFAULT_CAPACITY, send_initial_events=False, checkpoint=None,
+                 checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, coalesce_window=0, queue_size=0, overflow=BLOCK,
+                 predicate=None):
+        if overflow not in (BLOCK, RELIST):
+            raise ValueError("overflow must be {!r} or {!r}, not {!r}".format(BLOCK, RELIST, overflow))
         self._seen = cachetools.LRUCache(capacity)
+        # (name, namespace) -> resourceVersion of the objects that exist, as far as we know
+        self._known = {}
         self._model = model
         self._run_forever = True
+        self._send_initial_events = send_initial_events
+        self._checkpoint = checkpoint
+        self._checkpoint_interval = checkpoint_interval
+        self._coalesce_window = coalesce_window
+        self._coalescer = None
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._predicate = predicate
+        #: :py:class:`WatchStats` counting what the Watcher has done
+        self.stats = WatchStats()
 
-    def watch(self, namespace=None):
+    def watch(self, namespace=None, labels=None, fields=None):
         """Watch for events
 
         :param str namespace: the namespace to watch for events in. The default (None) results in
             watching for events in all namespaces.
+        :param labels: only watch objects matching this label selector, see :py:meth:`~k8s.base.ApiMixIn.list`
+        :param fields: only watch objects matching this field selector, see :py:meth:`~k8s.base.ApiMixIn.list`
         :return: a generator that yields :py:class:`~.WatchEvent` objects not seen before
         """
+        events = self._watch(namespace, labels, fields)
+        if self._coalesce_window:
+            events = self._coalesce(events)
+        for event in events:
+            if event is not None:
+                yield event
+
+    def _watch(self, namespace, labels, fields):
+        """Yield the events not seen before, and None for other events, so the time can be checked while coalescing"""
         # last_seen_resource_version is used to resume the watch from the last seen event.
-        # Only used on reconnects, the first call to watch does a quorum read.
-        last_seen_resource_version = None
+        # Only used on reconnects and when resuming from a checkpoint, otherwise the first call does a quorum read.
+        checkpointer = self._checkpointer(namespace, labels, fields)
+        last_seen_resource_version = self._restore_checkpoint(checkpointer)
         while self._run_forever:
             if last_seen_resource_version is None:
+                # Events from listing can not be resumed from until the watch after the list
+                self._save_checkpoint(checkpointer, None)
+                if self._send_initial_events:
+                    last_seen_resource_version = yield from self._watch_initial_events(
+                        namespace, labels, fields, checkpointer
+                    )
+                    continue
                 # list all resources and yield a synthetic ADDED watch event for each
-                model_list = self._model.list_with_meta(namespace=namespace)
-                LOG.info("Got %d %s instances from quorum read", len(model_list.items), self._model.__name__)
-                for obj in model_list.items:
-                    event = SyntheticAddedWatchEvent(obj)
-                    # _should_yield is mainly called here to feed the self._seen cache
-                    if self._should_yield(event):
-                        yield event
+                model_list = self._model.list_with_meta(namespace=namespace, labels=labels, fields=fields)
+                yield from self._list_events(model_list)
                 # watch connection should start at the version of the initial list
                 last_seen_resource_version = model_list.metadata.resourceVersion
+            watch = self._model.watch_list(
+                namespace=namespace, resource_version=last_seen_resource_version, allow_bookmarks=True,
+                labels=labels, fields=fields
+            )
+            last_seen_resource_version = yield from self._watch_events(watch, last_seen_resource_version, checkpointer)
+
+    def stop(self):
+        """Stop watching when the current watch connection ends
+
+        The connection ends when the next event arrives or it times out. A Watcher can not be restarted.
+        """
+        self._run_forever = False
+
+    async def watch_async(self, namespace=None, labels=None, fields=None):
+        """Watch for events from a running event loop, with the same behaviour as :py:meth:`watch`
+
+        Stop the watch by cancelling the task iterating over it, or by leaving the `async for` loop. This allows a
+        single event loop to watch many models at once. Streaming lists are not supported, a Watcher with
+        `send_initial_events` raises ValueError.
+
+        :param str namespace: the namespace to watch for events in. The default (None) results in
+            watching for events in all namespaces.
+        :param labels: only watch objects matching this label selector
+        :param fields: only watch objects matching this field selector
+        :return: an async generator that yields :py:class:`~.WatchEvent` objects not seen before
+        """
+        if self._send_initial_events:
+            raise ValueError("send_initial_events is not supported by watch_async")
+        events = self._watch_async(namespace, labels, fields)
+        if self._coalesce_window:
+            events = self._coalesce_async(events)
+        try:
+            async for event in events:
+                if event is not None:
+                    yield event
+        finally:
+            await events.aclose()
+
+    async def _watch_async(self, namespace, labels, fields):
+        checkpointer = self._checkpointer(namespace, labels, fields)
+        last_seen_resource_version = self._restore_checkpoint(checkpointer)
+        while self._run_forever:
+            if last_seen_resource_version is None:
+                self._save_checkpoint(checkpointer, None)
+                model_list = await self._model.list_with_meta_async(namespace=namespace, labels=labels, fields=fields)
+                for event in self._list_events(model_list):
+                    yield event
+                last_seen_resource_version = model_list.metadata.resourceVersion
             try:
-                for event in self._model.watch_list(
-                    namespace=namespace, resource_version=last_seen_resource_version, allow_bookmarks=True
+                async for event in self._model.watch_list_async(
+                    namespace=namespace, resource_version=last_seen_resource_version, allow_bookmarks=True,
+                    labels=labels, fields=fields
                 ):
+                    self._save_checkpoint(checkpointer, last_seen_resource_version)
                     last_seen_resource_version = event.resource_version
-                    if self._should_yield(event):
-                        yield event
+                    yield event if self._should_yield(event) else None
+                yield None
             except APIServerError as e:
-                # A 410 response indicates our resourceVersion is too old, and we need to do a new quorum read.
                 if e.api_error["code"] == 410:
                     last_seen_resource_version = None
                 else:
                     raise
 
+    def _watch_initial_events(self, namespace, labels, fields, checkpointer):
+        """Watch with initial events, yielding the differences from the known objects, and then the following events
+
+        Returns the resourceVersion to resume from, or None if the watch ended before all initial events were received,
+        the API server does not support streaming lists, or all objects must be listed again.
+        """
+        watch = self._model.watch_list(
+            namespace=namespace, allow_bookmarks=True, labels=labels, fields=fields, send_initial_events=True
+        )
+        try:
+            return (yield from self._watch_events(watch, None, checkpointer, _InitialEvents(self)))
+        except ClientError as e:
+            if e.response is None or e.response.status_code not in (400, 422):
+                raise
+            self._fall_back_to_list(e.response.status_code)
+        except _NotStreaming as e:
+            self._fall_back_to_list(e)
+        return None
+
+    def _watch_events(self, watch, resource_version, checkpointer, initial=None):
+        """Yield the events from watch not seen before, and None for other events
+
+        With `initial`, the events up to the end of the initial events are passed to it. Returns the resourceVersion
+        to resume from, or None if all objects must be listed again.
+        """
+        try:
+            for event in self._read(watch):
+                if event is None:
+                    yield None
+                elif initial is not None and not initial.done:
+                    resource_version = event.resource_version
+                    yield from initial.add(event)
+                else:
+                    # All events up to here have been consumed
+                    self._save_checkpoint(checkpointer, resource_version)
+                    resource_version = event.resource_version
+                    yield event if self._should_yield(event) else None
+            yield None
+        except APIServerError as e:
+            # A 410 response indicates our resourceVersion is too old, and we need to do a new quorum read.
+            if e.api_error["code"] != 410:
+                raise
+            return None
+        except _QueueOverflow:
+            return None
+        if initial is not None and not initial.done:
+            return None
+        return resource_version
+
+    def _read(self, events):
+        """Read events in a separate thread if the Watcher has a queue size, yielding None while waiting"""
+        if not self._queue_size:
+            return events
+        return self._read_in_thread(events)
+
+    def _read_in_thread(self, events):
+        reader = _Reader(events, self._queue_size, self._overflow, self.stats, self._model.__name__, self._decode)
+        try:
+            # Wake up regularly while coalescing, to yield the held events when their window has passed
+            yield from reader.events(self._coalesce_window or None)
+        finally:
+            reader.stop()
+
+    def _coalesce(self, events):
+        coalescer = self._coalescer = _Coalescer(self._coalesce_window, self.stats)
+        for event in events:
+            now = time.monotonic()
+            if event is not None:
+                yield from coalescer.add(event, now)
+            yield from coalescer.due(now)
+        yield from coalescer.due(None)
+
+    async def _coalesce_async(self, events):
+        coalescer = self._coalescer = _Coalescer(self._coalesce_window, self.stats)
+        try:
+            async for event in events:
+                now = time.monotonic()
+                if event is not None:
+                    for held in coalescer.add(event, now):
+                        yield held
+                for held in coalescer.due(now):
+                    yield held
+            for held in coalescer.due(None):
+                yield held
+        finally:
+            await events.aclose()
+
+    def _checkpointer(self, namespace, labels, fields):
+        """A _Checkpointer for the objects watched, so checkpoints of other watches are not used"""
+        if self._checkpoint is None:
+            return _Checkpointer(None, None, self._checkpoint_interval)
+        params = self._model._selector_params(labels, fields)
+        query = "&".join("{}={}".format(key, value) for key, value in sorted(params.items()))
+        scope = "{}?{}".format(self._model._watch_list_url(namespace), query)
+        return _Checkpointer(self._checkpoint, scope, self._checkpoint_interval)
+
+    def _restore_checkpoint(self, checkpointer):
+        """Load the known objects from the checkpoint, returning the resourceVersion to resume from, or None"""
+        loaded = checkpointer.load()
+        if loaded is None:
+            return None
+        resource_version, known = loaded
+        LOG.info("Resuming %s watch at resource version %s from checkpoint, with %d known instances",
+                 self._model.__name__, resource_version, len(known))
+        self._known = known
+        return resource_version
+
+    def _save_checkpoint(self, checkpointer, resource_version):
+        """Save a checkpoint if one is due, when all events up to resource_version have been passed on"""
+        coalescer = self._coalescer
+        if coalescer is not None:
+            coalescer.position = resource_version
+        if not checkpointer.due():
+            return
+        known = self._known
+        if coalescer is not None:
+            # Held events have not been consumed yet, so resume from before them
+            resource_version, known = coalescer.checkpoint(resource_version, known)
+        checkpointer.save(resource_version, known)
+
+    def _fall_back_to_list(self, reason):
+        LOG.warning("API server does not support streaming lists of %s (%s), listing instead",
+                    self._model.__name__, reason)
+        self._send_initial_events = False
+
+    def _list_events(self, model_list):
+        """Yield synthetic watch events for the differences between the listed objects and the known objects"""
+        LOG.info("Got %d %s instances from quorum read", len(model_list.items), self._model.__name__)
+        listed = set()
+        predicate = self._predicate
+        for obj in model_list.items:
+            if predicate is not None and not predicate(obj.metadata.as_dict() or {}):
+                continue
+            event = self._diff_event(obj, listed)
+            if event:
+                yield event
+        yield from self._deleted_events(listed)
+
+    def _diff_event(self, obj, listed):
+        """Return a synthetic event for obj if it differs from the known object, adding its key to listed"""
+        key = (obj.metadata.name, obj.metadata.namespace)
+        listed.add(key)
+        resource_version = self._known.get(key)
+        if resource_version is None:
+            event = SyntheticAddedWatchEvent(obj)
+        elif resource_version != obj.metadata.resourceVersion:
+            event = SyntheticModifiedWatchEvent(obj)
+        else:
+            self._seen[key] = resource_version
+            return None
+        self._record(key, event)
+        return event
+
+    def _initial_diff_events(self, event, listed):
+        """Return the synthetic events for an initial event, checking the predicate before decoding the object"""
+        if not self._accepts(event):
+            return ()
+        obj = self._object(event)
+        if obj is None:
+            return ()
+        diff_event = self._diff_event(obj, listed)
+        return (diff_event,) if diff_event else ()
+
+    def _deleted_events(self, listed):
+        """Yield a synthetic DELETED event for each known object that was not listed"""
+        known = self._known
+        for key in [key for key in known if key not in listed]:
+            event = SyntheticDeletedWatchEvent(self._tombstone(key, known[key]))
+            self._record(key, event)
+            yield event
+
+    def _tombstone(self, key, resource_version):
+        name, namespace = key
+        return self._model.from_dict(
+            {"metadata": {"name": name, "namespace": namespace, "resourceVersion": resource_version}}
+        )
+
+    def _accepts(self, event):
+        return self._predicate is None or self._predicate(event.raw_metadata)
+
+    def _decode(self, event):
+        """Decode the object of event if it will be yielded, so the reader thread does the decoding"""
+        if event.has_object() and self._accepts(event):
+            try:
+                event.object
+            except (TypeError, ValueError):
+                # Logged when the consumer reads the event
+                pass
+
+    def _object(self, event):
+        """Return the object of event, or None after logging if it can not be decoded"""
+        try:
+            return event.object
+        except (TypeError, ValueError):
+            LOG.exception("Unable to create instance of %s from watch event, discarding event", self._model.__name__)
+            return None
+
     def _should_yield(self, event) -> bool:
         """Check if this is a new event, and if so, mark it as seen"""
-        if not event.has_object():
+        if not event.has_object() or not self._accepts(event):
+            return False
+        o = self._object(event)
+        if o is None:
             return False
-        o = event.object
         key = (o.metadata.name, o.metadata.namespace)
         if self._seen.get(key) == o.metadata.resourceVersion and event.type != WatchEvent.DELETED:
             return False
-        self._seen[key] = o.metadata.resourceVersion
+        self._record(key, event)
         return True
+
+    def _record(self, key, event):
+        resource_version = event.object.metadata.resourceVersion
+        self._seen[key] = resource_version
+        if self._coalescer is not None:
+            self._coalescer.note(key, self._known.get(key))
+        if event.type == WatchEvent.DELETED:
+            self._known.pop(key, None)
+        else:
+            self._known[key] = resource_version
+
+
+class WatchStats(object):
+    """Counters for a :py:class:`Watcher`, updated as it runs"""
+
+    def __init__(self):
+        #: Events replaced by a later event for the same object within the coalesce window
+        self.coalesced = 0
+        #: Events waiting in the reader queue when the latest event was taken from it, and the highest number seen
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        #: Events taken from the reader queue
+        self.dequeued = 0
+        #: Total and highest number of seconds events waited in the reader queue
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+        #: Times the reader queue was full with the RELIST policy, dropping events
+        self.overflows = 0
+
+
+class _Coalescer(object):
+    """Holds events for `window` seconds after the first event for an object, keeping only the latest"""
+
+    def __init__(self, window, stats):
+        self._window = window
+        self._stats = stats
+        # key -> [deadline, event, position when first held], in the order of the first event for each key, so
+        # deadlines are in order as well
+        self._held = {}
+        # key -> known resourceVersion of the object before its held events, or None if it was not known
+        self._before = {}
+        #: resourceVersion of the last event passed on to the coalescer
+        self.position = None
+
+    def note(self, key, resource_version):
+        """Note the known resourceVersion of key, before it is updated for an event that will be added"""
+        self._before.setdefault(key, resource_version)
+
+    def checkpoint(self, resource_version, known):
+        """The resourceVersion to resume from and the known objects to save, leaving out the held events
+
+        resource_version is where to resume from if no events are held.
+        """
+        if not self._held:
+            return resource_version, known
+        known = dict(known)
+        for key, before in self._before.items():
+            if before is None:
+                known.pop(key, None)
+            else:
+                known[key] = before
+        return next(iter(self._held.values()))[2], known
+
+    def add(self, event, now):
+        """Hold event, returning the events to yield right away"""
+        key = (event.object.metadata.name, event.object.metadata.namespace)
+        held = self._held.get(key)
+        if event.type == WatchEvent.DELETED:
+            self._before.pop(key, None)
+            if held is not None:
+                del self._held[key]
+                self._stats.coalesced += 1
+            return (event,)
+        if held is None:
+            self._held[key] = [now + self._window, event, self.position]
+        else:
+            previous = held[1]
+            if previous.type == WatchEvent.ADDED and event.type != WatchEvent.ADDED:
+                # The consumer has not seen the object yet
+                event = WatchEvent(_type=WatchEvent.ADDED, _object=event.object)
+            held[1] = event
+            self._stats.coalesced += 1
+        return ()
+
+    def due(self, now):
+        """Yield the held events whose window has passed at `now`, or all held events if `now` is None"""
+        held = self._held
+        while held:
+            key = next(iter(held))
+            deadline, event, _ = held[key]
+            if now is not None and deadline > now:
+                return
+            del held[key]
+            self._before.pop(key, None)
+            yield event
+
+
+class _Checkpointer(object):
+    """Loads and saves the checkpoints of one watch, saving at most every `interval` seconds
+
+    Does nothing without a checkpoint.
+    """
+
+    def __init__(self, checkpoint, scope, interval):
+        self._checkpoint = checkpoint
+        self._scope = scope
+        self._interval = interval
+        self._next_save = 0.0
+
+    def load(self):
+        """Return the saved resourceVersion and known objects, or None"""
+        if self._checkpoint is None:
+            return None
+        loaded = self._checkpoint.load(self._scope)
+        if loaded is not None:
+            self._next_save = time.monotonic() + self._interval
+        return loaded
+
+    def due(self):
+        """Whether the interval has passed since the last save"""
+        return self._checkpoint is not None and time.monotonic() >= self._next_save
+
+    def save(self, resource_version, known):
+        """Save resource_version and the known objects, unless resource_version is None"""
+        if resource_version is None:
+            return
+        self._checkpoint.save(self._scope, resource_version, known)
+        self._next_save = time.monotonic() + self._interval
+
+
+class _NotStreaming(Exception):
+    """The API server ignored the parameters for a streaming list"""
+
+
+class _InitialEvents(object):
+    """Turns the initial events of a streaming list into the differences from the objects known by a Watcher"""
+
+    def __init__(self, watcher):
+        self._watcher = watcher
+        self._listed = set()
+        #: Whether the bookmark ending the initial events was received
+        self.done = False
+
+    def add(self, event):
+        """Return the events to yield for an initial event"""
+        watcher = self._watcher
+        if event.has_object() and event.type == WatchEvent.ADDED:
+            return watcher._initial_diff_events(event, self._listed)
+        if getattr(event, "initial_events_end", False):
+            LOG.info("Got %d %s instances from watch", len(self._listed), watcher._model.__name__)
+            self.done = True
+            return watcher._deleted_events(self._listed)
+        # Other events before the end of the initial events means the parameters were ignored
+        raise _NotStreaming("no initial events received")
+
+
+class _QueueOverflow(Exception):
+    """The reader dropped events, so all objects must be listed again"""
+
+
+class _Reader(object):
+    """Reads events in a thread, passing them to the consumer through a bounded queue"""
+
+    _END = object()
+    # Seconds between checking if the reader should stop, while waiting for room in the queue
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, events, size, overflow, stats, name, decode):
+        self._queue = queue.Queue(size)
+        self._overflow = overflow
+        self._stats = stats
+        self._decode = decode
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(events,), name="{} watch reader".format(name),
+                                        daemon=True)
+        self._thread.start()
+
+    def events(self, timeout=None):
+        """Yield the events read, and None if no event was read within timeout"""
+        stats = self._stats
+        while True:
+            try:
+                item, queued_at = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                yield None
+                continue
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            waited = time.monotonic() - queued_at
+            stats.queue_depth = depth = self._queue.qsize()
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+            stats.dequeued += 1
+            stats.queue_time += waited
+            stats.max_queue_time = max(stats.max_queue_time, waited)
+            yield item
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self, events):
+        try:
+            for event in events:
+                if self._stopped.is_set():
+                    return
+                self._decode(event)
+                if not self._queue_event(event):
+                    return
+            self._put(self._END)
+        except Exception as e:
+            self._put(e)
+        finally:
+            close = getattr(events, "close", None)
+            if close:
+                close()
+
+    def _queue_event(self, event):
+        """Queue event, returning False if the reader must stop, because it was stopped or the queue overflowed"""
+        queued_at = time.monotonic()
+        if self._overflow == BLOCK:
+            return self._put(event, queued_at)
+        try:
+            self._queue.put_nowait((event, queued_at))
+            return True
+        except queue.Full:
+            self._stats.overflows += 1
+            LOG.warning("Dropping watch events after %d events waiting, listing again when caught up",
+                        self._queue.maxsize)
+            self._put(_QueueOverflow())
+            return False
+
+    def _put(self, item, queued_at=None):
+        """Put item in the queue, waiting for room. Returns False if the reader was stopped while waiting"""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put((item, queued_at), timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
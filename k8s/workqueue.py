@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A work queue for handling watch events in worker threads, as in the controller pattern
+
+Events are queued by key, (namespace, name) of the object, and only the latest event for each key is kept while the
+key waits. So a handler that falls behind handles each object once, in its latest state, instead of every event.
+A key is never handled by two workers at once.
+
+Usage::
+
+    def reconcile(key, event):
+        ...
+
+    with WorkQueue(reconcile, workers=4, rate=50) as queue:
+        queue.feed(Watcher(Deployment))
+        ...
+
+If the handler raises an exception, the key is handled again after a delay, which doubles for each consecutive
+failure of that key. `rate` limits how often handlers are called across all workers.
+"""
+
+import collections
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+LOG.addHandler(logging.NullHandler())
+
+#: Default delay before the first retry of a failed key, in seconds
+DEFAULT_BASE_DELAY = 0.005
+#: Default maximum delay between retries of a failed key, in seconds
+DEFAULT_MAX_DELAY = 1000.0
+#: Seconds to wait before restarting a watch that failed
+RETRY_DELAY = 5.0
+#: Longest time in seconds :py:meth:`WorkQueue.stop` waits for the feeds, which only stop when their watch gets an
+#: event or ends. Feeds still running after that are left to end in the background.
+FEED_STOP_TIMEOUT = 1.0
+
+
+class TokenBucket(object):
+    """Allow `rate` operations per second on average, and bursts of up to `burst` operations"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Taking the token in advance reserves it, so concurrent callers wait in turn
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class WorkQueue(object):
+    """Call handler(key, item) from worker threads for each key added, with the latest item added for the key
+
+    :param handler: function called with the key and the latest item, usually a :py:class:`~k8s.base.WatchEvent`
+    :param int workers: number of worker threads
+    :param float rate: maximum number of handler calls per second across all workers, or None for no limit
+    :param int burst: number of handler calls allowed at once before `rate` applies
+    :param float base_delay: seconds before handling a key again after the first failure
+    :param float max_delay: maximum seconds between handling a failing key
+    :param int max_retries: give up on a key after this many consecutive failures, or None to retry forever
+    """
+
+    def __init__(self, handler, workers=1, rate=None, burst=1, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, max_retries=None):
+        self._handler = handler
+        self._worker_count = workers
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._max_retries = max_retries
+        self._condition = threading.Condition(threading.Lock())
+        # key -> latest item, for keys waiting to be handled
+        self._items = {}
+        self._ready = collections.deque()
+        self._queued = set()
+        self._processing = set()
+        # (time, sequence, key) of keys waiting for a retry
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._failures = {}
+        self._threads = []
+        self._watchers = []
+        self._feeds = []
+        self._stopping = False
+
+    def add(self, key, item=None):
+        """Queue key to be handled with item, replacing the item if the key is already waiting"""
+        with self._condition:
+            self._items[key] = item
+            self._enqueue(key)
+
+    def feed(self, watcher, namespace=None, labels=None, fields=None):
+        """Add the events of watcher in a background thread, by the namespace and name of their object
+
+        The arguments after watcher are passed to :py:meth:`~k8s.watcher.Watcher.watch`. If the watch fails, it is
+        restarted after :py:data:`RETRY_DELAY` seconds.
+        """
+        def run():
+            while not self._stopping:
+                try:
+                    for event in watcher.watch(namespace=namespace, labels=labels, fields=fields):
+                        metadata = event.object.metadata
+                        self.add((metadata.namespace, metadata.name), event)
+                        if self._stopping:
+                            return
+                    return
+                except Exception:
+                    if self._stopping:
+                        return
+                    LOG.exception("Watch feeding the work queue failed, restarting in %.0f seconds", RETRY_DELAY)
+                    time.sleep(RETRY_DELAY)
+
+        thread = threading.Thread(target=run, name="WorkQueue feed", daemon=True)
+        self._watchers.append(watcher)
+        self._feeds.append(thread)
+        thread.start()
+        return thread
+
+    def start(self):
+        """Start the worker threads"""
+        for i in range(self._worker_count):
+            thread = threading.Thread(target=self._work, name="WorkQueue worker {}".format(i), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the workers after the keys they are handling, and stop the watchers fed from
+
+        Waits for each worker thread for up to `timeout` seconds. A feed stops when the next event arrives or the watch
+        connection ends, which can take long on a quiet watch, so the feeds are only waited for up to
+        :py:data:`FEED_STOP_TIMEOUT` seconds in total.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for watcher in self._watchers:
+            watcher.stop()
+        for thread in self._threads:
+            thread.join(timeout)
+        feed_timeout = FEED_STOP_TIMEOUT if timeout is None else min(timeout, FEED_STOP_TIMEOUT)
+        deadline = time.monotonic() + feed_timeout
+        for thread in self._feeds:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def wait_idle(self, timeout=None):
+        """Wait until no keys are waiting or being handled, returning False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._items or self._processing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def __len__(self):
+        """Number of keys waiting to be handled"""
+        with self._condition:
+            return len(self._items)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _enqueue(self, key):
+        # A key being handled is queued again when the handler returns
+        if key not in self._queued and key not in self._processing:
+            self._queued.add(key)
+            self._ready.append(key)
+            self._condition.notify()
+
+    def _next(self):
+        """Wait for a ready key, returning it with its item, or None when stopping"""
+        with self._condition:
+            while not self._stopping:
+                now = time.monotonic()
+                delayed = self._delayed
+                while delayed and delayed[0][0] <= now:
+                    _, _, key = heapq.heappop(delayed)
+                    if key in self._items:
+                        self._enqueue(key)
+                if self._ready:
+                    key = self._ready.popleft()
+                    self._queued.discard(key)
+                    self._processing.add(key)
+                    return key, self._items.pop(key)
+                self._condition.wait(delayed[0][0] - now if delayed else None)
+            return None
+
+    def _work(self):
+        while True:
+            next_key = self._next()
+            if next_key is None:
+                return
+            key, item = next_key
+            if self._bucket:
+                self._bucket.acquire()
+            try:
+                self._handler(key, item)
+            except Exception:
+                self._failed(key, item)
+            else:
+                self._done(key)
+
+    def _done(self, key):
+        with self._condition:
+            self._failures.pop(key, None)
+            self._processing.discard(key)
+            if key in self._items:
+                self._enqueue(key)
+            self._condition.notify_all()
+
+    def _failed(self, key, item):
+        with self._condition:
+            self._processing.discard(key)
+            failures = self._failures.get(key, 0) + 1
+            if self._max_retries is not None and failures > self._max_retries:
+                LOG.exception("Giving up on %s after %d failures", key, failures)
+                self._failures.pop(key, None)
+                if key in self._items:
+                    self._enqueue(key)
+                self._condition.notify_all()
+                return
+            self._failures[key] = failures
+            delay = min(self._max_delay, self._base_delay * 2 ** (failures - 1))
+            LOG.exception("Failed handling %s, retrying in %.3f seconds", key, delay)
+            # Retry with the latest item, which might have been added while handling
+            self._items.setdefault(key, item)
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), key))
+            self._condition.notify_all()
@@ -68,7 +68,7 @@ def main():
         author="FiaaS developers",
         author_email="fiaas@googlegroups.com",
         use_scm_version=True,
-        packages=find_packages(exclude=("tests",)),
+        packages=find_packages(exclude=("tests", "benchmarks")),
         zip_safe=True,
         include_package_data=True,
 
@@ -78,7 +78,10 @@ def main():
         extras_require={
             "dev": TESTS_REQ + CODE_QUALITY_REQ,
             "codacy": ["codacy-coverage"],
-            "docs": ["Sphinx>=1.6.3"]
+            "docs": ["Sphinx>=1.6.3"],
+            "orjson": ["orjson>=3.8"],
+            "ujson": ["ujson>=5.0"],
+            "async": ["aiohttp>=3.8"],
         },
         tests_require=TESTS_REQ,
         # Metadata
@@ -22,6 +22,9 @@ import mock
 import pytest
 
 from k8s import config
+from k8s.fakeserver import FakeApiServer
+from k8s.models.common import ObjectMeta
+from k8s.models.configmap import ConfigMap
 
 
 @pytest.fixture
@@ -44,6 +47,20 @@ def k8s_config(monkeypatch):
     monkeypatch.setattr(config, "verify_ssl", False)
 
 
+@pytest.fixture
+def server(monkeypatch):
+    """Run a FakeApiServer with short bookmark and watch timeouts, and configure k8s to use it"""
+    with FakeApiServer(bookmark_interval=0.1, watch_timeout=2) as server:
+        monkeypatch.setattr(config, "api_server", server.url)
+        monkeypatch.setattr(config, "api_token", "")
+        yield server
+
+
+@pytest.helpers.register
+def configmap(name, namespace="default", **labels):
+    return ConfigMap(metadata=ObjectMeta(name=name, namespace=namespace, labels=labels), data={"key": name})
+
+
 @pytest.fixture
 def post():
     with mock.patch('k8s.client.Client.post') as m:
@@ -56,6 +73,12 @@ def put():
         yield m
 
 
+@pytest.fixture
+def patch():
+    with mock.patch('k8s.client.Client.patch') as m:
+        yield m
+
+
 @pytest.fixture
 def get():
     with mock.patch('k8s.client.Client.get') as m:
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import socket
+
+import pytest
+
+from k8s import asyncclient, config
+from k8s.base import ApiMixIn, Equality, WatchBookmark, WatchEvent
+from k8s.client import ClientError, NotFound
+from k8s.models.configmap import ConfigMap
+from k8s.models.service import Service
+
+aiohttp = pytest.importorskip("aiohttp")
+
+SERVICES = "/api/v1/namespaces/default/services"
+
+
+def _run(coro):
+    """Run coro in a new event loop, closing the session of the client before the loop"""
+    async def run():
+        try:
+            return await coro
+        finally:
+            await ApiMixIn.close_async_client()
+    return asyncio.run(run())
+
+
+class TestAsyncClient(object):
+    def test_save_get_delete(self, server):
+        async def scenario():
+            configmap = pytest.helpers.configmap("my-name")
+            await configmap.save_async()
+            assert configmap.metadata.resourceVersion == "1"
+            fetched = await ConfigMap.get_async("my-name")
+            assert fetched.data == {"key": "my-name"}
+            await ConfigMap.delete_async("my-name")
+            with pytest.raises(NotFound):
+                await ConfigMap.get_async("my-name")
+        _run(scenario())
+
+    def test_update_and_patch(self, server):
+        async def scenario():
+            await pytest.helpers.configmap("my-name").save_async()
+            configmap = await ConfigMap.get_async("my-name")
+            configmap.data = {"key": "put"}
+            await configmap.save_async()
+            configmap.data = {"key": "patch"}
+            await configmap.save_async(patch=True)
+            return await ConfigMap.get_async("my-name")
+        fetched = _run(scenario())
+        assert fetched.data == {"key": "patch"}
+        assert fetched.metadata.resourceVersion == "3"
+
+    def test_conflict_raises_client_error(self, server):
+        async def scenario():
+            await pytest.helpers.configmap("my-name").save_async()
+            with pytest.raises(ClientError) as e:
+                await pytest.helpers.configmap("my-name").save_async()
+            return e.value
+        error = _run(scenario())
+        assert error.response.status_code == 409
+        assert "409: Conflict" in str(error)
+
+    def test_list_find_and_delete_list(self, server):
+        async def scenario():
+            for i in range(4):
+                await pytest.helpers.configmap("cm-{}".format(i), index=str(i % 2)).save_async()
+            listed = await ConfigMap.list_async()
+            found = await ConfigMap.find_async(labels={"index": Equality("1")})
+            await ConfigMap.delete_list_async(labels={"index": Equality("0")})
+            remaining = await ConfigMap.list_with_meta_async()
+            return listed, found, remaining
+        listed, found, remaining = _run(scenario())
+        assert [cm.metadata.name for cm in listed] == ["cm-0", "cm-1", "cm-2", "cm-3"]
+        assert [cm.metadata.name for cm in found] == ["cm-1", "cm-3"]
+        assert [cm.metadata.name for cm in remaining.items] == ["cm-1", "cm-3"]
+        assert remaining.metadata.resourceVersion == server.resource_version
+
+    def test_watch_list(self, server):
+        server.create(SERVICES, {"metadata": {"name": "first"}})
+        resource_version = server.resource_version
+        server.create(SERVICES, {"metadata": {"name": "new"}})
+        server.create(SERVICES, {"metadata": {"name": "other"}})
+
+        async def scenario():
+            events = []
+            async for event in Service.watch_list_async(resource_version=resource_version, allow_bookmarks=True):
+                events.append(event)
+                if isinstance(event, WatchBookmark):
+                    break
+            return events
+        events = _run(scenario())
+        assert [(e.type, e.object.metadata.name) for e in events[:2]] == [
+            (WatchEvent.ADDED, "new"),
+            (WatchEvent.ADDED, "other"),
+        ]
+        assert isinstance(events[2], WatchBookmark)
+
+    def test_watch_list_returns_on_read_timeout(self, server, monkeypatch):
+        monkeypatch.setattr(config, "stream_timeout", 0.2)
+        server.create(SERVICES, {"metadata": {"name": "first"}})
+
+        async def scenario():
+            return [event async for event in Service.watch_list_async(resource_version=server.resource_version)]
+        assert _run(scenario()) == []
+
+    def test_session_of_previous_loop_is_closed(self, server):
+        sessions = []
+
+        async def scenario():
+            await ConfigMap.list_async()
+            sessions.append(ApiMixIn._async_client._session)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(scenario())
+            _run(scenario())
+        finally:
+            loop.close()
+        assert sessions[0] is not sessions[1]
+        assert sessions[0].closed
+
+    def test_connection_errors_are_retried(self, monkeypatch):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        monkeypatch.setattr(config, "api_server", "http://127.0.0.1:{}".format(port))
+        attempts = []
+
+        def backoff(attempt):
+            attempts.append(attempt)
+            return 0
+        monkeypatch.setattr(asyncclient, "_backoff", backoff)
+        with pytest.raises(aiohttp.ClientConnectionError):
+            _run(ConfigMap.get_async("my-name"))
+        assert attempts == list(range(1, asyncclient.MAX_RETRIES + 1))
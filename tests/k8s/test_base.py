@@ -15,14 +15,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import concurrent.futures
+import gc
+import json
+import threading
+
 import mock
 import pytest
 import requests
 import requests.packages.urllib3 as urllib3
 
-from k8s.base import APIServerError, Equality, Exists, Field, In, Inequality, Model, NotIn, WatchBookmark, WatchEvent
+from k8s import config
+from k8s.base import (APIServerError, DoesNotExist, Equality, Exists, Field, In, Inequality, Model, ModelList,
+                      NotIn, WatchBookmark, WatchEvent, _decode_items_async, _GcPause)
 from k8s.client import NotFound, ServerError, ClientError
 from k8s.models.common import DeleteOptions, Preconditions, ObjectMeta
+from k8s.selector import Selector
 
 
 class Example(Model):
@@ -77,6 +86,29 @@ class TestWatchEvent(object):
         assert watch_event.type == _type
         assert watch_event.object == obj
 
+    def test_watch_event_object_decoded_when_read(self):
+        event_dict = {"type": "ADDED", "object": {"metadata": {"name": "a", "resourceVersion": "1"}, "value": 42}}
+        with mock.patch.object(Example, "from_dict", wraps=Example.from_dict) as from_dict:
+            watch_event = WatchEvent(event_dict, Example)
+            assert watch_event.raw_metadata == {"name": "a", "resourceVersion": "1"}
+            assert watch_event.resource_version == "1"
+            from_dict.assert_not_called()
+
+            assert watch_event.object.value == 42
+            assert watch_event.object is watch_event.object
+            from_dict.assert_called_once()
+
+    def test_watch_event_decode_error_raised_when_read(self):
+        line = b'{"type": "ADDED", "object": {"metadata": {"name": "a"}, "value": "x"}}'
+        watch_event = Example._parse_watch_event(line)
+        assert watch_event.raw_metadata == {"name": "a"}
+        with pytest.raises(ValueError):
+            watch_event.object
+
+    def test_watch_event_raw_metadata_from_object(self):
+        watch_event = WatchEvent(_type=WatchEvent.ADDED, _object=_example_object(42, "1"))
+        assert watch_event.raw_metadata["resourceVersion"] == "1"
+
     @pytest.mark.parametrize(
         "kwargs",
         (
@@ -121,6 +153,7 @@ class TestFind(object):
             (In(("value1", "value2")), "my_key in (value1,value2)"),
             (NotIn(("value1", "value2")), "my_key notin (value1,value2)"),
             (Exists(), "my_key"),
+            (DoesNotExist(), "!my_key"),
             ("my_unwrapped_value", "my_key=my_unwrapped_value"),
         ),
     )
@@ -218,6 +251,29 @@ class TestWatchList(object):
             "/watch/example", stream=True, timeout=270, params={"resourceVersion": 4711, "allowWatchBookmarks": "true"}
         )
 
+    def test_watch_list_selectors(self, client):
+        client.get.return_value.iter_lines.return_value = []
+        gen = Example.watch_list(labels={"app": "my-app"}, fields={"spec.nodeName": Inequality("node1")})
+        assert list(gen) == []
+        client.get.assert_called_once_with(
+            "/watch/example", stream=True, timeout=270,
+            params={"labelSelector": "app=my-app", "fieldSelector": "spec.nodeName!=node1"}
+        )
+
+    def test_watch_list_send_initial_events(self, client):
+        client.get.return_value.iter_lines.return_value = [
+            '{"type": "ADDED", "object": {"metadata": {"resourceVersion": "1"}, "value": 1}}',
+            '{"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "1", '
+            '"annotations": {"k8s.io/initial-events-end": "true"}}}}',
+            '{"type":"BOOKMARK", "object":{"metadata":{"resourceVersion": "2"}}}',
+        ]
+        events = list(Example.watch_list(allow_bookmarks=True, send_initial_events=True))
+        assert [getattr(e, "initial_events_end", None) for e in events] == [None, True, False]
+        client.get.assert_called_once_with(
+            "/watch/example", stream=True, timeout=270,
+            params={"allowWatchBookmarks": "true", "sendInitialEvents": "true", "resourceVersionMatch": "NotOlderThan"}
+        )
+
 
 class TestList:
     @pytest.fixture
@@ -278,6 +334,30 @@ class TestList:
         assert actual.metadata.remainingItemCount == 1
         assert actual.items == expected_items
 
+    def test_list_with_meta_streamed(self, client, response, monkeypatch):
+        monkeypatch.setattr(config, "stream_list_responses", True)
+        body = json.dumps(response.json.return_value).encode("utf-8")
+        response.iter_content.return_value = [body[i:i + 7] for i in range(0, len(body), 7)]
+        client.get.return_value = response
+
+        actual = Example.list_with_meta()
+
+        client.get.assert_called_once_with("/example", stream=True)
+        assert actual.metadata.resourceVersion == "1"
+        assert actual.metadata._continue == "ENCODED_CONTINUE_TOKEN"
+        assert actual.items == [Example(value=42), Example(value=1337)]
+        response.json.assert_not_called()
+
+    def test_list_with_meta_selectors(self, client, response):
+        client.get.return_value = response
+
+        actual = Example.list_with_meta(labels=Selector({"app": In(("a", "b"))}), fields={"metadata.name": "my-name"})
+
+        client.get.assert_called_once_with(
+            "/example", params={"labelSelector": "app in (a,b)", "fieldSelector": "metadata.name=my-name"}
+        )
+        assert actual.items == [Example(value=42), Example(value=1337)]
+
     def test_list_empty(self, client, response_empty):
         client.get.return_value = response_empty
 
@@ -320,3 +400,86 @@ class TestList:
 
         with pytest.raises(exception):
             Example.list_with_meta()
+
+
+class TestDecodeItems(object):
+    @pytest.fixture
+    def items(self):
+        return [{"metadata": {"name": "item{}".format(i)}, "value": i} for i in range(20)]
+
+    def test_decodes_inline_below_threshold(self, items, monkeypatch):
+        executor = mock.create_autospec(concurrent.futures.Executor, spec_set=True)
+        monkeypatch.setattr(config, "decode_executor", executor)
+        monkeypatch.setattr(config, "decode_threshold", 21)
+
+        model_list = ModelList.from_dict(Example, {"items": items})
+
+        assert [item.value for item in model_list.items] == list(range(20))
+        executor.map.assert_not_called()
+
+    @pytest.mark.parametrize("executor_cls", (
+        concurrent.futures.ThreadPoolExecutor,
+        concurrent.futures.ProcessPoolExecutor,
+    ))
+    def test_decodes_in_executor_in_order(self, items, monkeypatch, executor_cls):
+        monkeypatch.setattr(config, "decode_threshold", 10)
+        with executor_cls(max_workers=2) as executor:
+            monkeypatch.setattr(config, "decode_executor", executor)
+            model_list = ModelList.from_dict(Example, {"metadata": {"resourceVersion": "5"}, "items": items})
+
+        assert model_list.metadata.resourceVersion == "5"
+        assert model_list.items == [Example.from_dict(item) for item in items]
+        assert gc.isenabled()
+
+    def test_batches_per_worker_of_executor(self, items, monkeypatch):
+        batch_sizes = []
+
+        def map_batches(fn, model_classes, batches):
+            for model_cls, batch in zip(model_classes, batches):
+                batch_sizes.append(len(batch))
+                yield fn(model_cls, batch)
+        monkeypatch.setattr(config, "decode_threshold", 10)
+        monkeypatch.setattr(config, "decode_executor", mock.Mock(_max_workers=1, map=map_batches))
+
+        model_list = ModelList.from_dict(Example, {"items": items})
+
+        assert [item.value for item in model_list.items] == list(range(20))
+        assert batch_sizes == [5, 5, 5, 5]
+
+    def test_decodes_in_executor_without_blocking_event_loop(self, items, monkeypatch):
+        monkeypatch.setattr(config, "decode_threshold", 10)
+        loop_running = threading.Event()
+
+        def decode_batch(model_cls, batch):
+            assert loop_running.wait(5), "event loop blocked while decoding"
+            return [model_cls.from_dict(item) for item in batch]
+
+        async def scenario():
+            decoding = asyncio.ensure_future(_decode_items_async(Example, items))
+            await asyncio.sleep(0)
+            loop_running.set()
+            return await decoding
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            monkeypatch.setattr(config, "decode_executor", executor)
+            with mock.patch("k8s.base._decode_batch", decode_batch):
+                decoded = asyncio.run(scenario())
+
+        assert decoded == [Example.from_dict(item) for item in items]
+
+    def test_gc_pause_enables_collection_when_last_pause_ends(self):
+        pause = _GcPause()
+        with pause:
+            with pause:
+                assert not gc.isenabled()
+            assert not gc.isenabled()
+        assert gc.isenabled()
+
+    def test_gc_pause_leaves_collection_disabled(self):
+        gc.disable()
+        try:
+            with _GcPause():
+                pass
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from k8s.checkpoint import FileCheckpoint, SqliteCheckpoint
+
+SCOPE = "/watch/example?labelSelector=app=a"
+KNOWN = {("name0", "default"): "10", ("name1", None): "12"}
+
+
+@pytest.fixture(params=("file", "sqlite"))
+def checkpoint(request, tmp_path):
+    if request.param == "file":
+        yield FileCheckpoint(str(tmp_path / "checkpoint.json"))
+    else:
+        checkpoint = SqliteCheckpoint(str(tmp_path / "checkpoint.db"))
+        yield checkpoint
+        checkpoint.close()
+
+
+class TestCheckpoint(object):
+    def test_empty(self, checkpoint):
+        assert checkpoint.load(SCOPE) is None
+
+    def test_save_and_load(self, checkpoint):
+        checkpoint.save(SCOPE, "12", KNOWN)
+        assert checkpoint.load(SCOPE) == ("12", KNOWN)
+
+    def test_save_replaces(self, checkpoint):
+        checkpoint.save(SCOPE, "12", KNOWN)
+        checkpoint.save(SCOPE, "13", {})
+        assert checkpoint.load(SCOPE) == ("13", {})
+
+    def test_other_scope_is_ignored(self, checkpoint):
+        checkpoint.save(SCOPE, "12", KNOWN)
+        assert checkpoint.load("/watch/other") is None
+
+    def test_sqlite_keeps_each_scope(self, tmp_path):
+        checkpoint = SqliteCheckpoint(str(tmp_path / "checkpoint.db"))
+        checkpoint.save(SCOPE, "12", KNOWN)
+        checkpoint.save("/watch/other", "5", {})
+        checkpoint.close()
+
+        reopened = SqliteCheckpoint(str(tmp_path / "checkpoint.db"))
+        assert reopened.load(SCOPE) == ("12", KNOWN)
+        assert reopened.load("/watch/other") == ("5", {})
+        reopened.close()
+
+    def test_file_with_invalid_content_is_ignored(self, tmp_path):
+        path = tmp_path / "checkpoint.json"
+        path.write_text('{"scope": "/watch')
+        assert FileCheckpoint(str(path)).load(SCOPE) is None
+
+    def test_file_is_replaced_without_leftovers(self, tmp_path):
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        checkpoint.save(SCOPE, "12", KNOWN)
+        checkpoint.save(SCOPE, "13", KNOWN)
+        assert [p.name for p in tmp_path.iterdir()] == ["checkpoint.json"]
@@ -113,6 +113,22 @@ class TestClient(object):
         client.put(url, body=body, timeout=explicit_timeout)
         session.request.assert_called_once_with("PUT", _absolute_url(url), json=body, timeout=explicit_timeout)
 
+    def test_patch_should_use_merge_patch(self, session, client, url):
+        body = {"foo": "bar"}
+        client.patch(url, body=body)
+        session.request.assert_called_once_with(
+            "PATCH", _absolute_url(url), json=body, timeout=config.timeout,
+            headers={"Content-Type": "application/merge-patch+json"}
+        )
+
+    def test_patch_should_propagate_content_type(self, session, client, url, explicit_timeout):
+        body = {"foo": "bar"}
+        client.patch(url, body=body, timeout=explicit_timeout, content_type="application/json-patch+json")
+        session.request.assert_called_once_with(
+            "PATCH", _absolute_url(url), json=body, timeout=explicit_timeout,
+            headers={"Content-Type": "application/json-patch+json"}
+        )
+
     def test_watch_list_should_raise_exception_when_watch_list_url_is_not_set_on_metaclass(self, session):
         with pytest.raises(NotImplementedError):
             list(WatchListExampleUnsupported.watch_list())
@@ -306,6 +322,37 @@ definitely not valid json
         assert items == expected
 
 
+@pytest.mark.usefixtures("k8s_config")
+class TestIterList(object):
+    def test_follows_continue_token(self, get):
+        pages = [
+            {"metadata": {"continue": "token", "resourceVersion": "1"},
+             "items": [{"value": 1, "requiredValue": 1}, {"value": 2, "requiredValue": 2}]},
+            {"metadata": {"resourceVersion": "1"}, "items": [{"value": 3, "requiredValue": 3}]},
+        ]
+        get.return_value.json.side_effect = pages
+
+        items = list(WatchListExample.iter_list(page_size=2, labels={"app": "foo"}))
+
+        assert [item.value for item in items] == [1, 2, 3]
+        assert get.call_args_list == [
+            mock.call("/apis/namespaces/default/example", params={"limit": 2, "labelSelector": "app=foo"}),
+            mock.call("/apis/namespaces/default/example",
+                      params={"limit": 2, "labelSelector": "app=foo", "continue": "token"}),
+        ]
+
+    def test_pages_are_fetched_lazily(self, get):
+        get.return_value.json.return_value = {
+            "metadata": {"continue": "token"},
+            "items": [{"value": 1, "requiredValue": 1}],
+        }
+
+        items = WatchListExample.iter_list(namespace=None)
+
+        assert next(items).value == 1
+        get.assert_called_once_with("/example/list", params={"limit": 500})
+
+
 def _absolute_url(url):
     return config.api_server + url
 
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+from k8s.base import APIServerError, Equality, Inequality, WatchBookmark, WatchEvent
+from k8s.client import ClientError, NotFound
+from k8s.models.common import ObjectMeta
+from k8s.models.configmap import ConfigMap
+from k8s.models.namespace import Namespace
+from k8s.models.service import Service
+from k8s.watcher import Watcher
+
+CONFIGMAPS = "/api/v1/namespaces/{namespace}/configmaps"
+SERVICES = "/api/v1/namespaces/default/services"
+
+
+def _create(server, count, namespace="default", url=CONFIGMAPS):
+    for i in range(count):
+        server.create(url.format(namespace=namespace), {
+            "metadata": {"name": "cm-{:03d}".format(i), "labels": {"index": str(i % 2)}},
+            "data": {"key": str(i)},
+        })
+
+
+class TestFakeApiServer(object):
+    def test_create_get_delete(self, server):
+        configmap = pytest.helpers.configmap("my-name")
+        configmap.save()
+        assert configmap.metadata.uid
+        assert configmap.metadata.resourceVersion == "1"
+
+        fetched = ConfigMap.get("my-name")
+        assert fetched.data == {"key": "my-name"}
+
+        ConfigMap.delete("my-name")
+        with pytest.raises(NotFound):
+            ConfigMap.get("my-name")
+
+    def test_create_existing_is_conflict(self, server):
+        pytest.helpers.configmap("my-name").save()
+        with pytest.raises(ClientError) as e:
+            pytest.helpers.configmap("my-name").save()
+        assert e.value.response.status_code == 409
+
+    def test_replace_with_stale_resource_version_is_conflict(self, server):
+        pytest.helpers.configmap("my-name").save()
+        first = ConfigMap.get("my-name")
+        second = ConfigMap.get("my-name")
+        first.data = {"key": "first"}
+        first.save()
+        second.data = {"key": "second"}
+        with pytest.raises(ClientError) as e:
+            second.save()
+        assert e.value.response.status_code == 409
+
+    def test_patch(self, server):
+        pytest.helpers.configmap("my-name", app="my-app").save()
+        configmap = ConfigMap.get("my-name")
+        configmap.data = {"other": "value"}
+        configmap.save(patch=True)
+        assert ConfigMap.get("my-name").data == {"other": "value"}
+        assert ConfigMap.get("my-name").metadata.labels == {"app": "my-app"}
+
+    def test_apply_creates_and_updates(self, server):
+        pytest.helpers.configmap("my-name").apply("test")
+        configmap = pytest.helpers.configmap("my-name")
+        configmap.data = {"key": "applied"}
+        configmap.apply("test")
+        assert ConfigMap.get("my-name").data == {"key": "applied"}
+
+    def test_cluster_scoped_resources(self, server):
+        Namespace(metadata=ObjectMeta(name="my-namespace")).save()
+        assert [ns.metadata.name for ns in Namespace.list()] == ["my-namespace"]
+        assert Namespace.get("my-namespace").metadata.name == "my-namespace"
+
+    def test_list_pages(self, server):
+        _create(server, 5)
+        _create(server, 2, namespace="other")
+        names = [cm.metadata.name for cm in ConfigMap.iter_list(page_size=2)]
+        assert names == ["cm-000", "cm-001", "cm-002", "cm-003", "cm-004"]
+        assert len(ConfigMap.list(namespace=None)) == 7
+
+    def test_label_selector(self, server):
+        _create(server, 5)
+        found = ConfigMap.find("", labels={"index": Equality("1")})
+        assert [cm.metadata.name for cm in found] == ["cm-001", "cm-003"]
+
+    def test_delete_list(self, server):
+        _create(server, 5)
+        ConfigMap.delete_list(labels={"index": Equality("0")})
+        assert [cm.metadata.name for cm in ConfigMap.list()] == ["cm-001", "cm-003"]
+
+    def test_watch_list(self, server):
+        _create(server, 2, url=SERVICES)
+        resource_version = server.resource_version
+        server.create(SERVICES, {"metadata": {"name": "new"}})
+        Service.delete("cm-000")
+
+        events = Service.watch_list(resource_version=resource_version, allow_bookmarks=True)
+
+        assert [(e.type, e.object.metadata.name) for e in _take(events, 2)] == [
+            (WatchEvent.ADDED, "new"),
+            (WatchEvent.DELETED, "cm-000"),
+        ]
+        assert isinstance(next(events), WatchBookmark)
+
+    def test_field_selector(self, server):
+        _create(server, 3)
+        listed = ConfigMap.list(fields={"metadata.name": Inequality("cm-001"), "data.key": Inequality("2")})
+        assert [cm.metadata.name for cm in listed] == ["cm-000"]
+
+    def test_client_resetting_connection_is_not_an_error(self, server, capfd):
+        url = urlsplit(server.url)
+        with socket.create_connection((url.hostname, url.port)) as sock:
+            sock.sendall(b"GET /api/v1/namespaces/default/services HTTP/1.1\r\nHost: x\r\n\r\n")
+            assert sock.recv(65536).startswith(b"HTTP/1.1 200")
+            # Close with a reset while the server waits for the next request on the connection
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        time.sleep(0.2)
+        assert "Traceback" not in capfd.readouterr().err
+
+    def test_watch_list_with_selectors(self, server):
+        resource_version = server.resource_version
+        _create(server, 4, url=SERVICES)
+
+        events = Service.watch_list(
+            resource_version=resource_version, labels={"index": "1"}, fields={"metadata.name": Inequality("cm-001")}
+        )
+
+        assert [(e.type, e.object.metadata.name) for e in _take(events, 1)] == [(WatchEvent.ADDED, "cm-003")]
+
+    def test_watch_list_send_initial_events(self, server):
+        _create(server, 2, url=SERVICES)
+
+        events = Service.watch_list(allow_bookmarks=True, send_initial_events=True)
+
+        assert [e.object.metadata.name for e in _take(events, 2)] == ["cm-000", "cm-001"]
+        bookmark = next(events)
+        assert bookmark.initial_events_end
+        assert bookmark.resource_version == server.resource_version
+
+    def test_watcher_send_initial_events(self, server):
+        self._watch_with_initial_events(server)
+
+    def test_watcher_send_initial_events_unsupported(self, server):
+        server.send_initial_events = False
+        with pytest.raises(ClientError):
+            next(Service.watch_list(allow_bookmarks=True, send_initial_events=True))
+        self._watch_with_initial_events(server)
+
+    @staticmethod
+    def _watch_with_initial_events(server):
+        _create(server, 2, url=SERVICES)
+        watcher = Watcher(Service, send_initial_events=True)
+        events = watcher.watch()
+        assert [e.object.metadata.name for e in _take(events, 2)] == ["cm-000", "cm-001"]
+        Service.delete("cm-000")
+        event = next(events)
+        assert (event.type, event.object.metadata.name) == (WatchEvent.DELETED, "cm-000")
+        watcher._run_forever = False
+
+    def test_expired_resource_version(self, server):
+        _create(server, 2, url=SERVICES)
+        resource_version = server.resource_version
+        server.create(SERVICES, {"metadata": {"name": "new"}})
+        server.expire_history()
+
+        events = Service.watch_list(resource_version=resource_version)
+
+        with pytest.raises(APIServerError) as e:
+            next(events)
+        assert e.value.api_error["code"] == 410
+
+    def test_watcher_receives_churn(self, server):
+        _create(server, 3, url=SERVICES)
+        received = []
+        listed = threading.Event()
+        done = threading.Event()
+
+        def watch():
+            watcher = Watcher(Service)
+            for event in watcher.watch():
+                received.append(event)
+                if len(received) == 3:
+                    listed.set()
+                if len(received) == 8:
+                    watcher._run_forever = False
+                    done.set()
+                    return
+
+        threading.Thread(target=watch, daemon=True).start()
+        assert listed.wait(5)
+        server.start_churn(SERVICES, rate=100, count=5)
+        assert done.wait(5)
+        assert [e.type for e in received] == [WatchEvent.ADDED] * 3 + [WatchEvent.MODIFIED] * 5
+
+
+def _take(iterator, count):
+    return [next(iterator) for _ in range(count)]
@@ -16,6 +16,8 @@
 
 # pylint: disable=R0201
 
+import copy
+import pickle
 from datetime import datetime
 
 import mock
@@ -24,7 +26,8 @@ import pytz
 
 from k8s import config
 from k8s.base import Model, SelfModel
-from k8s.fields import Field, JSONField, ListField, OnceField, ReadOnlyField, RequiredField, WriteOnlyField
+from k8s.fields import LAZY_DEFAULT, Field, JSONField, ListField, OnceField, ReadOnlyField, RequiredField, \
+    WriteOnlyField
 from k8s.models.common import ObjectMeta
 
 NAME = "my-model-test"
@@ -183,6 +186,37 @@ class TestRequiredField(object):
             RequiredFieldTest(new=True, field=1)
 
 
+class TestLazyDefault(object):
+    def test_default_instance_created_on_first_read(self):
+        model = ModelTest.from_dict({"field": 1})
+        assert model._values["metadata"] is LAZY_DEFAULT
+        assert not _field("metadata").is_set(model)
+        metadata = model.metadata
+        assert metadata == ObjectMeta()
+        assert model.metadata is metadata
+
+    def test_default_instance_is_not_shared(self):
+        first = ModelTest()
+        second = ModelTest()
+        first.metadata.name = NAME
+        assert first.metadata.name == NAME
+        assert second.metadata.name is None
+
+    def test_set_over_lazy_default(self):
+        model = ModelTest()
+        model.metadata = ObjectMeta(name=NAME)
+        assert model.metadata.name == NAME
+        assert _field("metadata").is_set(model)
+
+    def test_dump_lazy_default(self):
+        model = ModelTest.from_dict({"field": 1})
+        assert model.as_dict() == {"field": 1, "list_field": []}
+
+    @pytest.mark.parametrize("clone", (copy.copy, copy.deepcopy, lambda v: pickle.loads(pickle.dumps(v))))
+    def test_lazy_default_is_a_singleton(self, clone):
+        assert clone(LAZY_DEFAULT) is LAZY_DEFAULT
+
+
 class TestSelfField(object):
     def test_create_from_dict(self):
         model = ModelTest.from_dict({"self_field": {"exec": 1}})
@@ -195,6 +229,10 @@ class TestSelfField(object):
         assert getattr(model, "self_field") == ModelTest.from_dict({"read_only_field": 1, "exec": 1})
 
 
+def _field(name):
+    return next(field for field in ModelTest._meta.fields if field.name == name)
+
+
 def _create_mock_response():
     mock_response = mock.Mock()
     mock_response.json.return_value = {
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from k8s import informer
+from k8s.base import SyntheticAddedWatchEvent, WatchEvent
+from k8s.informer import SharedInformer, SubscriptionOverflow
+from k8s.models.service import Service
+
+SERVICES = "/api/v1/namespaces/default/services"
+TIMEOUT = 5
+
+
+@pytest.fixture
+def server(server):
+    yield server
+    informer.stop_all()
+
+
+def _create(server, *names):
+    for name in names:
+        server.create(SERVICES, {"metadata": {"name": name}})
+
+
+def _names(subscription, count):
+    events = [subscription.get(timeout=TIMEOUT) for _ in range(count)]
+    return [(e.type, e.object.metadata.name) for e in events]
+
+
+class TestSharedInformer(object):
+    def test_subscribers_share_informer_and_events(self, server):
+        _create(server, "first")
+        first = informer.subscribe(Service)
+        second = informer.subscribe(Service)
+        assert informer.get_informer(Service) is informer.get_informer(Service)
+        assert informer.get_informer(Service) is not informer.get_informer(Service, "default")
+
+        first_event = first.get(timeout=TIMEOUT)
+        second_event = second.get(timeout=TIMEOUT)
+
+        assert first_event.object is second_event.object
+        assert first_event.object.metadata.name == "first"
+
+    def test_late_subscriber_gets_current_objects(self, server):
+        _create(server, "first", "second")
+        shared = SharedInformer(Service)
+        early = shared.subscribe()
+        assert _names(early, 2) == [(WatchEvent.ADDED, "first"), (WatchEvent.ADDED, "second")]
+        server.create(SERVICES, {"metadata": {"name": "third"}})
+        Service.delete("first")
+        assert _names(early, 2) == [(WatchEvent.ADDED, "third"), (WatchEvent.DELETED, "first")]
+
+        late = shared.subscribe()
+
+        replayed = [late.get(timeout=0) for _ in range(2)]
+        assert all(isinstance(e, SyntheticAddedWatchEvent) for e in replayed)
+        assert sorted(e.object.metadata.name for e in replayed) == ["second", "third"]
+        assert late.get(timeout=0) is None
+        shared.stop()
+
+    def test_slow_subscriber_is_dropped(self, server):
+        _create(server, "first", "second", "third")
+        shared = SharedInformer(Service)
+        slow = shared.subscribe(queue_size=1)
+        fast = shared.subscribe()
+
+        assert len(_names(fast, 3)) == 3
+        with pytest.raises(SubscriptionOverflow):
+            slow.get()
+        assert slow.closed
+        server.create(SERVICES, {"metadata": {"name": "fourth"}})
+        assert _names(fast, 1) == [(WatchEvent.ADDED, "fourth")]
+        shared.stop()
+
+    def test_stop_ends_subscriptions(self, server):
+        _create(server, "first")
+        shared = SharedInformer(Service)
+        subscription = shared.subscribe()
+        assert _names(subscription, 1) == [(WatchEvent.ADDED, "first")]
+
+        shared.stop()
+
+        assert list(subscription) == []
+        with pytest.raises(RuntimeError):
+            shared.subscribe()
+
+    def test_closed_subscription_stops_receiving(self, server):
+        shared = SharedInformer(Service)
+        with shared.subscribe() as subscription:
+            pass
+        _create(server, "first")
+        other = shared.subscribe()
+        assert _names(other, 1) == [(WatchEvent.ADDED, "first")]
+        assert subscription.get(timeout=0) is None
+        shared.stop()
+
+    def test_store_without_subscribers(self, server):
+        _create(server, "first")
+        shared = SharedInformer(Service, indexers={"name": lambda service: (service.metadata.name,)})
+        shared.start()
+        subscription = shared.subscribe()
+        assert _names(subscription, 1) == [(WatchEvent.ADDED, "first")]
+
+        assert shared.store.get("first").metadata.name == "first"
+        assert [s.metadata.name for s in shared.store.by_index("name", "first")] == ["first"]
+        shared.stop()
+
+    def test_informers_by_selector(self, server):
+        server.create(SERVICES, {"metadata": {"name": "first", "labels": {"app": "a"}}})
+        server.create(SERVICES, {"metadata": {"name": "second", "labels": {"app": "b"}}})
+        shared = informer.get_informer(Service, labels={"app": "b"})
+        assert informer.get_informer(Service, labels=[("app", "b")]) is shared
+        assert informer.get_informer(Service, labels={"app": "a"}) is not shared
+        assert informer.get_informer(Service) is not shared
+        assert str(shared) == "SharedInformer(Service, namespace=None, labelSelector=app=b)"
+
+        subscription = informer.subscribe(Service, labels={"app": "b"})
+
+        assert _names(subscription, 1) == [(WatchEvent.ADDED, "second")]
+        assert [s.metadata.name for s in shared.store.list()] == ["second"]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import pytest
+
+from k8s import config, jsoncodec
+from k8s.client import Client
+
+orjson = pytest.importorskip("orjson")
+
+DATA = {"name": "blåbær", "items": [1, 2.5, None, True], "nested": {"key": "value"}}
+
+
+@pytest.fixture(autouse=True)
+def loaded(monkeypatch):
+    monkeypatch.setattr(jsoncodec, "_loaded", {})
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def set_backend(name):
+        monkeypatch.setattr(config, "json_backend", name)
+    return set_backend
+
+
+class TestJsonCodec(object):
+    @pytest.mark.parametrize("name", ("json", "orjson"))
+    def test_round_trip(self, backend, name):
+        backend(name)
+        assert jsoncodec.uses_stdlib() == (name == "json")
+        encoded = jsoncodec.dumps(DATA)
+        assert isinstance(encoded, bytes)
+        assert jsoncodec.loads(encoded) == DATA
+        assert jsoncodec.loads(encoded.decode("utf-8")) == DATA
+
+    @pytest.mark.parametrize("name", ("json", "orjson"))
+    def test_invalid_json_raises_value_error(self, backend, name):
+        backend(name)
+        with pytest.raises(ValueError):
+            jsoncodec.loads(b"definitely not valid json")
+
+    def test_fallback_when_not_installed(self, backend, monkeypatch, caplog):
+        def missing():
+            raise ImportError("No module named 'missing'")
+        monkeypatch.setitem(jsoncodec._BACKENDS, "missing", missing)
+        backend("missing")
+        assert jsoncodec.uses_stdlib()
+        assert jsoncodec.loads(b'{"a": 1}') == {"a": 1}
+        assert "JSON backend missing is not installed" in caplog.text
+
+    def test_unknown_backend(self, backend):
+        backend("unknown")
+        with pytest.raises(ValueError):
+            jsoncodec.loads(b"{}")
+
+    def test_decode_response(self, backend):
+        resp = mock.MagicMock()
+        resp.content = b'{"a": 1}'
+        backend("orjson")
+        assert jsoncodec.decode_response(resp) == {"a": 1}
+        resp.json.assert_not_called()
+
+    @pytest.mark.usefixtures("k8s_config")
+    def test_client_encodes_body(self, backend):
+        backend("orjson")
+        with mock.patch("k8s.client.Client._session") as session:
+            session.request.return_value.status_code = 200
+            Client().patch("/example", DATA)
+        session.request.assert_called_once_with(
+            "PATCH", config.api_server + "/example", json=None, timeout=config.timeout,
+            data=orjson.dumps(DATA), headers={"Content-Type": "application/merge-patch+json"}
+        )
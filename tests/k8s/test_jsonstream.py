@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+
+from k8s.jsonstream import iter_object
+
+LIST_RESPONSE = {
+    "kind": "PodList",
+    "metadata": {"resourceVersion": "12345", "continue": ""},
+    "items": [
+        {"metadata": {"name": "pod-1", "labels": {"app": "blåbær"}}, "spec": {"priority": 1000}},
+        {"metadata": {"name": "pod-2"}, "spec": {"priority": -1.5e3, "enabled": True, "other": None}},
+    ],
+    "total": 10,
+}
+
+
+def _chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterObject(object):
+    @pytest.mark.parametrize("size", (1, 2, 3, 7, 64, 100000))
+    def test_decodes_in_chunks(self, size):
+        body = json.dumps(LIST_RESPONSE, ensure_ascii=False, indent=1).encode("utf-8")
+
+        actual = list(iter_object(_chunked(body, size), "items"))
+
+        assert actual == [
+            ("kind", "PodList"),
+            ("metadata", LIST_RESPONSE["metadata"]),
+            ("items", LIST_RESPONSE["items"][0]),
+            ("items", LIST_RESPONSE["items"][1]),
+            ("total", 10),
+        ]
+
+    def test_items_are_yielded_before_the_response_is_complete(self):
+        def chunks():
+            yield b'{"items": [{"a": 1}, '
+            yield b'{"b": 2}'
+            raise AssertionError("Read too far")
+
+        stream = iter_object(chunks(), "items")
+
+        assert next(stream) == ("items", {"a": 1})
+
+    @pytest.mark.parametrize("body,expected", (
+        (b'{}', []),
+        (b' { "items" : [ ] } ', []),
+        (b'{"items": null}', [("items", None)]),
+        (b'{"other": [1, 2]}', [("other", [1, 2])]),
+    ))
+    def test_edge_cases(self, body, expected):
+        assert list(iter_object(_chunked(body, 1), "items")) == expected
+
+    @pytest.mark.parametrize("body", (
+        b'',
+        b'[]',
+        b'{"items": [{"a": 1}',
+        b'{"items": [{"a": 1}}',
+        b'{"items": [1 2]}',
+        b'{"a": 1 "b": 2}',
+    ))
+    def test_invalid_json(self, body):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_object(_chunked(body, 3), "items"))
@@ -15,13 +15,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import pickle
+
 import pytest
 from mock import create_autospec
 from requests import Response
 
-from k8s.base import Model
+from k8s import config
+from k8s.base import CompactValues, Model
 from k8s.client import Client
-from k8s.fields import Field, ListField, OnceField, ReadOnlyField
+from k8s.fields import Field, ListField, OnceField, ReadOnlyField, RequiredField
 from k8s.models.common import ObjectMeta
 
 
@@ -39,6 +43,39 @@ class ModelTest(Model):
     _exec = Field(int)
 
 
+class ApplyModel(Model):
+    class Meta:
+        url_template = "/apis/example.com/v1/namespaces/{namespace}/applymodels/{name}"
+
+    metadata = Field(ObjectMeta)
+    field = Field(int)
+
+
+class UpperCaseField(Field):
+    def load(self, instance, value):
+        instance._values[self.name] = value.upper() if value else value
+
+
+class CustomFieldModel(Model):
+    upper = UpperCaseField(str)
+    plain = Field(str)
+
+
+class CustomLoadModel(Model):
+    value = Field(int)
+    loaded = Field(bool, False)
+
+    def update_from_dict(self, d):
+        super(CustomLoadModel, self).update_from_dict(d)
+        self.loaded = True
+
+
+class NestedModel(Model):
+    child = Field(ModelTest)
+    children = ListField(ModelTest)
+    required = RequiredField(str)
+
+
 @pytest.mark.usefixtures("logger")
 class TestModel(object):
     @pytest.fixture()
@@ -129,3 +166,215 @@ class TestModel(object):
 
         assert [1] == my_model1.list_field
         assert [2] == my_model2.list_field
+
+
+class TestCodec(object):
+    def test_round_trip(self):
+        data = {
+            "metadata": {
+                "name": "my-name",
+                "namespace": "my-namespace",
+                "labels": {"app": "my-app"},
+                "finalizers": [],
+                "ownerReferences": [],
+            },
+            "field": 1,
+            "list_field": [1, 2],
+            "once_field": 3,
+            "read_only_field": 4,
+            "alt_type_field": "alt",
+            "dict_field": {"key": "value"},
+            "exec": 5,
+        }
+        assert ModelTest.from_dict(data).as_dict() == data
+
+    def test_unset_model_is_none(self):
+        assert ModelTest().as_dict() is None
+        assert ModelTest.from_dict({}).as_dict() is None
+
+    def test_nested_models(self):
+        data = {"child": {"field": 1}, "children": [{"field": 2}], "required": "yes"}
+        instance = NestedModel.from_dict(data)
+        assert instance.child == ModelTest(field=1)
+        assert instance.children == [ModelTest(field=2)]
+        assert instance.as_dict() == {
+            "child": {"field": 1, "list_field": []},
+            "children": [{"field": 2, "list_field": []}],
+            "required": "yes",
+        }
+
+    def test_from_dict_validates(self):
+        with pytest.raises(TypeError):
+            NestedModel.from_dict({"child": {"field": 1}})
+
+    def test_custom_field_load_is_used(self):
+        instance = CustomFieldModel.from_dict({"upper": "shout", "plain": "quiet"})
+        assert instance.upper == "SHOUT"
+        assert instance.plain == "quiet"
+
+    def test_custom_update_from_dict_is_used(self):
+        instance = CustomLoadModel.from_dict({"value": 1})
+        assert instance.value == 1
+        assert instance.loaded is True
+
+
+class TestChangedFields(object):
+    def test_loaded_instance_is_unchanged(self):
+        instance = ModelTest.from_dict({"field": 1, "metadata": {"name": "my-name"}})
+        assert instance.changed_fields() == set()
+
+    def test_new_instance_is_unchanged(self):
+        instance = ModelTest(field=1)
+        assert instance.changed_fields() == set()
+
+    def test_assignment(self):
+        instance = ModelTest.from_dict({"field": 1, "_exec": 2})
+        instance.field = 1
+        instance._exec = 3
+        del instance.dict_field
+        assert instance.changed_fields() == {"_exec", "dict_field"}
+
+    def test_read_only_field_is_not_changed(self):
+        instance = ModelTest.from_dict({"read_only_field": 1})
+        instance.read_only_field = 2
+        assert instance.changed_fields() == set()
+
+    def test_nested_changes(self):
+        instance = NestedModel.from_dict({"required": "x", "child": {"field": 1}, "children": [{"field": 1}]})
+        instance.children[0].metadata.name = "my-name"
+        assert instance.changed_fields() == {"children"}
+        instance.child.field = 2
+        assert instance.changed_fields() == {"child", "children"}
+
+    def test_merge(self):
+        instance = ModelTest.from_dict({"metadata": {"name": "my-name", "labels": {"a": "b"}}})
+        instance.merge(ModelTest(metadata=ObjectMeta(name="my-name", labels={"a": "c"})))
+        assert instance.changed_fields() == {"metadata"}
+        assert instance.metadata.changed_fields() == {"labels"}
+
+    def test_update_from_dict_resets(self):
+        instance = ModelTest.from_dict({"field": 1})
+        instance.field = 2
+        instance.update_from_dict({"field": 2})
+        assert instance.changed_fields() == set()
+
+
+class TestPatch(object):
+    @pytest.fixture
+    def instance(self):
+        return ModelTest.from_dict({
+            "metadata": {"name": "my-name", "namespace": "my-namespace", "resourceVersion": "42",
+                         "labels": {"a": "b", "c": "d"}},
+            "field": 1,
+            "list_field": [1, 2],
+            "dict_field": {"key": "value"},
+        })
+
+    def test_unchanged(self, instance):
+        assert instance._merge_patch() == {}
+
+    def test_changed_fields(self, instance):
+        instance.field = 2
+        instance.list_field = [3]
+        instance.metadata.labels = {"a": "b", "e": "f"}
+        instance.dict_field = None
+        assert instance._merge_patch() == {
+            "field": 2,
+            "list_field": [3],
+            "metadata": {"labels": {"c": None, "e": "f"}},
+            "dict_field": None,
+        }
+
+    def test_merged_model(self, instance):
+        instance.metadata = ObjectMeta(name="my-name", namespace="my-namespace", annotations={"x": "y"})
+        assert instance._merge_patch() == {"metadata": {"annotations": {"x": "y"}, "labels": None}}
+
+    def test_save_patch(self, instance, patch, put):
+        patch.return_value.json.return_value = {"metadata": {"name": "my-name", "resourceVersion": "43"}}
+        instance.field = 2
+        instance.save(patch=True)
+        patch.assert_called_once_with("", {"field": 2, "metadata": {"resourceVersion": "42"}})
+        put.assert_not_called()
+        assert instance.metadata.resourceVersion == "43"
+        assert instance.changed_fields() == set()
+
+    def test_save_status_patch(self, instance, patch):
+        patch.return_value.json.return_value = {}
+        instance.field = 2
+        instance.save_status(patch=True)
+        patch.assert_called_once_with("/status", {"field": 2, "metadata": {"resourceVersion": "42"}})
+
+
+class TestApply(object):
+    def test_api_version_and_kind(self):
+        assert ApplyModel._meta.api_version == "example.com/v1"
+        assert ApplyModel._meta.kind == "ApplyModel"
+
+    @pytest.mark.parametrize("force,params", (
+        (False, {"fieldManager": "my-manager"}),
+        (True, {"fieldManager": "my-manager", "force": "true"}),
+    ))
+    def test_apply(self, patch, force, params):
+        patch.return_value.json.return_value = {"metadata": {"name": "my-name", "resourceVersion": "1"}, "field": 1}
+        instance = ApplyModel(metadata=ObjectMeta(name="my-name", namespace="my-namespace"), field=1)
+        instance.apply("my-manager", force=force)
+        patch.assert_called_once_with(
+            "/apis/example.com/v1/namespaces/my-namespace/applymodels/my-name",
+            {
+                "apiVersion": "example.com/v1",
+                "kind": "ApplyModel",
+                "metadata": {"name": "my-name", "namespace": "my-namespace", "finalizers": [], "ownerReferences": []},
+                "field": 1,
+            },
+            content_type="application/apply-patch+yaml",
+            params=params,
+        )
+        assert not instance._new
+        assert instance.metadata.resourceVersion == "1"
+
+
+class TestCompactStorage(object):
+    @pytest.fixture(autouse=True)
+    def compact_storage(self, monkeypatch):
+        monkeypatch.setattr(config, "compact_storage", True)
+
+    @pytest.fixture
+    def instance(self):
+        return ModelTest.from_dict({
+            "metadata": {"name": "my-name", "namespace": "my-namespace"},
+            "field": 1,
+            "list_field": [1, 2],
+            "read_only_field": 2,
+        })
+
+    def test_values_are_slotted(self, instance):
+        assert isinstance(instance._values, CompactValues)
+        assert isinstance(instance.metadata._values, CompactValues)
+        assert not hasattr(instance._values, "__dict__")
+
+    def test_fields_behave_the_same(self, instance):
+        assert instance.field == 1
+        assert instance.metadata.name == "my-name"
+        assert instance.read_only_field == 2
+        instance.field = 3
+        instance.read_only_field = 4
+        assert instance.field == 3
+        assert instance.read_only_field == 2
+        del instance.field
+        assert instance.field is None
+        assert "field" not in instance.as_dict()
+
+    def test_new_instance(self):
+        instance = ModelTest(field=1, once_field=2)
+        assert isinstance(instance._values, CompactValues)
+        assert instance.as_dict() == {"field": 1, "list_field": [], "once_field": 2}
+
+    @pytest.mark.parametrize("clone", (
+        copy.copy,
+        copy.deepcopy,
+        lambda o: pickle.loads(pickle.dumps(o)),
+    ), ids=("copy", "deepcopy", "pickle"))
+    def test_copy(self, instance, clone):
+        cloned = clone(instance)
+        assert cloned == instance
+        assert cloned.read_only_field == 2
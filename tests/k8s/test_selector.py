@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from k8s.base import DoesNotExist, Equality, Exists, In, Inequality, NotIn
+from k8s.models.common import LabelSelector, LabelSelectorRequirement, ObjectMeta
+from k8s.models.configmap import ConfigMap
+from k8s.selector import Selector
+
+LABELS = {"app": "web", "tier": "front"}
+
+
+class TestSelector(object):
+    @pytest.mark.parametrize(
+        "requirement, expected",
+        (
+            (("app", "web"), True),
+            (("app", Equality("db")), False),
+            (("app", Inequality("db")), True),
+            (("missing", Inequality("db")), True),
+            (("app", In(("web", "db"))), True),
+            (("missing", In(("web",))), False),
+            (("app", NotIn(("web",))), False),
+            (("missing", NotIn(("web",))), True),
+            (("app", Exists()), True),
+            (("missing", Exists()), False),
+            (("app", DoesNotExist()), False),
+            (("missing", DoesNotExist()), True),
+        ),
+    )
+    def test_matches_labels(self, requirement, expected):
+        assert Selector([requirement]).matches_labels(LABELS) is expected
+
+    def test_all_requirements_must_match(self):
+        assert Selector({"app": "web", "tier": "front"}).matches_labels(LABELS)
+        assert not Selector({"app": "web", "tier": "back"}).matches_labels(LABELS)
+
+    def test_empty_selector_matches_everything(self):
+        assert Selector().matches_labels({})
+        assert Selector.from_label_selector(LabelSelector()).matches_labels(LABELS)
+        assert Selector.from_label_selector(LabelSelector()).matches_labels({})
+
+    def test_nil_label_selector_matches_nothing(self):
+        selector = Selector.from_label_selector(None)
+        assert not selector.matches_labels(LABELS)
+        assert not selector.matches_labels({})
+        assert selector.index_values() == [()]
+        assert repr(selector) == "Selector.nothing()"
+        with pytest.raises(ValueError):
+            str(selector)
+
+    def test_matches_model(self):
+        selector = Selector({"app": "web"})
+        assert selector.matches(ConfigMap(metadata=ObjectMeta(name="a", labels={"app": "web"})))
+        assert not selector.matches(ConfigMap(metadata=ObjectMeta(name="b")))
+
+    def test_str(self):
+        selector = Selector([("tier", Inequality("back")), ("app", In(("web", "db"))), ("canary", DoesNotExist())])
+        assert str(selector) == "tier!=back,app in (web,db),!canary"
+
+    def test_from_label_selector(self):
+        label_selector = LabelSelector(
+            matchLabels={"app": "web"},
+            matchExpressions=[
+                LabelSelectorRequirement(key="tier", operator="In", values=["front", "edge"]),
+                LabelSelectorRequirement(key="track", operator="NotIn", values=["canary"]),
+                LabelSelectorRequirement(key="team", operator="Exists"),
+                LabelSelectorRequirement(key="legacy", operator="DoesNotExist"),
+            ]
+        )
+        selector = Selector.from_label_selector(label_selector)
+
+        assert str(selector) == "app=web,tier in (front,edge),track notin (canary),team,!legacy"
+        assert selector.matches_labels({"app": "web", "tier": "edge", "team": "x"})
+        assert not selector.matches_labels({"app": "web", "tier": "edge", "team": "x", "legacy": "yes"})
+
+    def test_unknown_operator(self):
+        label_selector = LabelSelector(matchExpressions=[LabelSelectorRequirement(key="a", operator="Gt")])
+        with pytest.raises(ValueError):
+            Selector.from_label_selector(label_selector)
+
+    def test_index_values(self):
+        selector = Selector([
+            ("app", "web"), ("tier", In(("front", "edge"))), ("team", Exists()), ("track", NotIn(("canary",)))
+        ])
+        assert selector.index_values() == [
+            (("app", "web"),),
+            (("tier", "front"), ("tier", "edge")),
+            (("team", None),),
+        ]
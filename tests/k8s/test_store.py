@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import pytest
+
+from k8s.base import In, NotIn, WatchEvent
+from k8s.models.common import ObjectMeta, OwnerReference
+from k8s.models.pod import Pod, PodSpec
+from k8s.selector import Selector
+from k8s.store import LABELS_INDEX, Store, label_indexer, labels_indexer, owner_uid_indexer
+
+
+def _pod(name, namespace="default", node=None, owner=None, rv="1", **labels):
+    owners = [OwnerReference(uid=owner, name=owner, kind="ReplicaSet", apiVersion="apps/v1")] if owner else []
+    metadata = ObjectMeta(name=name, namespace=namespace, labels=labels, ownerReferences=owners)
+    metadata._values["resourceVersion"] = rv
+    return Pod(metadata=metadata, spec=PodSpec(nodeName=node))
+
+
+def _node_indexer(pod):
+    return (pod.spec.nodeName,) if pod.spec.nodeName else ()
+
+
+def _names(objects):
+    return sorted(obj.metadata.name for obj in objects)
+
+
+@pytest.fixture
+def store():
+    return Store(indexers={"app": label_indexer("app"), "owner": owner_uid_indexer, "node": _node_indexer})
+
+
+class TestStore(object):
+    def test_get(self, store):
+        pod = _pod("my-pod")
+        store.put(pod)
+        assert store.get("my-pod") is pod
+        assert store.get("my-pod", "other") is None
+        assert store.get("other") is None
+        assert pod in store
+        assert len(store) == 1
+
+    def test_list(self, store):
+        store.put(_pod("a"))
+        store.put(_pod("b", namespace="other"))
+        store.put(_pod("c"))
+        assert _names(store.list()) == ["a", "b", "c"]
+        assert _names(store.list("default")) == ["a", "c"]
+        assert store.list("missing") == []
+
+    def test_indexes(self, store):
+        store.put(_pod("a", app="web", node="node1", owner="rs1"))
+        store.put(_pod("b", app="web", node="node2", owner="rs1"))
+        store.put(_pod("c", app="db", node="node1"))
+        assert _names(store.by_index("app", "web")) == ["a", "b"]
+        assert _names(store.by_index("node", "node1")) == ["a", "c"]
+        assert _names(store.by_index("owner", "rs1")) == ["a", "b"]
+        assert store.by_index("owner", "rs2") == []
+        assert sorted(store.index_values("app")) == ["db", "web"]
+
+    def test_update_moves_between_index_values(self, store):
+        store.put(_pod("a", app="web", node="node1"))
+        updated = _pod("a", app="db", node="node1", rv="2")
+        store.put(updated)
+        assert store.by_index("app", "web") == []
+        assert store.by_index("app", "db") == [updated]
+        assert store.by_index("node", "node1") == [updated]
+        assert store.index_values("app") == ["db"]
+
+    def test_apply_events(self, store):
+        pod = _pod("a", app="web")
+        store.apply(WatchEvent(_type=WatchEvent.ADDED, _object=pod))
+        modified = _pod("a", app="web", rv="2")
+        store.apply(WatchEvent(_type=WatchEvent.MODIFIED, _object=modified))
+        assert store.get("a") is modified
+        store.apply(WatchEvent(_type=WatchEvent.DELETED, _object=modified))
+        assert store.get("a") is None
+        assert store.by_index("app", "web") == []
+        assert store.list("default") == []
+
+    def test_delete_missing_is_ignored(self, store):
+        store.delete(_pod("a"))
+        assert len(store) == 0
+
+    def test_add_index_indexes_existing_objects(self):
+        store = Store()
+        store.put(_pod("a", tier="front"))
+        store.put(_pod("b", tier="back"))
+        store.add_index("tier", label_indexer("tier"))
+        assert _names(store.by_index("tier", "front")) == ["a"]
+
+    def test_concurrent_updates(self, store):
+        def update(worker):
+            for i in range(200):
+                store.put(_pod("pod-{}".format(i % 20), app="app-{}".format(worker), rv=str(i)))
+
+        threads = [threading.Thread(target=update, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(store) == 20
+        assert sum(len(store.by_index("app", value)) for value in store.index_values("app")) == 20
+
+    @pytest.mark.parametrize("indexers", ({}, {LABELS_INDEX: labels_indexer}))
+    def test_select(self, indexers):
+        store = Store(indexers=indexers)
+        store.put(_pod("a", app="web", tier="front"))
+        store.put(_pod("b", app="web", tier="back"))
+        store.put(_pod("c", app="db", tier="back"))
+        store.put(_pod("d", namespace="other", app="web", tier="front"))
+
+        assert _names(store.select({"app": "web"})) == ["a", "b", "d"]
+        assert _names(store.select({"app": "web"}, namespace="default")) == ["a", "b"]
+        assert _names(store.select(Selector({"tier": In(("front", "back")), "app": NotIn(("web",))}))) == ["c"]
+        assert _names(store.select({"app": "web", "tier": "front"})) == ["a", "d"]
+        assert _names(store.select({})) == ["a", "b", "c", "d"]
+        assert store.select({"app": "missing"}) == []
+        assert store.select(Selector.nothing()) == []
+
+    def test_select_after_update(self):
+        store = Store(indexers={LABELS_INDEX: labels_indexer})
+        store.put(_pod("a", app="web"))
+        store.put(_pod("a", app="db", rv="2"))
+        assert store.select({"app": "web"}) == []
+        assert _names(store.select({"app": "db"})) == ["a"]
@@ -16,12 +16,19 @@
 # limitations under the License.
 
 
+import asyncio
+import threading
+import time
+
 import mock
 import pytest
 
-from k8s.base import APIServerError, Field, Model, WatchBookmark, WatchEvent, ModelList, ListMeta
+from k8s.base import (APIServerError, Field, Model, WatchBookmark, WatchEvent, ModelList, ListMeta,
+                      SyntheticAddedWatchEvent, SyntheticDeletedWatchEvent, SyntheticModifiedWatchEvent)
+from k8s.checkpoint import FileCheckpoint
+from k8s.client import ClientError
 from k8s.models.common import ObjectMeta
-from k8s.watcher import Watcher
+from k8s.watcher import RELIST, Watcher
 
 # Just to make things shorter
 ADDED = WatchEvent.ADDED
@@ -61,6 +68,48 @@ def _assert_event(event, _id, event_type, rv, namespace="default"):
     assert o.value == (_id * 100) + rv
 
 
+def _watch(*items):
+    """Yield the events in items, raising the exceptions"""
+    for item in items:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def _bookmark(rv):
+    return WatchBookmark({"object": {"metadata": {"resourceVersion": str(rv)}}})
+
+
+class _Clock(object):
+    """Replaces the time module in k8s.watcher, with the time set by the numbers in the watch items"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def watch(self, *items):
+        for item in items:
+            if isinstance(item, (int, float)):
+                self.now = item
+            else:
+                yield item
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def _initial_events_end(rv):
+    return WatchBookmark({"object": {"metadata": {
+        "resourceVersion": str(rv), "annotations": {"k8s.io/initial-events-end": "true"}
+    }}})
+
+
 @pytest.mark.usefixtures("k8s_config", "logger")
 class TestWatcher(object):
     @pytest.fixture
@@ -106,9 +155,11 @@ class TestWatcher(object):
         watcher._run_forever = False
         assert list(gen) == []
 
-        api_list_with_meta.assert_called_with(namespace=None)
+        api_list_with_meta.assert_called_with(namespace=None, labels=None, fields=None)
         # verify watch_list was called with resourceVersion returned by list call
-        api_watch_list.assert_called_with(namespace=None, resource_version=list_resource_version, allow_bookmarks=True)
+        api_watch_list.assert_called_with(
+            namespace=None, resource_version=list_resource_version, allow_bookmarks=True, labels=None, fields=None
+        )
 
     def test_no_events(self, api_watch_list, api_list_with_meta):
         list_resource_version = "1"
@@ -126,9 +177,11 @@ class TestWatcher(object):
 
         assert list(gen) == []
 
-        api_list_with_meta.assert_called_with(namespace=None)
+        api_list_with_meta.assert_called_with(namespace=None, labels=None, fields=None)
         # verify watch_list was called with resourceVersion returned by list call
-        api_watch_list.assert_called_with(namespace=None, resource_version=list_resource_version, allow_bookmarks=True)
+        api_watch_list.assert_called_with(
+            namespace=None, resource_version=list_resource_version, allow_bookmarks=True, labels=None, fields=None
+        )
 
     def test_handle_watcher_cache_watch(self, api_watch_list, api_list_with_meta):
         # if the same event (same name, namespace and resource version) is returned by watch_list multiple times, it
@@ -252,8 +305,28 @@ class TestWatcher(object):
 
         assert list(gen) == []
 
-        api_list_with_meta.assert_called_with(namespace=namespace)
-        api_watch_list.assert_called_with(namespace=namespace, resource_version=None, allow_bookmarks=True)
+        api_list_with_meta.assert_called_with(namespace=namespace, labels=None, fields=None)
+        api_watch_list.assert_called_with(
+            namespace=namespace, resource_version=None, allow_bookmarks=True, labels=None, fields=None
+        )
+
+    def test_selectors(self, api_watch_list, api_list_with_meta):
+        labels = {"app": "my-app"}
+        fields = {"spec.nodeName": "node1"}
+        watcher = Watcher(WatchListExample)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = [[_event(0, ADDED, 2)], [_event(0, MODIFIED, 3)]]
+
+        gen = watcher.watch(labels=labels, fields=fields)
+        _assert_event(next(gen), 0, ADDED, 2)
+        _assert_event(next(gen), 0, MODIFIED, 3)
+
+        # the selectors are also used when reconnecting
+        api_list_with_meta.assert_called_once_with(namespace=None, labels=labels, fields=fields)
+        assert api_watch_list.call_args_list == [
+            mock.call(namespace=None, resource_version="1", allow_bookmarks=True, labels=labels, fields=fields),
+            mock.call(namespace=None, resource_version="2", allow_bookmarks=True, labels=labels, fields=fields),
+        ]
 
     def test_handle_410_list(self, api_watch_list, api_list_with_meta):
         # the initial list call should not receive 410, since it doesn't send a resourceversion. If it does, something
@@ -281,7 +354,10 @@ class TestWatcher(object):
         second_list_resource_version = "4"
         api_list_with_meta.side_effect = [
             ModelList(metadata=ListMeta(resourceVersion=first_list_resource_version), items=[_example_resource(0, 0)]),
-            ModelList(metadata=ListMeta(resourceVersion=second_list_resource_version), items=[_example_resource(0, 0)]),
+            ModelList(
+                metadata=ListMeta(resourceVersion=second_list_resource_version),
+                items=[_example_resource(0, 0), _example_resource(1, 2)]
+            ),
         ]
 
         api_watch_list.return_value.__getitem__.side_effect = [
@@ -299,23 +375,432 @@ class TestWatcher(object):
         _assert_event(next(gen), 1, ADDED, 2)
         api_list_with_meta.assert_called_once()
         api_watch_list.assert_called_once_with(
-            namespace=None, resource_version=first_list_resource_version, allow_bookmarks=True
+            namespace=None, resource_version=first_list_resource_version, allow_bookmarks=True, labels=None, fields=None
         )
 
         # next will raise 410 from watch_list, call list and watch_list again, then yield the last event
         _assert_event(next(gen), 1, MODIFIED, 3)
         # verify list and watch_list has now been called twice, and each call of watch_list used the resourceVersion
         # returned by the preceding list call
-        assert api_list_with_meta.call_args_list == [mock.call(namespace=None), mock.call(namespace=None)]
+        assert api_list_with_meta.call_args_list == [
+            mock.call(namespace=None, labels=None, fields=None),
+            mock.call(namespace=None, labels=None, fields=None),
+        ]
         assert api_watch_list.call_args_list == [
-            mock.call(namespace=None, resource_version=first_list_resource_version, allow_bookmarks=True),
-            mock.call(namespace=None, resource_version=second_list_resource_version, allow_bookmarks=True),
+            mock.call(
+                namespace=None, resource_version=first_list_resource_version, allow_bookmarks=True, labels=None,
+                fields=None
+            ),
+            mock.call(
+                namespace=None, resource_version=second_list_resource_version, allow_bookmarks=True, labels=None,
+                fields=None
+            ),
         ]
 
         # no more events
         watcher._run_forever = False
         assert list(gen) == []
 
+    @pytest.mark.parametrize("capacity", (1, 1000))
+    def test_relist_after_410_yields_differences(self, api_watch_list, api_list_with_meta, capacity):
+        watcher = Watcher(WatchListExample, capacity)
+        api_list_with_meta.side_effect = [
+            ModelList(
+                metadata=ListMeta(resourceVersion="3"),
+                items=[_example_resource(0, 1), _example_resource(1, 2), _example_resource(2, 3)]
+            ),
+            # while disconnected, 0 was modified, 1 was deleted and 3 was added
+            ModelList(
+                metadata=ListMeta(resourceVersion="7"),
+                items=[_example_resource(0, 5), _example_resource(2, 3), _example_resource(3, 6)]
+            ),
+        ]
+        api_watch_list.side_effect = [
+            _watch(APIServerError({"code": 410, "message": "Gone"})),
+            _watch(_event(2, MODIFIED, 8)),
+        ]
+
+        gen = watcher.watch()
+        initial = [next(gen) for _ in range(3)]
+        relisted = [next(gen) for _ in range(3)]
+        after = next(gen)
+
+        assert all(isinstance(e, SyntheticAddedWatchEvent) for e in initial)
+        assert [(type(e), e.type, e.object.metadata.name) for e in relisted] == [
+            (SyntheticModifiedWatchEvent, MODIFIED, "name0"),
+            (SyntheticAddedWatchEvent, ADDED, "name3"),
+            (SyntheticDeletedWatchEvent, DELETED, "name1"),
+        ]
+        _assert_event(relisted[0], 0, MODIFIED, 5)
+        tombstone = relisted[2].object
+        assert isinstance(tombstone, WatchListExample)
+        assert (tombstone.metadata.namespace, tombstone.metadata.resourceVersion) == ("default", "2")
+        _assert_event(after, 2, MODIFIED, 8)
+
+    def test_relist_after_410_forgets_deleted_objects(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample)
+        api_list_with_meta.side_effect = [
+            ModelList(metadata=ListMeta(resourceVersion="1"), items=[_example_resource(0, 1)]),
+            ModelList(metadata=ListMeta(resourceVersion="3"), items=[]),
+        ]
+        api_watch_list.side_effect = [
+            _watch(_event(0, DELETED, 2), APIServerError({"code": 410, "message": "Gone"})),
+            _watch(_event(1, ADDED, 4)),
+        ]
+
+        gen = watcher.watch()
+
+        _assert_event(next(gen), 0, ADDED, 1)
+        _assert_event(next(gen), 0, DELETED, 2)
+        # the relist has no differences, since 0 is already known to be deleted
+        _assert_event(next(gen), 1, ADDED, 4)
+
+    def test_send_initial_events(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+        api_watch_list.side_effect = [
+            _watch(_event(0, ADDED, 1), _event(1, ADDED, 2), _initial_events_end(2), _event(1, MODIFIED, 3)),
+        ]
+
+        gen = watcher.watch(labels={"app": "a"})
+
+        assert isinstance(next(gen), SyntheticAddedWatchEvent)
+        _assert_event(next(gen), 1, ADDED, 2)
+        _assert_event(next(gen), 1, MODIFIED, 3)
+        api_list_with_meta.assert_not_called()
+        api_watch_list.assert_called_once_with(
+            namespace=None, allow_bookmarks=True, labels={"app": "a"}, fields=None, send_initial_events=True
+        )
+
+    def test_send_initial_events_resumes_after_initial_events(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+        api_watch_list.side_effect = [
+            # the connection is lost before the end of the initial events, so they are requested again
+            _watch(_event(0, ADDED, 1)),
+            _watch(_event(0, ADDED, 1), _event(1, ADDED, 2), _initial_events_end(3)),
+            _watch(_event(1, DELETED, 4)),
+        ]
+
+        gen = watcher.watch()
+
+        _assert_event(next(gen), 0, ADDED, 1)
+        _assert_event(next(gen), 1, ADDED, 2)
+        _assert_event(next(gen), 1, DELETED, 4)
+        assert api_watch_list.call_args_list[2] == mock.call(
+            namespace=None, resource_version="3", allow_bookmarks=True, labels=None, fields=None
+        )
+
+    def test_send_initial_events_after_410_yields_differences(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+        api_watch_list.side_effect = [
+            _watch(_event(0, ADDED, 1), _event(1, ADDED, 2), _initial_events_end(2)),
+            _watch(APIServerError({"code": 410, "message": "Gone"})),
+            _watch(_event(1, ADDED, 2), _event(2, ADDED, 4), _initial_events_end(4)),
+        ]
+
+        gen = watcher.watch()
+        assert len([next(gen) for _ in range(2)]) == 2
+
+        assert [(e.type, e.object.metadata.name) for e in (next(gen), next(gen))] == [
+            (ADDED, "name2"),
+            (DELETED, "name0"),
+        ]
+
+    @pytest.mark.parametrize("status_code", (400, 422))
+    def test_send_initial_events_falls_back_to_list(self, api_watch_list, api_list_with_meta, status_code):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = [
+            _watch(ClientError("Invalid", response=mock.Mock(status_code=status_code))),
+            _watch(_event(0, ADDED, 2)),
+        ]
+
+        gen = watcher.watch()
+
+        _assert_event(next(gen), 0, ADDED, 2)
+        api_list_with_meta.assert_called_once()
+        assert api_watch_list.call_args == mock.call(
+            namespace=None, resource_version="1", allow_bookmarks=True, labels=None, fields=None
+        )
+
+    def test_send_initial_events_ignored_falls_back_to_list(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+        api_list_with_meta.return_value = ModelList(
+            metadata=ListMeta(resourceVersion="3"), items=[_example_resource(0, 1), _example_resource(1, 3)]
+        )
+        api_watch_list.side_effect = [
+            # an older server sends the existing objects without the final bookmark
+            _watch(_event(0, ADDED, 1), WatchBookmark({"object": {"metadata": {"resourceVersion": "2"}}})),
+            _watch(),
+        ]
+
+        gen = watcher.watch()
+
+        _assert_event(next(gen), 0, ADDED, 1)
+        _assert_event(next(gen), 1, ADDED, 3)
+        api_list_with_meta.assert_called_once()
+
+    def test_saves_checkpoint(self, api_watch_list, api_list_with_meta, tmp_path):
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        watcher = Watcher(WatchListExample, checkpoint=checkpoint, checkpoint_interval=0)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="2"), items=[
+            _example_resource(0, 1), _example_resource(1, 2),
+        ])
+        api_watch_list.side_effect = [_watch(_event(1, DELETED, 3), _event(2, ADDED, 4))]
+
+        gen = watcher.watch(labels={"app": "a"})
+        assert len([next(gen) for _ in range(3)]) == 3
+        # the checkpoint is saved when the consumer asks for the next event
+        assert checkpoint.load("/watch/example?labelSelector=app=a") == ("2", {
+            ("name0", "default"): "1", ("name1", "default"): "2",
+        })
+        next(gen)
+        assert checkpoint.load("/watch/example?labelSelector=app=a") == ("3", {("name0", "default"): "1"})
+
+    def test_resumes_from_checkpoint(self, api_watch_list, api_list_with_meta, tmp_path):
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        checkpoint.save("/watch/example?", "3", {("name0", "default"): "1", ("name1", "default"): "2"})
+        watcher = Watcher(WatchListExample, checkpoint=checkpoint)
+        api_watch_list.side_effect = [_watch(_event(0, MODIFIED, 4))]
+
+        gen = watcher.watch()
+
+        _assert_event(next(gen), 0, MODIFIED, 4)
+        api_list_with_meta.assert_not_called()
+        api_watch_list.assert_called_once_with(
+            namespace=None, resource_version="3", allow_bookmarks=True, labels=None, fields=None
+        )
+
+    def test_expired_checkpoint_yields_differences(self, api_watch_list, api_list_with_meta, tmp_path):
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        checkpoint.save("/watch/example?", "3", {("name0", "default"): "1", ("name1", "default"): "2"})
+        watcher = Watcher(WatchListExample, checkpoint=checkpoint)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="9"), items=[
+            _example_resource(0, 1), _example_resource(2, 8),
+        ])
+        api_watch_list.side_effect = [_watch(APIServerError({"code": 410, "message": "Gone"})), _watch()]
+
+        gen = watcher.watch()
+
+        assert [(e.type, e.object.metadata.name) for e in (next(gen), next(gen))] == [
+            (ADDED, "name2"),
+            (DELETED, "name1"),
+        ]
+
+    def test_no_checkpoint_scope_without_checkpoint(self, api_watch_list, api_list_with_meta):
+        watcher = Watcher(WatchListExample)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[
+            _example_resource(0, 1),
+        ])
+
+        # the scope needs the watch URL, which not all models have for a namespace
+        with mock.patch.object(WatchListExample, "_watch_list_url", side_effect=NotImplementedError):
+            _assert_event(next(watcher.watch(namespace="default")), 0, ADDED, 1)
+
+    def test_coalesce_yields_latest_state_after_window(self, api_watch_list, api_list_with_meta):
+        clock = _Clock()
+        watcher = Watcher(WatchListExample, coalesce_window=10)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[
+            _example_resource(0, 1),
+        ])
+        api_watch_list.side_effect = [clock.watch(
+            1, _event(0, MODIFIED, 2), 2, _event(0, MODIFIED, 3), 3, _event(1, ADDED, 4), 4, _event(2, MODIFIED, 5),
+            11, _bookmark(6), 14, _bookmark(7),
+        )]
+
+        with mock.patch("k8s.watcher.time", clock):
+            gen = watcher.watch()
+            # the object was listed, so the consumer sees it as added, in its latest state
+            _assert_event(next(gen), 0, ADDED, 3)
+            assert clock.now == 11
+            _assert_event(next(gen), 1, ADDED, 4)
+            _assert_event(next(gen), 2, MODIFIED, 5)
+            assert clock.now == 14
+        assert watcher.stats.coalesced == 2
+
+    def test_coalesce_keeps_deleted_in_order(self, api_watch_list, api_list_with_meta):
+        clock = _Clock()
+        watcher = Watcher(WatchListExample, coalesce_window=10)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = [
+            clock.watch(1, _event(0, ADDED, 2), 2, _event(0, MODIFIED, 3), 3, _event(0, DELETED, 4),
+                        4, _event(0, ADDED, 5)),
+            clock.watch(20, _bookmark(6)),
+        ]
+
+        with mock.patch("k8s.watcher.time", clock):
+            gen = watcher.watch()
+            # deletes are not held, and replace the held event
+            _assert_event(next(gen), 0, DELETED, 4)
+            assert clock.now == 3
+            _assert_event(next(gen), 0, ADDED, 5)
+            assert clock.now == 20
+        assert watcher.stats.coalesced == 2
+
+    def test_coalesce_does_not_checkpoint_held_events(self, api_watch_list, api_list_with_meta, tmp_path):
+        clock = _Clock()
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        watcher = Watcher(WatchListExample, checkpoint=checkpoint, checkpoint_interval=0, coalesce_window=10)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = [clock.watch(
+            1, _event(0, ADDED, 2), 2, _event(1, ADDED, 3), 12, _bookmark(4), 13, _event(2, ADDED, 5),
+            24, _bookmark(6),
+        )]
+
+        with mock.patch("k8s.watcher.time", clock):
+            gen = watcher.watch()
+            _assert_event(next(gen), 0, ADDED, 2)
+            _assert_event(next(gen), 1, ADDED, 3)
+            assert checkpoint.load("/watch/example?") == ("1", {})
+            _assert_event(next(gen), 2, ADDED, 5)
+        assert checkpoint.load("/watch/example?") == ("4", {("name0", "default"): "2", ("name1", "default"): "3"})
+
+    def test_coalesce_checkpoints_before_held_events(self, api_watch_list, api_list_with_meta, tmp_path):
+        clock = _Clock()
+        checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+        watcher = Watcher(WatchListExample, checkpoint=checkpoint, checkpoint_interval=0, coalesce_window=10)
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        # There is always an event held, but the checkpoint still advances
+        api_watch_list.side_effect = [clock.watch(
+            1, _event(0, ADDED, 2), 5, _event(1, ADDED, 3), 12, _event(2, ADDED, 4), 16, _event(3, ADDED, 5),
+            22, _bookmark(6),
+        )]
+
+        with mock.patch("k8s.watcher.time", clock):
+            gen = watcher.watch()
+            _assert_event(next(gen), 0, ADDED, 2)
+            _assert_event(next(gen), 1, ADDED, 3)
+            assert checkpoint.load("/watch/example?") == ("2", {("name0", "default"): "2"})
+            _assert_event(next(gen), 2, ADDED, 4)
+        assert checkpoint.load("/watch/example?") == ("3", {("name0", "default"): "2", ("name1", "default"): "3"})
+
+    def test_reader_thread(self, api_watch_list, api_list_with_meta):
+        threads = []
+
+        def watch_list(**kwargs):
+            threads.append(threading.current_thread())
+            yield _event(0, ADDED, 2)
+            yield _bookmark(3)
+            yield _event(0, MODIFIED, 4)
+            watcher._run_forever = False
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = watch_list
+        watcher = Watcher(WatchListExample, queue_size=10)
+
+        gen = watcher.watch()
+        _assert_event(next(gen), 0, ADDED, 2)
+        _assert_event(next(gen), 0, MODIFIED, 4)
+        assert list(gen) == []
+
+        assert threads and threads[0] is not threading.current_thread()
+        assert watcher.stats.dequeued == 3
+        assert watcher.stats.queue_time >= watcher.stats.max_queue_time >= 0
+
+    def test_reader_thread_raises_errors_in_consumer(self, api_watch_list, api_list_with_meta):
+        api_list_with_meta.side_effect = [
+            ModelList(metadata=ListMeta(resourceVersion="1"), items=[]),
+            ModelList(metadata=ListMeta(resourceVersion="3"), items=[_example_resource(0, 2)]),
+        ]
+        api_watch_list.side_effect = [
+            _watch(APIServerError({"code": 410, "message": "Gone"})),
+            _watch(APIServerError({"code": 500, "message": "Internal Server Error"})),
+        ]
+        watcher = Watcher(WatchListExample, queue_size=10)
+
+        gen = watcher.watch()
+        _assert_event(next(gen), 0, ADDED, 2)
+        with pytest.raises(APIServerError, match="Internal Server Error"):
+            next(gen)
+
+    def test_reader_overflow_relists(self, api_watch_list, api_list_with_meta):
+        gate = threading.Event()
+
+        def watch_list(**kwargs):
+            yield _event(0, ADDED, 2)
+            gate.wait()
+            yield _event(1, ADDED, 3)
+            yield _event(2, ADDED, 4)
+            yield _event(3, ADDED, 5)
+        api_list_with_meta.side_effect = [
+            ModelList(metadata=ListMeta(resourceVersion="1"), items=[]),
+            ModelList(metadata=ListMeta(resourceVersion="6"), items=[
+                _example_resource(0, 2), _example_resource(1, 3), _example_resource(3, 5),
+            ]),
+        ]
+        api_watch_list.side_effect = [watch_list(), _watch()]
+        watcher = Watcher(WatchListExample, queue_size=1, overflow=RELIST)
+
+        gen = watcher.watch()
+        _assert_event(next(gen), 0, ADDED, 2)
+        gate.set()
+        _wait_for(lambda: watcher.stats.overflows == 1)
+        # The queued event is yielded, then the objects are listed again, yielding the differences
+        _assert_event(next(gen), 1, ADDED, 3)
+        _assert_event(next(gen), 3, ADDED, 5)
+        assert api_list_with_meta.call_count == 2
+
+    def test_reader_releases_coalesced_events_without_new_events(self, api_watch_list, api_list_with_meta):
+        stop = threading.Event()
+
+        def watch_list(**kwargs):
+            yield _event(0, ADDED, 2)
+            stop.wait()
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = watch_list
+        watcher = Watcher(WatchListExample, queue_size=10, coalesce_window=0.05)
+
+        try:
+            _assert_event(next(watcher.watch()), 0, ADDED, 2)
+        finally:
+            stop.set()
+
+    def test_predicate_skips_objects_before_decoding(self, api_watch_list, api_list_with_meta):
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[
+            _example_resource(0, 1, namespace="skipped"), _example_resource(1, 1),
+        ])
+        raw_events = [
+            WatchEvent({"type": ADDED, "object": {
+                "metadata": {"name": "name{}".format(i), "namespace": namespace, "resourceVersion": str(rv)},
+                "value": i * 100 + rv,
+            }}, WatchListExample)
+            for i, namespace, rv in ((2, "skipped", 2), (3, "default", 3))
+        ]
+        api_watch_list.side_effect = [raw_events]
+        watcher = Watcher(WatchListExample, predicate=lambda metadata: metadata.get("namespace") != "skipped")
+
+        gen = watcher.watch()
+        _assert_event(next(gen), 1, ADDED, 1)
+        _assert_event(next(gen), 3, ADDED, 3)
+
+        assert raw_events[0]._raw is not None, "skipped object was decoded"
+        assert ("name0", "skipped") not in watcher._known
+
+    def test_discards_events_that_can_not_be_decoded(self, api_watch_list, api_list_with_meta):
+        api_list_with_meta.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list.side_effect = [[
+            WatchEvent({"type": ADDED, "object": {"metadata": {"name": "bad", "resourceVersion": "2"}, "value": "x"}},
+                       WatchListExample),
+            _event(0, ADDED, 3),
+        ]]
+        watcher = Watcher(WatchListExample, queue_size=10)
+
+        _assert_event(next(watcher.watch()), 0, ADDED, 3)
+
+    def test_discards_initial_events_that_can_not_be_decoded(self, api_watch_list, api_list_with_meta):
+        api_watch_list.side_effect = [_watch(
+            WatchEvent({"type": ADDED, "object": {"metadata": {"name": "bad", "resourceVersion": "2"}, "value": "x"}},
+                       WatchListExample),
+            _event(0, ADDED, 3),
+            _initial_events_end(3),
+        )]
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+
+        _assert_event(next(watcher.watch()), 0, ADDED, 3)
+        api_list_with_meta.assert_not_called()
+
+    def test_invalid_overflow(self):
+        with pytest.raises(ValueError):
+            Watcher(WatchListExample, overflow="drop")
+
     def test_other_apierror_list(self, api_list_with_meta):
         watcher = Watcher(WatchListExample)
 
@@ -351,3 +836,155 @@ class TestWatcher(object):
         _assert_event(next(gen), 1, MODIFIED, 3)
         watcher._run_forever = False
         assert list(gen) == []
+
+
+def _async_watch(*batches):
+    """Return a replacement for watch_list_async, yielding one batch of events per call
+
+    Exceptions in a batch are raised instead of yielded. When the batches run out, the watch blocks forever.
+    """
+    batches = list(batches)
+
+    async def watch_list_async(**kwargs):
+        if not batches:
+            await asyncio.Event().wait()
+        for item in batches.pop(0):
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    return watch_list_async
+
+
+async def _take_async(gen, count):
+    return [await gen.__anext__() for _ in range(count)]
+
+
+@pytest.mark.usefixtures("k8s_config", "logger")
+class TestWatcherAsync(object):
+    @pytest.fixture
+    def api_list_with_meta_async(self):
+        with mock.patch("k8s.base.ApiMixIn.list_with_meta_async") as m:
+            yield m
+
+    @pytest.fixture
+    def api_watch_list_async(self):
+        with mock.patch("k8s.base.ApiMixIn.watch_list_async") as m:
+            yield m
+
+    def test_list_then_watch(self, api_watch_list_async, api_list_with_meta_async):
+        api_list_with_meta_async.return_value = ModelList(
+            metadata=ListMeta(resourceVersion="2"), items=[_example_resource(0, 1), _example_resource(1, 2)]
+        )
+        api_watch_list_async.side_effect = _async_watch([
+            # already seen in the list
+            _event(1, ADDED, 2),
+            WatchBookmark({"object": {"metadata": {"resourceVersion": "3"}}}),
+            _event(1, MODIFIED, 4),
+            _event(0, DELETED, 5),
+        ])
+        watcher = Watcher(WatchListExample)
+
+        events = asyncio.run(_take_async(watcher.watch_async(namespace="default"), 4))
+
+        _assert_event(events[0], 0, ADDED, 1)
+        _assert_event(events[1], 1, ADDED, 2)
+        _assert_event(events[2], 1, MODIFIED, 4)
+        _assert_event(events[3], 0, DELETED, 5)
+        api_list_with_meta_async.assert_called_once_with(namespace="default", labels=None, fields=None)
+        api_watch_list_async.assert_called_once_with(
+            namespace="default", resource_version="2", allow_bookmarks=True, labels=None, fields=None
+        )
+
+    def test_reconnects_from_last_seen_resource_version(self, api_watch_list_async, api_list_with_meta_async):
+        api_list_with_meta_async.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list_async.side_effect = _async_watch(
+            [_event(0, ADDED, 2)],
+            [WatchBookmark({"object": {"metadata": {"resourceVersion": "3"}}})],
+            [_event(0, MODIFIED, 4)],
+        )
+        watcher = Watcher(WatchListExample)
+
+        events = asyncio.run(_take_async(watcher.watch_async(), 2))
+
+        _assert_event(events[0], 0, ADDED, 2)
+        _assert_event(events[1], 0, MODIFIED, 4)
+        api_list_with_meta_async.assert_called_once()
+        assert [c.kwargs["resource_version"] for c in api_watch_list_async.call_args_list] == ["1", "2", "3"]
+
+    def test_handle_410_watch(self, api_watch_list_async, api_list_with_meta_async):
+        api_list_with_meta_async.side_effect = [
+            ModelList(metadata=ListMeta(resourceVersion="1"), items=[_example_resource(0, 0)]),
+            ModelList(metadata=ListMeta(resourceVersion="4"), items=[_example_resource(0, 0), _example_resource(1, 2)]),
+        ]
+        api_watch_list_async.side_effect = _async_watch(
+            [_event(1, ADDED, 2), APIServerError({"code": 410, "message": "Gone"})],
+            [_event(1, MODIFIED, 5)],
+        )
+        watcher = Watcher(WatchListExample)
+
+        events = asyncio.run(_take_async(watcher.watch_async(), 3))
+
+        _assert_event(events[0], 0, ADDED, 0)
+        _assert_event(events[1], 1, ADDED, 2)
+        _assert_event(events[2], 1, MODIFIED, 5)
+        assert api_list_with_meta_async.call_count == 2
+        assert [c.kwargs["resource_version"] for c in api_watch_list_async.call_args_list] == ["1", "4"]
+
+    def test_other_apierror_watch(self, api_watch_list_async, api_list_with_meta_async):
+        api_list_with_meta_async.return_value = ModelList(metadata=ListMeta(), items=[])
+        api_watch_list_async.side_effect = _async_watch([APIServerError({"code": 400, "message": "Bad Request"})])
+        watcher = Watcher(WatchListExample)
+
+        with pytest.raises(APIServerError, match="Bad Request"):
+            asyncio.run(_take_async(watcher.watch_async(), 1))
+
+    def test_send_initial_events_not_supported(self, api_watch_list_async, api_list_with_meta_async):
+        watcher = Watcher(WatchListExample, send_initial_events=True)
+
+        with pytest.raises(ValueError, match="send_initial_events"):
+            asyncio.run(_take_async(watcher.watch_async(), 1))
+        api_list_with_meta_async.assert_not_called()
+
+    def test_coalesce(self, api_watch_list_async, api_list_with_meta_async):
+        clock = _Clock()
+        api_list_with_meta_async.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        events = list(clock.watch(1, _event(0, MODIFIED, 2), 2, _event(0, MODIFIED, 3), 3, _event(1, DELETED, 4)))
+        times = iter([1, 2, 3, 20])
+
+        async def watch_list_async(**kwargs):
+            for event in events + [_bookmark(5)]:
+                clock.now = next(times)
+                yield event
+            await asyncio.Event().wait()
+        api_watch_list_async.side_effect = watch_list_async
+        watcher = Watcher(WatchListExample, coalesce_window=10)
+
+        with mock.patch("k8s.watcher.time", clock):
+            events = asyncio.run(_take_async(watcher.watch_async(), 2))
+
+        _assert_event(events[0], 1, DELETED, 4)
+        _assert_event(events[1], 0, MODIFIED, 3)
+        assert clock.now == 20
+        assert watcher.stats.coalesced == 1
+
+    def test_cancel_multiplexed_watches(self, api_watch_list_async, api_list_with_meta_async):
+        api_list_with_meta_async.return_value = ModelList(metadata=ListMeta(resourceVersion="1"), items=[])
+        api_watch_list_async.side_effect = _async_watch([_event(0, ADDED, 2)], [_event(1, ADDED, 3)])
+        received = []
+
+        async def consume(watcher):
+            async for event in watcher.watch_async():
+                received.append(event)
+
+        async def scenario():
+            tasks = [asyncio.create_task(consume(Watcher(WatchListExample))) for _ in range(2)]
+            while len(received) < 2:
+                await asyncio.sleep(0)
+            for task in tasks:
+                task.cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert sorted(event.object.metadata.name for event in received) == ["name0", "name1"]
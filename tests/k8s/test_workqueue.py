@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+# Copyright 2017-2019 The FIAAS Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from k8s import config, workqueue
+from k8s.base import WatchEvent
+from k8s.fakeserver import FakeApiServer
+from k8s.models.common import ObjectMeta
+from k8s.models.service import Service
+from k8s.watcher import Watcher
+from k8s.workqueue import TokenBucket, WorkQueue
+
+SERVICES = "/api/v1/namespaces/default/services"
+TIMEOUT = 5
+
+
+class Recorder(object):
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def __call__(self, key, item):
+        with self.lock:
+            self.calls.append((key, item, time.monotonic()))
+            if self.failures > 0:
+                self.failures -= 1
+                raise ValueError("failed")
+
+    def items(self):
+        return [(key, item) for key, item, _ in self.calls]
+
+
+class TestWorkQueue(object):
+    def test_handles_added_keys(self):
+        recorder = Recorder()
+        with WorkQueue(recorder) as queue:
+            queue.add(("default", "first"), 1)
+            queue.add(("default", "second"), 2)
+            assert queue.wait_idle(TIMEOUT)
+        assert recorder.items() == [(("default", "first"), 1), (("default", "second"), 2)]
+
+    def test_collapses_waiting_keys(self):
+        recorder = Recorder()
+        queue = WorkQueue(recorder)
+        for i in range(5):
+            queue.add(("default", "first"), i)
+        queue.add(("default", "second"), "x")
+        assert len(queue) == 2
+        with queue:
+            assert queue.wait_idle(TIMEOUT)
+        assert recorder.items() == [(("default", "first"), 4), (("default", "second"), "x")]
+
+    def test_key_added_while_handled_is_handled_again_after(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        active = []
+
+        def handler(key, item):
+            active.append(key)
+            assert active.count(key) == 1
+            calls.append(item)
+            if item == 1:
+                started.set()
+                release.wait(TIMEOUT)
+            active.remove(key)
+
+        with WorkQueue(handler, workers=4) as queue:
+            queue.add("key", 1)
+            assert started.wait(TIMEOUT)
+            queue.add("key", 2)
+            queue.add("key", 3)
+            time.sleep(0.05)
+            assert calls == [1]
+            release.set()
+            assert queue.wait_idle(TIMEOUT)
+        assert calls == [1, 3]
+
+    def test_retries_failures_with_exponential_backoff(self):
+        recorder = Recorder(failures=3)
+        with WorkQueue(recorder, base_delay=0.02) as queue:
+            queue.add("key", "item")
+            assert queue.wait_idle(TIMEOUT)
+        assert recorder.items() == [("key", "item")] * 4
+        times = [t for _, _, t in recorder.calls]
+        delays = [b - a for a, b in zip(times, times[1:])]
+        for delay, expected in zip(delays, (0.02, 0.04, 0.08)):
+            assert delay >= expected * 0.9
+
+    def test_gives_up_after_max_retries(self):
+        recorder = Recorder(failures=10)
+        with WorkQueue(recorder, base_delay=0.001, max_retries=2) as queue:
+            queue.add("key", "item")
+            assert queue.wait_idle(TIMEOUT)
+        assert len(recorder.calls) == 3
+
+    def test_failure_count_is_reset_on_success(self):
+        recorder = Recorder(failures=1)
+        with WorkQueue(recorder, base_delay=0.001, max_retries=1) as queue:
+            queue.add("key", 1)
+            assert queue.wait_idle(TIMEOUT)
+            recorder.failures = 1
+            queue.add("key", 2)
+            assert queue.wait_idle(TIMEOUT)
+        assert recorder.items() == [("key", 1), ("key", 1), ("key", 2), ("key", 2)]
+
+    def test_workers_handle_keys_concurrently(self):
+        barrier = threading.Barrier(3, timeout=TIMEOUT)
+
+        def handler(key, item):
+            barrier.wait()
+
+        with WorkQueue(handler, workers=3) as queue:
+            for i in range(3):
+                queue.add(i)
+            assert queue.wait_idle(TIMEOUT)
+        assert not barrier.broken
+
+    def test_rate_limits_handler_calls(self):
+        recorder = Recorder()
+        with WorkQueue(recorder, workers=4, rate=50, burst=2) as queue:
+            start = time.monotonic()
+            for i in range(7):
+                queue.add(i)
+            assert queue.wait_idle(TIMEOUT)
+        # Two calls in the burst, then 50 per second
+        assert recorder.calls[-1][2] - start >= 5 / 50 * 0.9
+
+    def test_wait_idle_times_out(self):
+        queue = WorkQueue(Recorder())
+        queue.add("key")
+        assert not queue.wait_idle(0.01)
+
+
+class TestTokenBucket(object):
+    def test_allows_burst_then_rate(self):
+        bucket = TokenBucket(100, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.01
+        for _ in range(3):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.03 * 0.9
+
+
+class FakeWatcher(object):
+    """Each watch raises or yields the next of results, and then waits until stopped"""
+
+    def __init__(self, *results):
+        self._results = list(results)
+        self._stopped = threading.Event()
+
+    def watch(self, namespace=None, labels=None, fields=None):
+        result = self._results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        yield from result
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class TestFeed(object):
+    def test_feeds_watch_events_by_namespace_and_name(self, server):
+        server.create(SERVICES, {"metadata": {"name": "first"}})
+        handled = {}
+        seen = threading.Event()
+
+        def handler(key, event):
+            handled[key] = (event.type, event.object.metadata.name)
+            if len(handled) == 2:
+                seen.set()
+
+        with WorkQueue(handler) as queue:
+            queue.feed(Watcher(Service))
+            server.create(SERVICES, {"metadata": {"name": "second"}})
+            assert seen.wait(TIMEOUT)
+        assert handled == {
+            ("default", "first"): ("ADDED", "first"),
+            ("default", "second"): ("ADDED", "second"),
+        }
+
+    def test_restarts_failed_watch(self, monkeypatch):
+        monkeypatch.setattr(workqueue, "RETRY_DELAY", 0)
+        event = WatchEvent(_type=WatchEvent.ADDED, _object=Service(metadata=ObjectMeta(name="a", namespace="default")))
+        handled = []
+        seen = threading.Event()
+
+        def handler(key, item):
+            handled.append((key, item))
+            seen.set()
+
+        with WorkQueue(handler) as queue:
+            queue.feed(FakeWatcher(ConnectionError("failed"), [event]))
+            assert seen.wait(TIMEOUT)
+        assert handled == [(("default", "a"), event)]
+
+    def test_stop_waits_for_feeds(self):
+        queue = WorkQueue(Recorder()).start()
+        thread = queue.feed(FakeWatcher([]))
+        queue.stop(TIMEOUT)
+        assert not thread.is_alive()
+
+    def test_exits_while_watch_is_quiet(self, monkeypatch):
+        with FakeApiServer(watch_timeout=30) as server:
+            monkeypatch.setattr(config, "api_server", server.url)
+            monkeypatch.setattr(config, "api_token", "")
+            server.create(SERVICES, {"metadata": {"name": "first"}})
+            seen = threading.Event()
+
+            with WorkQueue(lambda key, event: seen.set()) as queue:
+                queue.feed(Watcher(Service))
+                assert seen.wait(TIMEOUT)
+                exiting = time.monotonic()
+            assert time.monotonic() - exiting < workqueue.FEED_STOP_TIMEOUT + 1